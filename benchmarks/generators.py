@@ -0,0 +1,141 @@
+"""
+Problem generators for the benchmarks: grid mazes with obstacles, random transition systems,
+and families of system and tester specifications.
+
+A problem is a dictionary with the states, transitions, labels and initial states of the
+transition system (the fields of TransitionSystemInput).
+"""
+import random
+from collections import deque
+
+# Specification families: system formula, tester formula, atomic propositions of the system
+# (placed on the goal states) and of the tester (placed on other states)
+FORMULA_FAMILIES = {
+    "reach": {"sysformula": "F(goal)", "testformula": "F(I)",
+              "sys_aps": ["goal"], "test_aps": ["I"]},
+    "reach_both": {"sysformula": "F(goal)", "testformula": "F(I1) & F(I2)",
+                   "sys_aps": ["goal"], "test_aps": ["I1", "I2"]},
+    "sequence": {"sysformula": "F(goal)", "testformula": "F(I1 & F(I2))",
+                 "sys_aps": ["goal"], "test_aps": ["I1", "I2"]},
+    "key_door": {"sysformula": "F(key & F(goal))", "testformula": "F(door_1) & F(door_2)",
+                 "sys_aps": ["goal", "key"], "test_aps": ["door_1", "door_2"]},
+}
+
+def grid_neighbors(z, x):
+    return [(z, x-1), (z, x+1), (z-1, x), (z+1, x)]
+
+def reachable(states, transitions, init):
+    """
+    States reachable from init.
+    """
+    seen = {init}
+    queue = deque([init])
+    while queue:
+        s = queue.popleft()
+        for t in transitions[s]:
+            if t not in seen:
+                seen.add(t)
+                queue.append(t)
+    return seen
+
+def place_labels(problem, free, aps, per_ap, rng):
+    """
+    Label per_ap random states from free with each atomic proposition in aps.
+    """
+    free = sorted(free)
+    rng.shuffle(free)
+    for ap in aps:
+        for s in free[:per_ap]:
+            problem["labels"].setdefault(s, []).append(ap)
+        free = free[per_ap:]
+
+def maze(n, m=None, density=0.0, family="reach", placement="corners", per_ap=1, seed=0, max_tries=100):
+    """
+    Grid maze with random obstacles, with the transitions of the maze file loader (moves to the
+    four neighbors and self-loops, goals are absorbing). The initial state is in the middle of the
+    bottom row. Unreachable states are removed.
+
+    Args:
+        n: Number of rows.
+        m: Number of columns (default n).
+        density: Fraction of the cells that are obstacles.
+        family: Formula family of the labels (see FORMULA_FAMILIES).
+        placement: 'corners' (goals in the top corners) or 'random' (goals at random states).
+        per_ap: Number of states labeled with each atomic proposition (except 'goal' with 'corners').
+        seed: Random seed.
+        max_tries: Number of obstacle samples to try until the goals are reachable.
+
+    Returns:
+        problem: Dictionary with states, transitions, labels and init.
+    """
+    m = m if m is not None else n
+    rng = random.Random(seed)
+    spec = FORMULA_FAMILIES[family]
+    init = (n-1, m//2)
+    for attempt in range(max_tries):
+        cells = [(z,x) for z in range(n) for x in range(m)]
+        if placement == "corners":
+            goals = [(0,0), (0,m-1)]
+        else:
+            goals = rng.sample([cell for cell in cells if cell != init], per_ap)
+        keep = set(goals) | {init}
+        obstacles = set(cell for cell in cells if cell not in keep and rng.random() < density)
+        states = [cell for cell in cells if cell not in obstacles]
+        state_set = set(states)
+        transitions = dict()
+        for s in states:
+            transitions[s] = [s] if s in goals else [s] + [t for t in grid_neighbors(*s) if t in state_set]
+        seen = reachable(states, transitions, init)
+        if all(goal in seen for goal in goals):
+            break
+    else:
+        raise ValueError('No maze with reachable goals found for density {0}.'.format(density))
+
+    states = [s for s in states if s in seen]
+    problem = {"states": states,
+               "transitions": {s: transitions[s] for s in states},
+               "labels": {goal: ["goal"] for goal in goals},
+               "init": [init]}
+    free = set(states) - set(goals) - {init}
+    place_labels(problem, free, [ap for ap in spec["sys_aps"] if ap != "goal"] + spec["test_aps"], per_ap, rng)
+    return problem
+
+def random_transition_system(n_states, degree=3, family="reach", per_ap=1, seed=0):
+    """
+    Random transition system: state 0 is the initial state, a random spanning tree makes all
+    states reachable from it, and every state has degree random successors in addition. The
+    goal states are absorbing.
+
+    Args:
+        n_states: Number of states.
+        degree: Number of random successors of each state.
+        family: Formula family of the labels (see FORMULA_FAMILIES).
+        per_ap: Number of states labeled with each atomic proposition.
+        seed: Random seed.
+
+    Returns:
+        problem: Dictionary with states, transitions, labels and init.
+    """
+    rng = random.Random(seed)
+    spec = FORMULA_FAMILIES[family]
+    states = list(range(n_states))
+    goals = rng.sample(states[1:], min(per_ap, n_states - 1))
+    successors = {s: set() for s in states}
+    order = [s for s in states[1:] if s not in goals]
+    rng.shuffle(order)
+    tree = [0]
+    for s in order + goals: # the goals are leaves of the spanning tree
+        successors[rng.choice(tree)].add(s)
+        if s not in goals:
+            tree.append(s)
+    for s in states:
+        successors[s].update(rng.sample(states, min(degree, n_states)))
+        successors[s].discard(s)
+
+    problem = {"states": states,
+               "transitions": {s: [s] if s in goals else sorted(successors[s]) for s in states},
+               "labels": {goal: ["goal"] for goal in goals},
+               "init": [0]}
+    free = set(states) - set(goals) - {0}
+    place_labels(problem, free, [ap for ap in spec["sys_aps"] if ap != "goal"] + spec["test_aps"], per_ap, rng)
+    return problem
@@ -0,0 +1,58 @@
+"""
+Import-time benchmark: imports a module in fresh interpreters with `python -X importtime`,
+reports the slowest imports (cumulative time) of the fastest run and checks the total against
+a budget.
+
+Usage:
+    python benchmarks/import_time.py --module floras.main --repeat 5 --top 15 --budget 2.0
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+def import_times(module):
+    """
+    Import times of a module in a fresh interpreter.
+
+    Returns:
+        times: List of (module name, self time [s], cumulative time [s]) in import order.
+    """
+    # the source tree is importable without installing the package
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([src] + sys.path))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                            capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise RuntimeError('Importing {0} failed:\n{1}'.format(module, result.stderr))
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times.append((name.strip(), int(self_us)/1e6, int(cumulative_us)/1e6))
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="import time of a module in a fresh interpreter"
+    )
+    parser.add_argument("--module", default="floras.main", type=str)
+    parser.add_argument("--repeat", default=5, type=int, help="number of interpreters, the fastest run is reported")
+    parser.add_argument("--top", default=15, type=int, help="number of slowest imports to show")
+    parser.add_argument("--budget", default=None, type=float, help="fail if the import takes longer (s)")
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for k in range(args.repeat)]
+    times = min(runs, key=lambda run: run[-1][2]) # the module is imported last
+    total = times[-1][2]
+    print('{0:<50} {1:>10} {2:>10}'.format('module', 'self [s]', 'cum [s]'))
+    for name, self_time, cumulative in sorted(times, key=lambda x: -x[2])[:args.top]:
+        print('{0:<50} {1:>10.3f} {2:>10.3f}'.format(name, self_time, cumulative))
+    print('import {0}: {1:.3f}s (fastest of {2})'.format(args.module, total, args.repeat))
+    if args.budget is not None and total > args.budget:
+        print('over the budget of {0:.3f}s'.format(args.budget))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Scaling benchmark for the virtual product graph construction.
+
+Compares Product.pruned_sync_prod against the previous list-based implementation
+on open grid mazes of increasing size.
+
+Usage:
+    python benchmarks/product_scaling.py --sizes 10 50 100 250 500 --legacy-max 50
+"""
+import time
+import argparse
+
+from floras.components.automata import get_system_automaton, get_tester_automaton, get_product_automaton
+from floras.components.transition_system import TransitionSystemInput, TranSys
+from floras.components.product import Product
+
+
+def grid_maze(n):
+    """
+    Open n x n grid with the initial state in the middle, goals in two corners and
+    intermediate labels on the way, with the transitions of the maze file loader.
+
+    Args:
+        n: Number of rows and columns.
+
+    Returns:
+        transition_system_input: Input data for the transition system.
+    """
+    states = [(z,x) for z in range(n) for x in range(n)]
+    goals = [(0,0), (0,n-1)]
+    transitions = dict()
+    for (z,x) in states:
+        next_states = [(z,x)]
+        if (z,x) not in goals:
+            for (dz,dx) in [(0,-1), (0,1), (-1,0), (1,0)]:
+                if 0 <= z+dz < n and 0 <= x+dx < n:
+                    next_states.append((z+dz, x+dx))
+        transitions[(z,x)] = next_states
+    labels = {goal: ['goal'] for goal in goals}
+    labels.update({(n//2, 0): ['I'], (n//2, n-1): ['I'], (0, n//2): ['I']})
+    init = [(n-1, n//2)]
+    return TransitionSystemInput(states, transitions, labels, init)
+
+def legacy_pruned_sync_prod(prod):
+    """
+    Previous implementation of Product.pruned_sync_prod (list membership checks
+    in the breadth first search), kept as the reference for the benchmark.
+    Only the search is reproduced; it builds prod.E and prod.S.
+
+    Args:
+        prod: Product object.
+    """
+    prod.construct_labels()
+    prod.E = dict()
+    aut_state_edges = [(si[0], sj) for si, sj in prod.automaton.delta.items()]
+
+    nodes_to_add = []
+    s0 = prod.transys.I[0]
+    q0 = prod.automaton.qinit
+    nodes_to_add.append((s0, q0))
+    nodes_to_keep = []
+    nodes_to_keep.append((s0, q0))
+
+    while len(nodes_to_add) > 0:
+        next_nodes = []
+        for (s,q) in nodes_to_add:
+            for a in prod.transys.A:
+                if (s,a) in list(prod.transys.E.keys()):
+                    t = prod.transys.E[(s,a)]
+                    for p in prod.automaton.Q:
+                        if (q,p) in aut_state_edges:
+                            label = prod.transys.L[t]
+                            if prod.automaton.get_transition(q, label) == p:
+                                prod.E[((s,q), a)] = (t,p)
+                                if (t,p) not in nodes_to_keep:
+                                    nodes_to_keep.append((t,p))
+                                    next_nodes.append((t,p))
+        nodes_to_add = next_nodes
+    prod.S = nodes_to_keep
+
+def time_product(transys, aut, legacy=False):
+    """
+    Time the product construction.
+
+    Returns:
+        runtime: Wall time in seconds.
+        n_nodes: Number of reachable product nodes.
+        n_edges: Number of product edges.
+    """
+    prod = Product(transys, aut)
+    t0 = time.perf_counter()
+    if legacy:
+        legacy_pruned_sync_prod(prod)
+    else:
+        prod.pruned_sync_prod()
+    runtime = time.perf_counter() - t0
+    return runtime, len(prod.S), len(prod.E)
+
+def run(sizes, legacy_max, sys_formula='F(goal)', test_formula='F(I)'):
+    sys_aut, spot_aut_sys = get_system_automaton(sys_formula)
+    test_aut, spot_aut_test = get_tester_automaton(test_formula)
+    prod_aut = get_product_automaton(spot_aut_sys, spot_aut_test)
+
+    print('{0:>6} {1:>10} {2:>10} {3:>12} {4:>12}'.format('n', 'nodes', 'edges', 'indexed [s]', 'legacy [s]'))
+    results = []
+    for n in sizes:
+        transys = TranSys(grid_maze(n))
+        runtime, n_nodes, n_edges = time_product(transys, prod_aut)
+        legacy_runtime = None
+        if n <= legacy_max:
+            legacy_runtime, legacy_nodes, legacy_edges = time_product(transys, prod_aut, legacy=True)
+            assert (legacy_nodes, legacy_edges) == (n_nodes, n_edges)
+        legacy_str = '{0:12.3f}'.format(legacy_runtime) if legacy_runtime is not None else '{0:>12}'.format('skipped')
+        print('{0:>6} {1:>10} {2:>10} {3:12.3f} {4}'.format(n, n_nodes, n_edges, runtime, legacy_str))
+        results.append({'n': n, 'nodes': n_nodes, 'edges': n_edges, 'runtime': runtime, 'legacy_runtime': legacy_runtime})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="scaling benchmark for the virtual product graph construction"
+    )
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 25, 50, 100, 250, 500])
+    parser.add_argument("--legacy-max", type=int, default=50,
+                        help="largest maze size to run the previous implementation on")
+    args = parser.parse_args()
+    run(args.sizes, args.legacy_max)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Scaling benchmark of the full pipeline on generated mazes and random transition systems.
+
+Every instance (problem generator x size x formula family x case) is solved with per-stage
+profiling. The results (stage times, graph and model sizes, flow) are written to a JSON file
+and compared against a baseline file: an instance regresses if a stage is slower than the
+baseline by more than the tolerance factor, or if a graph or model size changed.
+
+Usage:
+    python benchmarks/scaling.py --sizes 5 10 20 --families reach sequence --cases static reactive \
+        --output log/benchmark.json --baseline benchmarks/baseline.json
+    python benchmarks/scaling.py --sizes 5 10 20 --save-baseline benchmarks/baseline.json
+"""
+import os
+import sys
+import json
+import argparse
+import platform
+
+from floras.components.automata import get_system_automaton, get_tester_automaton, get_product_automaton
+from floras.components.transition_system import TransitionSystemInput, TranSys
+from floras.components.product import sync_prods
+from floras.optimization.optimize import solve
+from floras.optimization.termination import TerminationPolicy
+from floras.profiling import Profiler
+
+from generators import FORMULA_FAMILIES, maze, random_transition_system
+
+def instances(kinds, sizes, densities, families, cases, degree=3, seed=0):
+    """
+    Benchmark instances.
+
+    Returns:
+        instances: List of (name, kind, problem generator arguments, family, case).
+    """
+    result = []
+    for kind in kinds:
+        for n in sizes:
+            for density in (densities if kind == 'maze' else [None]):
+                for family in families:
+                    for case in cases:
+                        if kind == 'maze':
+                            name = 'maze-{0}-d{1}-{2}-{3}'.format(n, density, family, case)
+                            params = {"n": n, "density": density, "seed": seed}
+                        else:
+                            name = 'random-{0}-k{1}-{2}-{3}'.format(n, degree, family, case)
+                            params = {"n_states": n, "degree": degree, "seed": seed}
+                        result.append((name, kind, params, family, case))
+    return result
+
+def run_instance(kind, params, family, case, time_limit=None):
+    """
+    Solve one instance with per-stage profiling.
+
+    Returns:
+        record: Dictionary with the flow, stage times and sizes.
+    """
+    spec = FORMULA_FAMILIES[family]
+    profiler = Profiler()
+    with profiler.stage('generate'):
+        if kind == 'maze':
+            problem = maze(family=family, **params)
+        else:
+            problem = random_transition_system(family=family, **params)
+    with profiler.stage('automata'):
+        sys_aut, spot_aut_sys = get_system_automaton(spec["sysformula"])
+        test_aut, spot_aut_test = get_tester_automaton(spec["testformula"])
+        prod_aut = get_product_automaton(spot_aut_sys, spot_aut_test)
+    with profiler.stage('transition_system'):
+        transys = TranSys(TransitionSystemInput(problem["states"], problem["transitions"], problem["labels"], problem["init"]))
+    with profiler.stage('product'):
+        virtual, virtual_sys, map_G_to_S = sync_prods(transys, sys_aut, prod_aut, test_aut)
+    profiler.record('transition_system', states=len(transys.S), transitions=len(transys.E))
+    profiler.record('virtual_product', nodes=virtual.G_initial.number_of_nodes(), edges=virtual.G_initial.number_of_edges())
+    profiler.record('virtual_sys', nodes=virtual_sys.G_initial.number_of_nodes(), edges=virtual_sys.G_initial.number_of_edges())
+    policy = TerminationPolicy(time_limit=time_limit)
+    flow = None
+    error = None
+    try:
+        result = solve(virtual, transys, prod_aut, virtual_sys, case=case, map_G_to_S=map_G_to_S, policy=policy, seed=0, profiler=profiler)
+        if result is not None:
+            flow = result[1]
+    except Exception as exception:
+        error = repr(exception)
+    report = profiler.report()
+    return {"flow": flow,
+            "error": error,
+            "wall_time": report["wall_time"],
+            "stages": {stage["stage"]: stage["wall_time"] for stage in report["stages"]},
+            "sizes": report["sizes"],
+            "peak_rss_mb": report["peak_rss_mb"]}
+
+def compare(results, baseline, tolerance=1.5, min_time=0.05):
+    """
+    Compare the results with a baseline.
+
+    Args:
+        results: Dictionary of records by instance name.
+        baseline: Dictionary of baseline records by instance name.
+        tolerance: A stage regresses if it takes more than tolerance times its baseline time.
+        min_time: Stages faster than min_time seconds in both runs are not compared.
+
+    Returns:
+        regressions: List of (instance name, description).
+    """
+    regressions = []
+    for name, record in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        for stage, runtime in record["stages"].items():
+            base_time = base["stages"].get(stage)
+            if base_time is None or max(runtime, base_time) < min_time:
+                continue
+            if runtime > tolerance*base_time:
+                regressions.append((name, '{0}: {1:.3f}s vs {2:.3f}s baseline ({3:.1f}x)'.format(stage, runtime, base_time, runtime/max(base_time, 1e-9))))
+        for graph, sizes in record["sizes"].items():
+            for key, value in sizes.items():
+                if key == 'runtime':
+                    continue
+                base_value = base["sizes"].get(graph, {}).get(key)
+                if base_value is not None and value != base_value:
+                    regressions.append((name, '{0} {1}: {2} vs {3} baseline'.format(graph, key, value, base_value)))
+        if base["flow"] is not None and record["flow"] != base["flow"]:
+            regressions.append((name, 'flow: {0} vs {1} baseline'.format(record["flow"], base["flow"])))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="scaling benchmark of the pipeline on generated problems"
+    )
+    parser.add_argument("--kinds", nargs="+", default=["maze"], choices=["maze", "random"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[5, 10, 15],
+                        help="maze rows and columns, or number of states of the random transition systems")
+    parser.add_argument("--densities", nargs="+", type=float, default=[0.0, 0.2], help="obstacle densities of the mazes")
+    parser.add_argument("--degree", type=int, default=3, help="random successors per state of the random transition systems")
+    parser.add_argument("--families", nargs="+", default=["reach"], choices=sorted(FORMULA_FAMILIES))
+    parser.add_argument("--cases", nargs="+", default=["static", "reactive"], choices=["static", "reactive"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float, default=600, help="solver time limit per instance in seconds")
+    parser.add_argument("--output", default="log/benchmark.json")
+    parser.add_argument("--baseline", default=None, help="results file to compare against")
+    parser.add_argument("--save-baseline", default=None, help="also write the results to this baseline file")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="slowdown factor that counts as a regression")
+    parser.add_argument("--min-time", type=float, default=0.05, help="stages faster than this (s) are not compared")
+    args = parser.parse_args()
+
+    results = dict()
+    print('{0:<40} {1:>8} {2:>8} {3:>10} {4:>10} {5:>10}'.format('instance', 'nodes', 'edges', 'build [s]', 'solve [s]', 'total [s]'))
+    for name, kind, params, family, case in instances(args.kinds, args.sizes, args.densities, args.families, args.cases, args.degree, args.seed):
+        record = run_instance(kind, params, family, case, args.time_limit)
+        results[name] = record
+        product = record["sizes"]["virtual_product"]
+        print('{0:<40} {1:>8} {2:>8} {3:>10.3f} {4:>10.3f} {5:>10.3f}{6}'.format(
+            name, product["nodes"], product["edges"], record["stages"].get("model_build", 0.0),
+            record["stages"].get("solve", 0.0), record["wall_time"], '  ' + record["error"] if record["error"] else ''))
+
+    output = {"platform": platform.platform(), "python": platform.python_version(), "instances": results}
+    for path in [args.output, args.save_baseline]:
+        if path is not None:
+            if os.path.dirname(path) and not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as fp:
+                json.dump(output, fp, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as fp:
+            baseline = json.load(fp)["instances"]
+        regressions = compare(results, baseline, args.tolerance, args.min_time)
+        missing = [name for name in results if name not in baseline]
+        if missing:
+            print('{0} instances not in the baseline'.format(len(missing)))
+        for name, description in regressions:
+            print('REGRESSION {0}: {1}'.format(name, description))
+        if regressions:
+            sys.exit(1)
+        print('no regressions against {0}'.format(args.baseline))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Report of the translation presets: for each preset, the sizes of the system, tester and product
+automata, of the virtual product graph and of the MILP, and the flow. Unsound translations
+(see automata.is_sound) are marked with '*', their flow may differ from the sound ones.
+
+Usage:
+    python benchmarks/translation_presets.py --filename examples/problem.json
+    python benchmarks/translation_presets.py --filename examples/problem.json --output log/presets.json
+"""
+import os
+import json
+import argparse
+
+from floras.components.automata import (TRANSLATION_PRESETS, translate, select_translation, is_sound, spec_product,
+                                        get_automaton, get_product_automaton)
+from floras.components.transition_system import TransitionSystemInput, TranSys
+from floras.components.product import sync_prods
+from floras.main import extract_test_data
+from floras.optimization.optimize import solve
+from floras.profiling import Profiler
+
+def preset_record(test_data, preset, backend='gurobi'):
+    """
+    Automaton, graph and model sizes of a problem with a preset.
+
+    Returns:
+        record: Dictionary of sizes and the flow.
+    """
+    init, goals, labels, sysformula, testformula, states, transitions, type = test_data
+    record = {"preset": preset}
+    spot_auts = dict()
+    for playername, formula in [('sys', sysformula), ('test', testformula)]:
+        if preset == 'auto':
+            chosen, spot_aut = select_translation(formula, playername)
+        else:
+            chosen, spot_aut = preset, translate(formula, preset)
+        spot_auts[playername] = spot_aut
+        record[playername] = {"preset": chosen, "states": spot_aut.num_states(), "edges": spot_aut.num_edges(),
+                              "sound": is_sound(spot_aut, playername)}
+    record["sound"] = record["sys"]["sound"] and record["test"]["sound"]
+    record["product_states"] = spec_product(spot_auts['sys'], spot_auts['test']).num_states()
+
+    sys_aut, spot_aut_sys = get_automaton(sysformula, 'sys', preset=preset)
+    test_aut, spot_aut_test = get_automaton(testformula, 'test', preset=preset)
+    prod_aut = get_product_automaton(spot_aut_sys, spot_aut_test)
+    transys = TranSys(TransitionSystemInput(states, transitions, labels, init))
+    virtual, virtual_sys, map_G_to_S = sync_prods(transys, sys_aut, prod_aut, test_aut)
+    record["virtual"] = {"nodes": virtual.G_initial.number_of_nodes(), "edges": virtual.G_initial.number_of_edges()}
+    record["virtual_sys"] = {"nodes": virtual_sys.G_initial.number_of_nodes(), "edges": virtual_sys.G_initial.number_of_edges()}
+
+    profiler = Profiler()
+    result = solve(virtual, transys, prod_aut, virtual_sys, case=type, map_G_to_S=map_G_to_S, backend=backend, seed=0, profiler=profiler)
+    report = profiler.report()
+    record["model"] = report["sizes"].get("model", {})
+    record["flow"] = result[1] if result is not None else None
+    record["wall_time"] = report["wall_time"]
+    return record
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="automaton, graph and model sizes of a problem for each translation preset"
+    )
+    parser.add_argument("--filename", required=True, type=str, help="json problem file")
+    parser.add_argument("--presets", nargs="+", default=["auto"] + list(TRANSLATION_PRESETS))
+    parser.add_argument("--backend", default="gurobi", choices=["gurobi", "highs"], help="MILP solver backend")
+    parser.add_argument("--output", default=None, type=str, help="also write the records to this json file")
+    args = parser.parse_args()
+
+    test_data = extract_test_data(args.filename)
+    records = [preset_record(test_data, preset, args.backend) for preset in args.presets]
+
+    print('{0:<24} {1:>8} {2:>8} {3:>8} {4:>10} {5:>10} {6:>10} {7:>10} {8:>8}'.format(
+        'preset', 'sys', 'test', 'product', 'G nodes', 'G edges', 'variables', 'constrs', 'flow'))
+    for record in records:
+        model = record["model"]
+        variables = (model.get("n_bin_vars") or 0) + (model.get("n_cont_vars") or 0)
+        preset = record["preset"]
+        if preset == 'auto':
+            preset = 'auto ({0}/{1})'.format(record["sys"]["preset"], record["test"]["preset"])
+        print('{0:<24} {1:>8} {2:>8} {3:>8} {4:>10} {5:>10} {6:>10} {7:>10} {8:>8}{9}'.format(
+            preset, record["sys"]["states"], record["test"]["states"], record["product_states"],
+            record["virtual"]["nodes"], record["virtual"]["edges"], variables, model.get("n_constrs"),
+            record["flow"], '' if record["sound"] else ' *'))
+    if not all(record["sound"] for record in records):
+        print('* unsound translation (nondeterministic, or incomplete tester automaton)')
+
+    if args.output is not None:
+        if os.path.dirname(args.output) and not os.path.exists(os.path.dirname(args.output)):
+            os.makedirs(os.path.dirname(args.output))
+        with open(args.output, 'w') as fp:
+            json.dump(records, fp, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""Batch mode: solve many JSON problem files in a pool of worker processes."""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait
+
+AUTOMATA_CACHES = dict() # directory -> AutomatonCache of the worker process
+
+def job_files(source):
+    """
+    Problem files of a batch.
+
+    Args:
+        source: Directory (all .json files in it) or manifest file (one path per line, relative
+            to the manifest; empty lines and lines starting with # are skipped).
+
+    Returns:
+        files: List of paths.
+    """
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, '*.json')))
+    root = os.path.dirname(source)
+    files = []
+    with open(source, 'r') as fp:
+        for line in fp:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                files.append(line if os.path.isabs(line) else os.path.join(root, line))
+    return files
+
+def job_record(filename, status=None, error=None, wall_time=None):
+    return {"filename": filename, "status": status, "flow": None, "ncuts": None, "cuts": None, "error": error, "wall_time": wall_time}
+
+def run_job(filename, options):
+    """
+    Solve one problem file.
+
+    Returns:
+        record: Dictionary with the status ('opt' or 'error'), flow value, cut edges, wall time,
+            and the error or the profile report.
+    """
+    from floras.main import find_test_environment, cut_list
+    from floras.optimization.cache import ModelCache
+    from floras.components.automata_cache import AutomatonCache
+    from floras.profiling import Profiler
+    record = job_record(filename)
+    cache = ModelCache(options["cache"]) if options["cache"] is not None else None
+    automata_cache = None
+    if options["automata_cache"] is not None:
+        # one cache per worker, so that the translations stay in memory between jobs
+        if options["automata_cache"] not in AUTOMATA_CACHES:
+            AUTOMATA_CACHES[options["automata_cache"]] = AutomatonCache(options["automata_cache"])
+        automata_cache = AUTOMATA_CACHES[options["automata_cache"]]
+    profiler = Profiler(enabled=options["profile"], memory=options["profile_memory"])
+    t0 = time.time()
+    profiler.start()
+    try:
+        d, flow = find_test_environment(filename, backend=options["backend"], seed=options["seed"], cache=cache, profiler=profiler,
+                                         automata_cache=automata_cache, preset=options["translation"], model_options=options["model_options"])
+        cuts = cut_list(d)
+        record.update(status="opt", flow=flow, ncuts=len(cuts), cuts=cuts)
+    except Exception:
+        record.update(status="error", error=traceback.format_exc())
+    finally:
+        profiler.stop()
+    record["wall_time"] = time.time() - t0
+    if options["profile"]:
+        record["profile"] = profiler.report()
+    return record
+
+def quiet():
+    """
+    Discard the output of the process, including the solver output written by C code.
+    """
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    sys.stdout = open(os.devnull, 'w')
+
+def worker(conn, options):
+    """
+    Worker process: solve the files received on conn until None is received.
+    """
+    if options["quiet"]:
+        quiet()
+    import floras.main # import the pipeline once per worker
+    from floras.optimization import optimization
+    optimization.OPT_DATA_PATH = None # the workers share the working directory, the records have the results
+    conn.send("ready")
+    while True:
+        filename = conn.recv()
+        if filename is None:
+            break
+        conn.send(run_job(filename, options))
+
+
+class Batch:
+    """
+    Solves problem files in a pool of worker processes. The workers import the pipeline once
+    and solve one file at a time. A worker whose job exceeds the timeout is terminated and
+    replaced, and the job is recorded as timed out. Failed jobs are recorded and do not
+    stop the batch.
+
+    Args:
+        files: Problem files.
+        output: Path of the JSON-lines output, one record per job (in order of completion).
+        processes: Number of worker processes (default: number of CPUs).
+        timeout: Time limit per job in seconds (default None).
+        options: Dictionary of options of find_test_environment (backend, seed, cache, automata_cache, translation,
+            model_options, profile, profile_memory, quiet).
+    """
+    def __init__(self, files, output, processes=None, timeout=None, options=None):
+        self.files = files
+        self.output = output
+        self.processes = processes if processes is not None else (os.cpu_count() or 1)
+        self.timeout = timeout
+        self.options = dict({"backend": "gurobi", "seed": None, "cache": None, "automata_cache": None, "translation": "auto", "model_options": None, "profile": False, "profile_memory": False, "quiet": True}, **(options or {}))
+        # spawn: the Gurobi environment of the parent process must not be forked
+        self.context = multiprocessing.get_context('spawn')
+        self.workers = dict() # connection -> [process, filename, start time, ready]
+
+    def start_worker(self):
+        conn, child_conn = self.context.Pipe()
+        process = self.context.Process(target=worker, args=(child_conn, self.options))
+        process.start()
+        child_conn.close()
+        self.workers[conn] = [process, None, None, False]
+
+    def stop_worker(self, conn):
+        process = self.workers.pop(conn)[0]
+        process.terminate()
+        process.join()
+        conn.close()
+
+    def run(self):
+        """
+        Run all jobs and write their records.
+
+        Returns:
+            counts: Dictionary with the number of jobs per status.
+        """
+        dirname = os.path.dirname(self.output)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        pending = list(reversed(self.files))
+        counts = dict()
+        with open(self.output, 'w') as out:
+            def write(record):
+                counts[record["status"]] = counts.get(record["status"], 0) + 1
+                out.write(json.dumps(record) + '\n')
+                out.flush()
+
+            for k in range(min(self.processes, len(pending))):
+                self.start_worker()
+            try:
+                while pending or any(job[1] is not None for job in self.workers.values()):
+                    # assign jobs to idle workers
+                    for conn, job in self.workers.items():
+                        if job[3] and job[1] is None and pending:
+                            job[1], job[2] = pending.pop(), time.time()
+                            conn.send(job[1])
+                    busy = [conn for conn, job in self.workers.items() if job[1] is not None]
+                    wait_time = None
+                    if self.timeout is not None and busy:
+                        wait_time = max(0, min(self.workers[conn][2] + self.timeout for conn in busy) - time.time())
+                    for conn in wait([conn for conn, job in self.workers.items() if job[1] is not None or not job[3]], timeout=wait_time):
+                        process, filename, start, ready = self.workers[conn]
+                        try:
+                            record = conn.recv()
+                        except EOFError: # the worker died
+                            process.join()
+                            if not ready:
+                                raise RuntimeError('Batch worker failed to start (exit code {0}).'.format(process.exitcode))
+                            record = job_record(filename, "error", "worker exited with code {0}".format(process.exitcode), time.time() - start)
+                            self.stop_worker(conn)
+                            self.start_worker()
+                            write(record)
+                            continue
+                        if not ready: # the worker imported the pipeline
+                            self.workers[conn][3] = True
+                            continue
+                        self.workers[conn][1:3] = [None, None]
+                        write(record)
+                    if self.timeout is not None:
+                        now = time.time()
+                        for conn in [conn for conn, job in self.workers.items() if job[1] is not None and now - job[2] > self.timeout]:
+                            filename, start = self.workers[conn][1:3]
+                            self.stop_worker(conn)
+                            write(job_record(filename, "timeout", wall_time=now - start))
+                            if pending:
+                                self.start_worker()
+            finally:
+                for conn in list(self.workers):
+                    try:
+                        conn.send(None)
+                    except (BrokenPipeError, OSError):
+                        pass
+                    self.workers[conn][0].join(timeout=1)
+                    self.stop_worker(conn)
+        return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="from_json batch",
+        description="solve the json files in a directory or manifest"
+    )
+    parser.add_argument("source", type=str, help="directory of json files or manifest with one json file per line")
+    parser.add_argument("--output", default=os.path.join("log", "batch.jsonl"), type=str, help="JSON-lines file of the results")
+    parser.add_argument("--processes", default=None, type=int, help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--timeout", default=None, type=float, help="time limit per job in seconds")
+    parser.add_argument("--backend", default="gurobi", choices=["gurobi", "highs"], help="MILP solver backend")
+    parser.add_argument("--seed", default=None, type=int, help="solver seed (random if not given)")
+    parser.add_argument("--cache", default=None, type=str, help="directory of the cache of built models")
+    parser.add_argument("--automata-cache", default=None, type=str, help="directory of the cache of translated automata")
+    parser.add_argument("--translation", default="auto", type=str, help="translation preset of the automata (see from_json --help)")
+    parser.add_argument("--builder", default="loop", choices=["loop", "matrix"], help="MILP builder (see from_json --help)")
+    parser.add_argument("--aggregate-cuts", action="store_true", help="one cut variable per physical transition and its reverse")
+    parser.add_argument("--presolve", action="store_true", help="reduce the virtual product graph before building the MILP")
+    parser.add_argument("--warm-start", action="store_true", help="start the static MILP from a max-flow/min-cut solution")
+    parser.add_argument("--profile", action="store_true", help="add the time and memory of each stage to the records")
+    parser.add_argument("--profile-memory", action="store_true", help="with --profile, also trace the Python allocations of each stage (slows the stages down)")
+    parser.add_argument("--verbose", action="store_true", help="show the output of the jobs")
+    args = parser.parse_args(argv)
+
+    files = job_files(args.source)
+    options = {"backend": args.backend, "seed": args.seed, "cache": args.cache, "automata_cache": args.automata_cache, "translation": args.translation,
+               "model_options": {"builder": args.builder, "aggregate_cuts": args.aggregate_cuts, "presolve": args.presolve, "warm_start": args.warm_start},
+               "profile": args.profile, "profile_memory": args.profile_memory, "quiet": not args.verbose}
+    batch = Batch(files, args.output, processes=args.processes, timeout=args.timeout, options=options)
+    counts = batch.run()
+    print('{0} jobs: {1}'.format(len(files), ', '.join('{0} {1}'.format(count, status) for status, count in sorted(counts.items()))))
+    print('results written to {0}'.format(args.output))
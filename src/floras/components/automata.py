@@ -6,9 +6,25 @@ import numpy as np
 import spot
 import networkx as nx
 from collections import OrderedDict as od
-import re
 import os
-from floras.components.utils import powerset, neg, conjunction, disjunction
+from floras.components.utils import powerset
+
+# Options of spot.translate: 'complete' adds a rejecting sink state, 'small' and
+# 'deterministic' are spot's preferences, and 'low' skips the simulation-based reductions
+# of spot's postprocessing (used at the default 'high' level).
+TRANSLATION_PRESETS = od([
+    ('complete', ('Buchi', 'state-based', 'complete')),
+    ('deterministic-complete', ('Buchi', 'state-based', 'deterministic', 'complete')),
+    ('small', ('Buchi', 'state-based', 'small')),
+    ('deterministic', ('Buchi', 'state-based', 'deterministic')),
+    ('low', ('Buchi', 'state-based', 'small', 'low')),
+])
+# 'auto' translates with all presets and keeps the smallest sound automaton
+DEFAULT_PRESET = 'auto'
+
+# In-process memo of the specification products (HOA of both automata -> spot product)
+SPEC_PRODUCTS = od()
+MAX_SPEC_PRODUCTS = 64
 
 
 class Automaton:
@@ -21,15 +37,24 @@ class Automaton:
         q_init: the initial states,
         ap: the atomic propositions,
         delta: the transition function,
-        Acc: The set of acceptance conditions.
+        Acc: The set of acceptance conditions,
+        product_states: For a product automaton, the (sys, test) state pair of each state,
+        deterministic: If at most one transition is enabled for any state and valuation,
+        complete: If at least one transition is enabled for any state and valuation.
     """
-    def __init__(self, Q, qinit, ap, delta, Acc):
+    def __init__(self, Q, qinit, ap, delta, Acc, product_states=None, deterministic=False, complete=False):
         self.Q=Q
         self.qinit = qinit
         self.delta = delta
         self.ap = ap # Must be a list
         self.Sigma = powerset(ap)
         self.Acc = Acc
+        self.product_states = product_states
+        self.deterministic = deterministic
+        self.complete = complete
+        self.ap_index = {prop: k for k, prop in enumerate(self.ap)}
+        self.guards = self.compile_guards()
+        self.transition_table = dict() # (state, AP valuation bitmask) -> next state
 
     def print_transitions(self):
         """
@@ -38,6 +63,68 @@ class Automaton:
         for k, v in self.delta.items():
             print("out state and formula: ", k, " in state: ", v)
 
+    def compile_guards(self):
+        """
+        Group the transitions by outgoing state, keeping the order of delta.
+
+        Returns:
+            guards: Dictionary mapping each state to a list of (guard, next state) pairs.
+        """
+        guards = {q: [] for q in self.Q}
+        for (q, guard), q_next in self.delta.items():
+            guards.setdefault(q, []).append((guard, q_next))
+        return guards
+
+    def valuation_mask(self, propositions):
+        """
+        Encode the propositions as a bitmask over the automaton alphabet.
+        Propositions that are not in the alphabet cannot affect any guard and are ignored.
+
+        Args:
+            propositions: List of propositions.
+
+        Returns:
+            mask: Bit k is set if self.ap[k] is in propositions.
+        """
+        mask = 0
+        for prop in propositions:
+            k = self.ap_index.get(prop)
+            if k is not None:
+                mask |= 1 << k
+        return mask
+
+    def evaluate_guard(self, guard, mask):
+        """
+        Evaluate a transition guard under the valuation encoded by mask.
+
+        Args:
+            guard: Guard formula (or True).
+            mask: AP valuation bitmask.
+
+        Returns:
+            True if the valuation satisfies the guard, False if not, and None if the
+            guard cannot be evaluated directly (e.g., it uses APs outside the alphabet).
+        """
+        if guard is True or guard.is_tt():
+            return True
+        if guard.is_ff():
+            return False
+        if guard._is(spot.op_ap):
+            k = self.ap_index.get(guard)
+            if k is None:
+                return None
+            return bool(mask >> k & 1)
+        children = [self.evaluate_guard(child, mask) for child in guard]
+        if None in children:
+            return None
+        if guard._is(spot.op_Not):
+            return not children[0]
+        if guard._is(spot.op_And):
+            return all(children)
+        if guard._is(spot.op_Or):
+            return any(children)
+        return None
+
     def complement_negation(self, propositions):
         """
         Negation of all atomic propositions not listed in propositions.
@@ -48,38 +135,47 @@ class Automaton:
         and_prop = spot.formula.And(list(propositions))
         comp_prop = [] # Complementary propositions
         for k in range(len(self.ap)):
-            try:
-                if not spot.contains(self.ap[k], and_prop):
-                    comp_prop.append(spot.formula.Not(self.ap[k]))
-            except:
-                pdb.set_trace()
+            if not spot.contains(self.ap[k], and_prop):
+                comp_prop.append(spot.formula.Not(self.ap[k]))
         and_comp_prop = spot.formula.And(comp_prop)
         complete_formula = spot.formula.And([and_prop, and_comp_prop]) # Taking complement of complete formula
         return complete_formula
 
+    def find_transition(self, q0, mask, propositions):
+        """
+        Find the first transition out of q0 whose guard is satisfied by the valuation.
+        Guards that cannot be evaluated on the bitmask fall back to spot.contains.
+
+        Args:
+            q0: Initial state,
+            mask: AP valuation bitmask of the propositions,
+            propositions: List of propositions.
+        """
+        complete_formula = None
+        for guard, q_next in self.guards.get(q0, []):
+            satisfied = self.evaluate_guard(guard, mask)
+            if satisfied is None:
+                if complete_formula is None:
+                    complete_formula = self.complement_negation(propositions)
+                satisfied = spot.contains(guard, complete_formula)
+            if satisfied:
+                return q_next
+        return None
+
     def get_transition(self, q0, propositions):
         """
         Get the transition.
+        Each (state, AP valuation) pair is only evaluated once, later lookups are a table access.
 
         Args:
             q0: Initial state,
             propositions: List of propositions.
         """
-        and_prop = spot.formula.And(list(propositions))
-        transition = None
-        for k,v in self.delta.items():
-            if k[0] == q0:
-                complete_formula = self.complement_negation(propositions)
-                try:
-                    if k[1] == True:
-                        transition = v
-                        return transition
-                    if spot.contains(k[1], complete_formula):
-                        transition = v
-                        return transition
-                except:
-                    pdb.set_trace()
-        return None
+        mask = self.valuation_mask(propositions)
+        key = (q0, mask)
+        if key not in self.transition_table:
+            self.transition_table[key] = self.find_transition(q0, mask, propositions)
+        return self.transition_table[key]
 
     def save_plot(self, fn):
         '''
@@ -88,117 +184,173 @@ class Automaton:
         Args:
             fn: Name of the file to save the figure.
         '''
-        G = nx.DiGraph()
-        G.add_nodes_from(self.Q)
-        edges = []
-        for state_act, in_node in self.delta.items():
-            out_node = state_act[0]
-            act = state_act[1]
-            edge = (out_node, in_node)
-            edges.append(edge)
-        G.add_edges_from(edges)
-
-        G_agr = nx.nx_agraph.to_agraph(G)
-        G_agr.node_attr['style'] = 'filled'
-        G_agr.node_attr['gradientangle'] = 90
-
-        for i in G_agr.nodes():
-            n = G_agr.get_node(i)
-            n.attr['shape'] = 'circle'
-            n.attr['fillcolor'] = '#ffffff' # default color white
-            # n.attr['label'] = ''
-            try:
-                if n in list(self.Acc["sys"]) and n not in list(self.Acc["test"]):
-                    n.attr['fillcolor'] = '#ffb000' #yellow
-            except:
-                pass
-            try:
-                if n in list(self.Acc["sys"]):
-                    n.attr['fillcolor'] = '#ffb000' #yellow
-            except:
-                pass
-
-            try:
-                if n in list(self.Acc["test"]) and n not in list(self.Acc["sys"]):
-                    n.attr['fillcolor'] = '#648fff' # blue
-            except:
-                pass
-            try:
-                if n in list(self.Acc["test"]):
-                    n.attr['fillcolor'] = '#648fff' # blue
-            except:
-                pass
-            try:
-                if n in list(self.Acc["test"]) and n in list(self.Acc["sys"]):
-                    n.attr['fillcolor'] = '#ffb000' #yellow
-            except:
-                pass
-        if not os.path.exists("imgs"):
-            os.makedirs("imgs")
-        G_agr.draw("imgs/"+fn+"_aut.pdf",prog='dot')
+        from floras.components.plotting import save_automaton_plot
+        save_automaton_plot(self, fn)
 
 # Functions to take in spot formulas and return automaton object attributes:
-def get_automaton(formula_str, playername):
+def translate(formula_str, preset='complete'):
+    """
+    Translate an LTL formula into a state-based Buchi automaton.
+
+    Args:
+        formula_str: LTL formula.
+        preset: Name of the translation options in TRANSLATION_PRESETS (default 'complete').
+    """
+    return spot.translate(formula_str, *TRANSLATION_PRESETS[preset])
+
+def is_sound(spot_aut, playername):
+    """
+    Check if the product construction is exact with this automaton. The automaton must be a
+    deterministic state-based Buchi automaton with accepting states, since
+    Automaton.get_transition follows the first enabled transition. A tester automaton must also
+    be complete: product states in which the tester specification is violated can still be
+    sinks of the virtual product graph. A system automaton may leave out its rejecting sink,
+    since no sink of the virtual graphs can be reached from it.
+
+    Args:
+        spot_aut: Spot automaton.
+        playername: 'sys' or 'test'.
+    """
+    if not (spot_aut.acc().is_buchi() and spot_aut.prop_state_acc().is_true()):
+        return False
+    if not any(spot_aut.state_is_accepting(state) for state in range(spot_aut.num_states())):
+        return False
+    if not spot.is_deterministic(spot_aut):
+        return False
+    return playername != 'test' or spot.is_complete(spot_aut)
+
+def select_translation(formula_str, playername, presets=None):
+    """
+    Translate a formula with each preset and select the smallest sound automaton: the fewest
+    states, then the fewest edges, then the earlier preset. Formulas without a deterministic
+    Buchi automaton (e.g. F(G(a))) keep the 'complete' translation, and the product follows
+    the first enabled transition of the non-deterministic automaton as before.
+
+    Args:
+        formula_str: LTL formula.
+        playername: 'sys' or 'test'.
+        presets: Names of the presets to compare (default all TRANSLATION_PRESETS).
+
+    Returns:
+        preset: Name of the selected preset.
+        spot_aut: Selected spot automaton.
+    """
+    best = None
+    for k, preset in enumerate(presets if presets is not None else TRANSLATION_PRESETS):
+        spot_aut = translate(formula_str, preset)
+        if not is_sound(spot_aut, playername):
+            continue
+        size = (spot_aut.num_states(), spot_aut.num_edges(), k)
+        if best is None or size < best[0]:
+            best = (size, preset, spot_aut)
+    if best is None:
+        return 'complete', translate(formula_str, 'complete')
+    return best[1], best[2]
+
+def translate_for(formula_str, playername, preset=DEFAULT_PRESET):
+    """
+    Translate a formula with a preset, or select the smallest sound translation if preset is 'auto'.
+    """
+    if preset == 'auto':
+        return select_translation(formula_str, playername)[1]
+    return translate(formula_str, preset)
+
+def spec_product(spot_aut_sys, spot_aut_test):
+    """
+    Spot product of the system and tester automata, computed once per pair of automata in
+    this process.
+
+    Args:
+        spot_aut_sys: Spot system automaton.
+        spot_aut_test: Spot tester automaton.
+
+    Returns:
+        spec_prod: Spot product automaton.
+    """
+    key = (spot_aut_sys.to_str('hoa'), spot_aut_test.to_str('hoa'))
+    if key in SPEC_PRODUCTS:
+        SPEC_PRODUCTS.move_to_end(key)
+    else:
+        SPEC_PRODUCTS[key] = spot.product(spot_aut_sys, spot_aut_test)
+        if len(SPEC_PRODUCTS) > MAX_SPEC_PRODUCTS:
+            SPEC_PRODUCTS.popitem(last=False)
+    return SPEC_PRODUCTS[key]
+
+def get_automaton(formula_str, playername, cache=None, preset=DEFAULT_PRESET):
     """
     Get automaton from LTL formula.
 
     Args:
         formula_str: LTL formula.
         playername: Whether the automaton is for the system ('sys') or the tester ('test').
+        cache: AutomatonCache to look up and store the translation (default None).
+        preset: Translation preset, or 'auto' for the smallest sound translation (default 'auto').
     """
-    spot_aut = spot.translate(formula_str, 'Buchi', 'state-based', 'complete')
-    Q, qinit, tau, AP = construct_automaton_attr(spot_aut)
-    Acc = construct_Acc(spot_aut, player=playername)
-    aut = Automaton(Q, qinit, AP, tau, Acc)
+    if cache is not None:
+        return cache.get_automaton(formula_str, playername, preset)
+    spot_aut = translate_for(formula_str, playername, preset)
+    Q, qinit, tau, AP, acc_states = extract_automaton_data(spot_aut)
+    assert acc_states != [] # Check that the automaton has accepting states.
+    Acc = {playername: [get_state_str(state) for state in acc_states]}
+    aut = Automaton(Q, qinit, AP, tau, Acc, deterministic=spot.is_deterministic(spot_aut), complete=spot.is_complete(spot_aut))
     return aut, spot_aut
 
-def get_system_automaton(formula_str):
+def get_system_automaton(formula_str, cache=None, preset=DEFAULT_PRESET):
     """
     Get system automaton from LTL formula.
 
     Args:
         formula_str: LTL formula.
+        cache: AutomatonCache (default None).
+        preset: Translation preset (default 'auto').
 
     Returns:
         aut_sys: System automaton.
         spot_aut_sys: Spot system automaton.
     """
     playername="sys"
-    aut_sys, spot_aut_sys= get_automaton(formula_str, playername)
+    aut_sys, spot_aut_sys= get_automaton(formula_str, playername, cache=cache, preset=preset)
     return aut_sys, spot_aut_sys
 
-def get_tester_automaton(formula_str):
+def get_tester_automaton(formula_str, cache=None, preset=DEFAULT_PRESET):
     """
     Get tester automaton from LTL formula.
 
     Args:
         formula_str: LTL formula.
+        cache: AutomatonCache (default None).
+        preset: Translation preset (default 'auto').
 
     Returns:
         aut_test: Tester automaton.
         spot_aut_test: Spot tester automaton.
     """
     playername="test"
-    aut_test, spot_aut_test = get_automaton(formula_str, playername)
+    aut_test, spot_aut_test = get_automaton(formula_str, playername, cache=cache, preset=preset)
     return aut_test, spot_aut_test
 
-def get_product_automaton(spot_aut_sys, spot_aut_test):
+def get_product_automaton(spot_aut_sys, spot_aut_test, cache=None):
     """
     Get the specification product automaton.
 
     Args:
         spot_aut_sys: Spot object of system automaton.
         spot_aut_test: Spot object of tester automaton.
+        cache: AutomatonCache to look up and store the product (default None).
 
     Returns:
         aut_prod: Specification product automaton.
     """
-    spot_aut_prod = spot.product(spot_aut_sys, spot_aut_test)
+    if cache is not None:
+        return cache.get_product_automaton(spot_aut_sys, spot_aut_test)
+    spot_aut_prod = spec_product(spot_aut_sys, spot_aut_test)
 
     Q_prod, qinit_prod, tau_prod, AP_prod = construct_automaton_attr(spot_aut_prod)
-    Acc_prod = construct_product_Acc(spot_aut_sys, spot_aut_test)
+    Acc_prod = construct_product_Acc(spot_aut_sys, spot_aut_test, spec_prod=spot_aut_prod)
+    product_states = get_product_state_components(spot_aut_prod)
 
-    aut_prod = Automaton(Q_prod, qinit_prod, AP_prod, tau_prod, Acc_prod)
+    aut_prod = Automaton(Q_prod, qinit_prod, AP_prod, tau_prod, Acc_prod, product_states=product_states,
+                         deterministic=spot.is_deterministic(spot_aut_prod), complete=spot.is_complete(spot_aut_prod))
     return aut_prod
 
 def construct_Acc(spot_aut, player="sys"):
@@ -219,25 +371,28 @@ def construct_Acc(spot_aut, player="sys"):
     return Acc
 
 # Functions to construct the product automaton
-def get_prod_automaton(system_formula_str, tester_formula_str):
+def get_prod_automaton(system_formula_str, tester_formula_str, preset=DEFAULT_PRESET):
     """
     Construct the specification product automaton.
 
     Args:
         system_formula_str: LTL formula of system objective.
         tester_formula_str: LTL formula of test objective.
+        preset: Translation preset (default 'auto').
 
     Returns:
         aut_prod: Specification product automaton.
     """
-    spot_aut_sys = spot.translate(system_formula_str, 'Buchi', 'state-based', 'complete')
-    spot_aut_test = spot.translate(tester_formula_str, 'Buchi', 'state-based', 'complete')
-    spot_aut_prod = spot.product(spot_aut_sys, spot_aut_test)
+    spot_aut_sys = translate_for(system_formula_str, 'sys', preset)
+    spot_aut_test = translate_for(tester_formula_str, 'test', preset)
+    spot_aut_prod = spec_product(spot_aut_sys, spot_aut_test)
 
     Q_prod, qinit_prod, tau_prod, AP_prod = construct_automaton_attr(spot_aut_prod)
-    Acc_prod = construct_product_Acc(spot_aut_sys, spot_aut_test)
+    Acc_prod = construct_product_Acc(spot_aut_sys, spot_aut_test, spec_prod=spot_aut_prod)
+    product_states = get_product_state_components(spot_aut_prod)
 
-    aut_prod = Automaton(Q_prod, qinit_prod, AP_prod, tau_prod, Acc_prod)
+    aut_prod = Automaton(Q_prod, qinit_prod, AP_prod, tau_prod, Acc_prod, product_states=product_states,
+                         deterministic=spot.is_deterministic(spot_aut_prod), complete=spot.is_complete(spot_aut_prod))
     return aut_prod
 
 def construct_automaton_attr(spot_aut):
@@ -253,45 +408,68 @@ def construct_automaton_attr(spot_aut):
         tau: transitions,
         AP: atomic propositions.
     '''
-    nstates = count_automaton_states(spot_aut)
-    Q = [get_state_str(k) for k in range(nstates)]
-    qinit = get_initial_state(spot_aut)
-    tau = get_transitions(spot_aut)
+    Q, qinit, tau, AP, acc_states = extract_automaton_data(spot_aut)
+    return Q, qinit, tau, AP
+
+def extract_automaton_data(spot_aut):
+    '''
+    Walk the states and edges of the spot automaton once and collect all
+    attributes needed to build an Automaton object.
+
+    Args:
+        spot_aut: Spot automaton.
 
+    Returns:
+        Q: states,
+        qinit: initial state,
+        tau: transitions,
+        AP: atomic propositions,
+        acc_states: accepting states (as state numbers).
+    '''
+    bdd_dict = spot_aut.get_dict()
     AP = get_APs(spot_aut)
-    return Q, qinit, tau, AP
+    Q = [get_state_str(k) for k in range(spot_aut.num_states())]
+    qinit = get_initial_state(spot_aut)
 
-def count_automaton_states(spot_aut):
+    tau = {}
+    acc_states = []
+    formula_cache = {} # Guards are shared between edges, only convert each BDD once
+    for state in range(spot_aut.num_states()):
+        qout_st = Q[state]
+        if spot_aut.state_is_accepting(state):
+            acc_states.append(state)
+        for edge in spot_aut.out(state):
+            cond_id = edge.cond.id()
+            if cond_id not in formula_cache:
+                formula_cache[cond_id] = edge_formula(edge.cond, bdd_dict)
+            tau[(qout_st, formula_cache[cond_id])] = Q[edge.dst]
+    return Q, qinit, tau, AP, acc_states
+
+def edge_formula(cond, bdd_dict):
     '''
+    Convert the BDD guard of an edge into a spot formula.
+
     Args:
-        spot_aut: Spot automaton
+        cond: BDD guard of the edge.
+        bdd_dict: BDD dictionary of the automaton.
 
     Returns:
-        nstates: Number of states in the automaton
+        formula: Guard as spot formula, or True if the edge is unconditional.
     '''
-    hoa_body = get_hoa_body(spot_aut)
-    nstates = 0
-    for line in hoa_body:
-        if 'State:' in line:
-            nstates += 1
-    return nstates
-
-def get_hoa_body(spot_aut):
-    """
-    Parse the body of a hoa string.
+    formula = spot.bdd_to_formula(cond, bdd_dict)
+    if formula.is_tt():
+        return True
+    return formula
 
+def count_automaton_states(spot_aut):
+    '''
     Args:
         spot_aut: Spot automaton
 
     Returns:
-        hoa_body: Body of hoa string between the --BODY-- and --END-- lines
-    """
-    spot_aut_str = spot_aut.to_str('hoa')
-    lines = spot_aut_str.split('\n')
-    body_line = lines.index("--BODY--")
-    end_line = lines.index("--END--")
-    hoa_body = [lines[k] for k in range(len(lines)) if k > body_line and k < end_line]
-    return hoa_body
+        nstates: Number of states in the automaton
+    '''
+    return spot_aut.num_states()
 
 def get_state_str(state):
     return "q"+str(state)
@@ -312,13 +490,8 @@ def get_initial_state(spot_aut):
     Returns:
         init_state: Initial state of the automaton.
     """
-    spot_aut_str = spot_aut.to_str('hoa')
-    lines = spot_aut_str.split('\n')
-    for line in lines:
-        if 'Start:' in line:
-            init_state=read_state(line.split()[1])
-            assert isinstance(init_state, int)
-            break
+    init_state = spot_aut.get_init_state_number()
+    assert isinstance(init_state, int)
     init_state = get_state_str(init_state)
     return init_state
 
@@ -332,114 +505,9 @@ def get_transitions(spot_aut):
     Returns:
         tau: Transitions in the automaton
     """
-    formula_dict = get_formula_dict(spot_aut)
-    hoa = get_hoa_body(spot_aut)
-    tau = {}
-    for line in hoa:
-        if 'State:' in line:
-            out_state=line.split()[1]
-            qout_st = get_state_str(out_state)
-        else:
-            cnf_str, qin_st, transition_acc_conditions = parse_hoa_transition_str(line)
-            formula = parse_cnf_str(cnf_str, formula_dict)
-            tau[(qout_st, formula)] = qin_st
+    Q, qinit, tau, AP, acc_states = extract_automaton_data(spot_aut)
     return tau
 
-def get_formula_dict(spot_aut):
-    '''
-    Get formula dict from a list of spot atomic propositions.
-    Formula dict is necessary for interpreting the atomic propositions.
-
-    Args:
-        spot_aut: Spot automaton
-
-    Returns:
-        formula_dict: Dictionary used in the automaton.
-    '''
-    AP = get_APs(spot_aut)
-    formula_dict = {"t": True}
-    num_AP = len(AP)
-    for k in range(num_AP):
-        formula_dict.update({str(k): AP[k]}) # Adding: {"k": AP[k]}
-        formula_dict.update({"!"+str(k): neg(AP[k])}) # Adding: {"!k": neg(AP[k])}
-    return formula_dict
-
-def parse_hoa_transition_str(line):
-    '''
-    Function separating the hoa line into the cnf_portion, the incoming state, and
-    any information on the accepting condition
-
-    Args:
-        line: Line with transition formula, input state, and transition acceptance as a string
-
-    Returns:
-        cnf_str: CNF formula,
-        qin_st: Incoming state string,
-        transition_acc_conditions: List of accepting conditions (if any)
-    '''
-    assert "[" in line
-    assert "]" in line
-    transition_acc_conditions = None # Default
-
-    # CNF formula embedded within the first occurence of [ and the last occurence of ]
-    cnf_str = line[line.find("[")+1: line.rfind("]")]
-
-    # The rest of the string contains information on the incoming state, as well as any accepting
-    # condition properties of that state.
-    in_state_and_transition_acc = line[line.rfind("]")+1 :].split()
-    in_state = read_state(in_state_and_transition_acc[0])
-    qin_st = get_state_str(in_state)
-
-    # See if there are any accepting conditions to catch:
-    if len(in_state_and_transition_acc) > 1:
-        transition_acc_conditions = in_state_and_transition_acc[1:]
-    return cnf_str, qin_st, transition_acc_conditions
-
-def parse_cnf_str(cnf_str, formula_dict):
-    '''
-    Unpacking a string cnf formula into a list of conjunctive formulas, and then parsing each of those
-    conjunctive formulas separately.
-
-    Args:
-        cnf_str: CNF formula
-        formula_dict: Dictionary used in the automaton
-
-    Returns:
-        formula: Parsed formula
-    '''
-    conj_str_list = [x.strip() for x in re.split(r"\|", cnf_str)]
-
-    # If no disjunctions, parse the conjunctive string into spot and return
-    if len(conj_str_list) == 1:
-        formula = parse_conjunction_str(conj_str_list[0], formula_dict)
-    else:
-        conj_formula_list = []
-        for conj_str in conj_str_list:
-            conj_formula = parse_conjunction_str(conj_str, formula_dict)
-            conj_formula_list.append(conj_formula)
-        formula = disjunction(conj_formula_list)
-    return formula
-
-def parse_conjunction_str(conj_str, formula_dict):
-    """
-    Args:
-        conj_str: String of cunjunctive formulas
-        formula_dict: Formulas used in automaton
-
-    Returns:
-        formula: Formula in Spot form
-    """
-    spot_prop_list = []
-    prop_list = re.split(r"[\[&\]]", conj_str)
-    prop_list = list(filter(None, prop_list))
-    for prop_str in prop_list:
-        spot_prop_list.append(formula_dict[prop_str])
-    if len(spot_prop_list) > 1:
-        formula = conjunction(spot_prop_list)
-    else:
-        formula = spot_prop_list[0]
-    return formula
-
 def get_APs(spot_aut):
     '''
     Return a list of spot atomic propositions in a Spot Buchi automaton.
@@ -450,44 +518,31 @@ def get_APs(spot_aut):
     Returns:
         AP: Atomic propositions used in automaton.
     '''
-    spot_aut_str = spot_aut.to_str('hoa')
-    lines = spot_aut_str.split('\n')
-    AP = []
-    for line in lines:
-        if 'AP:' in line:
-            parse_line = line.split()[1:]
-            num_AP = int(parse_line[0])
-
-            for k in range(1, len(parse_line)):
-                ap_str = re.findall(r'"(.*?)"', parse_line[k])[0]
-                assert isinstance(ap_str, str)
-
-                # "Construct spot AP"
-                ap = spot.formula.ap(ap_str)
-                AP.append(ap)
-            break
+    AP = list(spot_aut.ap())
     return AP
 
-def construct_product_Acc(spot_aut_sys, spot_aut_test):
+def construct_product_Acc(spot_aut_sys, spot_aut_test, spec_prod=None):
     '''
     Return the accepting state dictionary for the synchronous product of the system and tester acceptances.
 
     Args:
         spot_aut_sys: Spot system automaton
         spot_aut_test: Spot test automaton
+        spec_prod: Spot product of both automata (computed if not given)
 
     Returns:
         Acc: Dictionary of accepting states for 'sys' and 'test'
     '''
     Acc = dict()
-    spec_prod = spot.product(spot_aut_sys, spot_aut_test)
+    if spec_prod is None:
+        spec_prod = spec_product(spot_aut_sys, spot_aut_test)
 
     sys_prod_acc_states_str = []
     test_prod_acc_states_str = []
 
     # Individual accepting states
-    sys_acc_states = get_acc_states(spot_aut_sys)
-    test_acc_states = get_acc_states(spot_aut_test)
+    sys_acc_states = set(get_acc_states(spot_aut_sys))
+    test_acc_states = set(get_acc_states(spot_aut_test))
 
     # Product state dictionary and list:
     product_states, product_states_dict = get_product_states(spec_prod)
@@ -527,11 +582,20 @@ def get_product_states(spec_prod):
         product_states_dict.update({prod: k})
     return product_states, product_states_dict
 
+def get_product_state_components(spec_prod):
+    '''
+    Args:
+        spec_prod: Specification product automaton.
+
+    Returns:
+        product_states: dictionary mapping each product state to its (sys, test) state pair (as state strings)
+    '''
+    product_states, product_states_dict = get_product_states(spec_prod)
+    return {get_state_str(k): (get_state_str(pair[0]), get_state_str(pair[1])) for k, pair in enumerate(product_states)}
+
 def get_acc_states(spot_aut):
     '''
-    Return a list of accepting states in the spot_automaton by parsing the body of the automaton
-    In the prefix of the hoa_string, the succeeding portion of Acc refers to the number of accepting
-    conditions in the automaton.
+    Return a list of accepting states in the spot_automaton.
 
     Args:
         spot_aut: Spot automaton
@@ -539,14 +603,6 @@ def get_acc_states(spot_aut):
     Returns:
         acc_states: Accepting states of the automaton.
     '''
-    acc_states = []
-    hoa_body = get_hoa_body(spot_aut)
-    for line in hoa_body:
-        if 'State:' in line:
-            parse_line = line.split()
-            state = parse_line[1]
-            if len(parse_line) > 2:
-                " If an acceptance condition is specified; might not be the best way"
-                acc_states.append(read_state(state))
+    acc_states = [state for state in range(spot_aut.num_states()) if spot_aut.state_is_accepting(state)]
     assert acc_states != [] # Check that the algorithm worked.
     return acc_states
@@ -0,0 +1,200 @@
+"""
+On-disk cache of the LTL-to-Buchi translations and specification products, for specifications
+that are reused across many transition systems.
+"""
+import os
+import json
+import hashlib
+import spot
+from collections import OrderedDict as od
+from floras.components.automata import (Automaton, TRANSLATION_PRESETS, DEFAULT_PRESET, translate_for, spec_product,
+                                        extract_automaton_data, construct_product_Acc, get_product_state_components,
+                                        get_state_str)
+
+# Bump when the stored fields change, to invalidate old entries
+CACHE_VERSION = 1
+
+def normalize_formula(formula_str):
+    """
+    Normalized form of an LTL formula: spot parses the formula into its canonical representation
+    (e.g., operands of & and | are ordered), so 'F(b)&F(a)' and 'F a & F b' have the same key.
+    """
+    return str(spot.formula(formula_str))
+
+def encode_automaton(spot_aut, Q, qinit, AP, tau):
+    """
+    JSON-serializable fields of an automaton: the HOA of the spot automaton, the states, the
+    atomic propositions and the transitions, with the guards as formula strings (None for True).
+    """
+    return {"hoa": spot_aut.to_str('hoa'),
+            "Q": Q,
+            "qinit": qinit,
+            "AP": [str(ap) for ap in AP],
+            "tau": [[q, None if guard is True else str(guard), q_next] for (q, guard), q_next in tau.items()],
+            "deterministic": spot.is_deterministic(spot_aut),
+            "complete": spot.is_complete(spot_aut)}
+
+def decode_automaton(record):
+    """
+    Parse the atomic propositions and guards of a stored record back into spot formulas.
+    """
+    record = dict(record)
+    record["AP"] = [spot.formula(ap) for ap in record["AP"]]
+    record["tau"] = {(q, True if guard is None else spot.formula(guard)): q_next for q, guard, q_next in record["tau"]}
+    return record
+
+
+class AutomatonCache:
+    """
+    Content-addressed cache of automata. A translation is keyed by the normalized formula, the
+    translation preset and its options (and the player for 'auto') and the spot version, and stores the HOA with the extracted Automaton
+    fields. A specification product is keyed by the HOA of both automata. Entries are JSON files,
+    the least recently used ones are evicted when the cache grows beyond its size limit. Entries
+    read or computed in this process are also kept in memory.
+
+    Args:
+        root: Cache directory (default 'cache/automata').
+        max_bytes: Size limit of the cache in bytes (default 64 MB).
+        max_memory: Number of entries kept in memory (default 256).
+    """
+    def __init__(self, root=os.path.join('cache', 'automata'), max_bytes=2**26, max_memory=256):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_memory = max_memory
+        self.memory = od() # key -> decoded record (with the spot automaton for translations)
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        os.makedirs(root, exist_ok=True) # also created by other processes
+
+    def key(self, kind, *parts):
+        content = {"version": CACHE_VERSION, "spot": spot.version(), "kind": kind, "parts": list(parts)}
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+    def entry(self, key):
+        return os.path.join(self.root, key + '.json')
+
+    def __contains__(self, key):
+        return key in self.memory or os.path.exists(self.entry(key))
+
+    def remember(self, key, record):
+        self.memory[key] = record
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_memory:
+            self.memory.popitem(last=False)
+
+    def lookup(self, key, compute):
+        """
+        Decoded record of key from memory or disk, or computed with compute() and stored.
+        """
+        if key in self.memory:
+            self.stats["memory_hits"] += 1
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        path = self.entry(key)
+        record = None
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as fp:
+                    record = json.load(fp)
+                os.utime(path) # mark as recently used
+                self.stats["disk_hits"] += 1
+            except (OSError, ValueError): # evicted or partially written by another process
+                record = None
+        if record is None:
+            self.stats["misses"] += 1
+            record = compute()
+            self.put(key, record)
+        record = decode_automaton(record)
+        self.remember(key, record)
+        return record
+
+    def put(self, key, record):
+        """
+        Store a record, then evict entries beyond the size limit.
+        """
+        path = self.entry(key)
+        tmp = '{0}.tmp{1}'.format(path, os.getpid())
+        with open(tmp, 'w') as fp:
+            json.dump(record, fp)
+        os.replace(tmp, path)
+        self.evict(keep=key)
+
+    def get_automaton(self, formula_str, playername, preset=DEFAULT_PRESET):
+        """
+        Automaton of an LTL formula (see automata.get_automaton).
+
+        Returns:
+            aut: Automaton with the accepting states for playername.
+            spot_aut: Spot automaton.
+        """
+        translated = []
+        def compute():
+            spot_aut = translate_for(formula_str, playername, preset)
+            translated.append(spot_aut)
+            Q, qinit, tau, AP, acc_states = extract_automaton_data(spot_aut)
+            record = encode_automaton(spot_aut, Q, qinit, AP, tau)
+            record["acc_states"] = acc_states
+            return record
+
+        if preset == 'auto': # the selection depends on the player and on the candidates
+            options = [playername, list(TRANSLATION_PRESETS.items())]
+        else:
+            options = list(TRANSLATION_PRESETS[preset])
+        record = self.lookup(self.key('translation', preset, options, normalize_formula(formula_str)), compute)
+        if "spot_aut" not in record: # kept in memory with the record
+            record["spot_aut"] = translated[0] if translated else spot.automaton(record["hoa"])
+        assert record["acc_states"] != [] # Check that the automaton has accepting states.
+        Acc = {playername: [get_state_str(state) for state in record["acc_states"]]}
+        aut = Automaton(record["Q"], record["qinit"], record["AP"], record["tau"], Acc,
+                        deterministic=record["deterministic"], complete=record["complete"])
+        return aut, record["spot_aut"]
+
+    def get_product_automaton(self, spot_aut_sys, spot_aut_test):
+        """
+        Specification product automaton (see automata.get_product_automaton).
+        """
+        def compute():
+            spot_aut_prod = spec_product(spot_aut_sys, spot_aut_test)
+            Q, qinit, tau, AP, acc_states = extract_automaton_data(spot_aut_prod)
+            record = encode_automaton(spot_aut_prod, Q, qinit, AP, tau)
+            record["Acc"] = construct_product_Acc(spot_aut_sys, spot_aut_test, spec_prod=spot_aut_prod)
+            record["product_states"] = get_product_state_components(spot_aut_prod)
+            return record
+
+        record = self.lookup(self.key('product', spot_aut_sys.to_str('hoa'), spot_aut_test.to_str('hoa')), compute)
+        return Automaton(record["Q"], record["qinit"], record["AP"], record["tau"],
+                         {player: list(states) for player, states in record["Acc"].items()},
+                         product_states={q: tuple(pair) for q, pair in record["product_states"].items()},
+                         deterministic=record["deterministic"], complete=record["complete"])
+
+    def evict(self, keep=None):
+        """
+        Remove the least recently used entries until the cache fits in max_bytes.
+        The entry keep (the one just stored) is not removed.
+        """
+        paths = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                paths.append((os.path.getmtime(path), os.path.getsize(path), name))
+            except OSError: # removed by another process
+                pass
+        paths.sort()
+        total = sum(size for mtime, size, name in paths)
+        for mtime, size, name in paths:
+            if total <= self.max_bytes:
+                break
+            if name == '{0}.json'.format(keep) or not name.endswith('.json'):
+                continue
+            total -= size
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                pass
+
+    def clear(self):
+        """
+        Remove all entries, on disk and in memory.
+        """
+        self.memory.clear()
+        for name in os.listdir(self.root):
+            os.remove(os.path.join(self.root, name))
@@ -0,0 +1,58 @@
+"""Map from the product nodes to the nodes of another product with the same system state."""
+import numpy as np
+
+class NodeMap:
+    """
+    Map from the nodes of G to the nodes of S with the same system state.
+    The S nodes are grouped by system state in compressed sparse row form:
+    the nodes of group g are indices[offsets[g]:offsets[g+1]].
+
+    Args:
+        offsets: Start of each group in indices (length: number of groups + 1).
+        indices: S node ids sorted by group.
+        group_of: Group of each G node id (-1 if no S node has its system state).
+    """
+    def __init__(self, offsets, indices, group_of):
+        self.offsets = offsets
+        self.indices = indices
+        self.group_of = group_of
+
+    def __getitem__(self, node):
+        group = self.group_of[node]
+        if group < 0:
+            return self.indices[:0]
+        return self.indices[self.offsets[group]:self.offsets[group+1]]
+
+    def __len__(self):
+        return len(self.group_of)
+
+def build_node_map(G_states, S_states):
+    """
+    Group the S nodes by system state and look up the group of every G node.
+
+    Args:
+        G_states: Iterable of (G node id, system state) pairs.
+        S_states: Iterable of (S node id, system state) pairs.
+
+    Returns:
+        map_G_to_S: NodeMap from G node ids to S node ids.
+    """
+    group_ids = dict() # system state -> group
+    S_nodes = []
+    S_groups = []
+    for node, state in S_states:
+        S_nodes.append(node)
+        S_groups.append(group_ids.setdefault(state, len(group_ids)))
+    S_nodes = np.asarray(S_nodes, dtype=np.int64)
+    S_groups = np.asarray(S_groups, dtype=np.int64)
+
+    indices = S_nodes[np.argsort(S_groups, kind='stable')]
+    offsets = np.zeros(len(group_ids)+1, dtype=np.int64)
+    np.cumsum(np.bincount(S_groups, minlength=len(group_ids)), out=offsets[1:])
+
+    G_states = list(G_states)
+    n_G = max((node for node, state in G_states), default=-1) + 1
+    group_of = np.full(n_G, -1, dtype=np.int64)
+    for node, state in G_states:
+        group_of[node] = group_ids.get(state, -1)
+    return NodeMap(offsets, indices, group_of)
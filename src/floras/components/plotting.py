@@ -0,0 +1,118 @@
+"""
+Plots of the transition system, the automata and the virtual graphs with graphviz.
+Imported on demand by the save_plot methods, so that solving does not load the plotting stack.
+"""
+import os
+import networkx as nx
+
+# node colors
+WHITE = '#ffffff'
+YELLOW = '#ffb000' # system acceptance (sink)
+BLUE = '#648fff' # tester acceptance (intermediate)
+PINK = '#dc267f' # source
+
+def draw(G_agr, fn):
+    """
+    Draw a graphviz graph to imgs/fn.pdf.
+    """
+    if not os.path.exists("imgs"):
+        os.makedirs("imgs")
+    G_agr.draw("imgs/"+fn+".pdf",prog='dot')
+
+def styled_agraph(G):
+    G_agr = nx.nx_agraph.to_agraph(G)
+    G_agr.node_attr['style'] = 'filled'
+    G_agr.node_attr['gradientangle'] = 90
+    return G_agr
+
+def save_transys_plot(transys, fn):
+    """
+    Save a pdf of the graph of the transition system (also stored in transys.G).
+
+    Args:
+        transys: TranSys object.
+        fn: Filename to store the figure under `imgs/fn.pdf'.
+    """
+    transys.G = nx.DiGraph()
+    transys.G.add_nodes_from(list(transys.S))
+    edge_attr = dict()
+    for (out_node, act), in_node in transys.E.items():
+        edge_attr[(out_node, in_node)] = {"act": act}
+    transys.G.add_edges_from(edge_attr)
+    nx.set_edge_attributes(transys.G, edge_attr)
+
+    G_agr = styled_agraph(transys.G)
+    for i in G_agr.nodes():
+        n = G_agr.get_node(i)
+        n.attr['fillcolor'] = 'white'
+        n.attr['shape'] = 'circle'
+    draw(G_agr, fn)
+
+def save_automaton_plot(aut, fn):
+    """
+    Save a pdf of the automaton, with the system accepting states in yellow and the
+    tester accepting states in blue.
+
+    Args:
+        aut: Automaton object.
+        fn: Filename to store the figure under `imgs/fn_aut.pdf'.
+    """
+    G = nx.DiGraph()
+    G.add_nodes_from(aut.Q)
+    G.add_edges_from((state_act[0], in_node) for state_act, in_node in aut.delta.items())
+
+    acc_sys = list(aut.Acc.get("sys", []))
+    acc_test = list(aut.Acc.get("test", []))
+    G_agr = styled_agraph(G)
+    for i in G_agr.nodes():
+        n = G_agr.get_node(i)
+        n.attr['shape'] = 'circle'
+        n.attr['fillcolor'] = WHITE
+        if n in acc_test:
+            n.attr['fillcolor'] = BLUE
+        if n in acc_sys:
+            n.attr['fillcolor'] = YELLOW
+    draw(G_agr, fn+"_aut")
+
+def product_node_color(prod, state):
+    """
+    Color of a product state: sinks in yellow, intermediate states in blue, the source in pink.
+    """
+    if state in prod.sink_set:
+        return YELLOW
+    if state in prod.int_set:
+        return BLUE
+    if state in prod.src_set:
+        return PINK
+    return WHITE
+
+def product_dot_graph(prod, graph=None):
+    """
+    Graphviz graph of a virtual graph, colored by source, intermediate and sink nodes.
+
+    Args:
+        prod: Product object.
+        graph: Networkx graph on the node ids of prod (default prod.G).
+    """
+    if graph is None:
+        graph = prod.G
+    # only the states with transitions are colored
+    states = set(state for state_act, in_node in prod.E.items() for state in (state_act[0], in_node))
+    colors = {prod.Sdict[state]: product_node_color(prod, state) for state in states}
+    G_agr = styled_agraph(graph)
+    for i in G_agr.nodes():
+        n = G_agr.get_node(i)
+        n.attr['shape'] = 'circle'
+        n.attr['fillcolor'] = colors.get(int(n), WHITE) # agraph node names are strings
+        n.attr['label']= ''
+    return G_agr
+
+def save_product_plot(prod, fn):
+    """
+    Save a pdf of the virtual graph.
+
+    Args:
+        prod: Product object.
+        fn: Filename to store the figure under `imgs/fn.pdf'.
+    """
+    draw(product_dot_graph(prod, prod.G_initial), fn)
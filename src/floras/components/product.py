@@ -1,17 +1,12 @@
 """Contains Product class for virtual product graph and virtual system graph."""
 import sys
 sys.path.append("..")
-import spot
-from matplotlib import pyplot as plt
-from ipdb import set_trace as st
 from collections import OrderedDict as od
 import os
 import networkx as nx
-from itertools import product
 from floras.components.transition_system import TranSys
 from floras.components.automata import Automaton
-
-spot.setup(show_default='.tvb')
+from floras.components.node_map import build_node_map
 
 class Product(TranSys):
     """
@@ -31,12 +26,10 @@ class Product(TranSys):
         self.automaton=spec_prod_automaton
         self.G_initial = None
         self.G = None
-        self.S = list(product(product_transys.S, spec_prod_automaton.Q))
-        self.Sdict = od()
-        self.reverse_Sdict = od()
-        for k in range(len(self.S)):
-            self.Sdict[self.S[k]] = "s"+str(k)
-            self.reverse_Sdict["s"+str(k)] = self.S[k]
+        self.S = []
+        # Node ids are allocated when a product state is discovered in pruned_sync_prod
+        self.Sdict = dict() # product state -> node id
+        self.reverse_Sdict = [] # node id -> product state
         self.A = product_transys.A
         self.I = [(init, spec_prod_automaton.qinit) for init in product_transys.I]
         self.AP = spec_prod_automaton.Q
@@ -45,35 +38,122 @@ class Product(TranSys):
         for e_out, e_in in self.E.items():
             print("node out: " + str(e_out) +  " node in: " + str(e_in))
 
+    def node_id(self, state):
+        """
+        Get the node id of a product state, allocating the next integer id on first discovery.
+
+        Args:
+            state: Product state (s, q).
+
+        Returns:
+            k: Node id of the product state.
+        """
+        k = self.Sdict.get(state)
+        if k is None:
+            k = len(self.reverse_Sdict)
+            self.Sdict[state] = k
+            self.reverse_Sdict.append(state)
+        return k
+
+    def successor_index(self):
+        """
+        Index the transition system edges by outgoing state.
+
+        Returns:
+            succ: Dictionary mapping each state to a list of (action, next state) pairs.
+        """
+        succ = {s: [] for s in self.transys.S}
+        for (s, a), t in self.transys.E.items():
+            succ.setdefault(s, []).append((a, t))
+        return succ
+
     def pruned_sync_prod(self):
-        self.construct_labels()
+        """
+        Construct the reachable part of the product. Calling it again after the transition
+        system changed keeps the node ids of the product states that were already discovered.
+        """
         self.E = dict()
-        aut_state_edges = [(si[0], sj) for si, sj in self.automaton.delta.items()]
+        succ = self.successor_index()
+        actions = set(self.transys.A)
 
-        nodes_to_add = []
         s0 = self.transys.I[0]
         q0 = self.automaton.qinit
-        nodes_to_add.append((s0, q0))
-        nodes_to_keep = []
-        nodes_to_keep.append((s0, q0))
+        nodes_to_add = [(s0, q0)]
+        nodes_to_keep = [(s0, q0)]
+        visited = {(s0, q0)}
+        self.node_id((s0, q0))
 
         while len(nodes_to_add) > 0:
             next_nodes = []
             for (s,q) in nodes_to_add:
-                for a in self.transys.A:
-                    if (s,a) in list(self.transys.E.keys()):
-                        t = self.transys.E[(s,a)]
-                        for p in self.automaton.Q:
-                            if (q,p) in aut_state_edges:
-                                label = self.transys.L[t]
-                                if self.automaton.get_transition(q, label) == p:
-                                    self.E[((s,q), a)] = (t,p)
-                                    if (t,p) not in nodes_to_keep:
-                                        nodes_to_keep.append((t,p))
-                                        next_nodes.append((t,p))
+                for a, t in succ[s]:
+                    if a not in actions:
+                        continue
+                    p = self.automaton.get_transition(q, self.transys.L[t])
+                    if p is not None:
+                        self.E[((s,q), a)] = (t,p)
+                        if (t,p) not in visited:
+                            visited.add((t,p))
+                            self.node_id((t,p))
+                            nodes_to_keep.append((t,p))
+                            next_nodes.append((t,p))
             nodes_to_add = next_nodes
 
         self.S = nodes_to_keep
+        self.construct_graphs()
+
+    def project(self, sys_automaton, test_automaton=None):
+        """
+        Derive the virtual system graph from this virtual product graph by replacing
+        each product automaton state with its system automaton component.
+        The projection equals the synchronous product with the system automaton if the
+        system automaton is deterministic and the tester automaton is complete: every
+        system transition then has a product transition, and the system transitions that
+        are left out of an incomplete system automaton are left out of both graphs.
+
+        Args:
+            sys_automaton: System automaton that is a component of self.automaton.
+            test_automaton: Tester automaton that is a component of self.automaton (default None,
+                then the product automaton has to be complete).
+
+        Returns:
+            virtual_sys: Virtual system graph, or None if the projection is not exact.
+        """
+        components = self.automaton.product_states
+        test_complete = test_automaton.complete if test_automaton is not None else self.automaton.complete
+        if components is None or not sys_automaton.deterministic or not test_complete:
+            return None
+        virtual_sys = Product(self.transys, sys_automaton)
+        virtual_sys.E = dict()
+        for (s,q) in self.S:
+            node = (s, components[q][0])
+            if node not in virtual_sys.Sdict:
+                virtual_sys.node_id(node)
+                virtual_sys.S.append(node)
+        for ((s,q), a), (t,p) in self.E.items():
+            virtual_sys.E[((s, components[q][0]), a)] = (t, components[p][0])
+        virtual_sys.construct_graphs()
+        return virtual_sys
+
+    def map_to(self, virtual_sys):
+        """
+        Map every node of this graph to the nodes of virtual_sys with the same system state.
+
+        Args:
+            virtual_sys: Virtual system graph.
+
+        Returns:
+            map_G_to_S: NodeMap from node ids to virtual_sys node ids.
+        """
+        G_states = ((k, s) for k, (s,q) in enumerate(self.reverse_Sdict))
+        S_states = ((k, s) for k, (s,q) in enumerate(virtual_sys.reverse_Sdict))
+        return build_node_map(G_states, S_states)
+
+    def construct_graphs(self):
+        """
+        Build the graphs and the source, intermediate and sink nodes from S and E.
+        """
+        self.construct_labels()
         self.G_initial = nx.DiGraph()
         nodes = []
         for node in self.S:
@@ -97,84 +177,64 @@ class Product(TranSys):
 
     def identify_SIT(self):
         self.src = [s for s in self.I]
-        try:
-            self.int = [s for s in self.S if s[1] in self.automaton.Acc["test"]]
-        except:
-            self.int=[]
-        self.sink = [s for s in self.S if s[1] in self.automaton.Acc["sys"]]
-
-    def process_nodes(self, node_list):
-        for node in node_list:
-            node_st = self.Sdict[node]
-            if node in self.sink and node not in self.int:
-                if node_st not in self.plt_sink_only:
-                    self.plt_sink_only.append(node_st)
-
-            if node in self.int and node not in self.sink:
-                if node_st not in self.plt_int_only:
-                    self.plt_int_only.append(node_st)
-
-            if node in self.int and node in self.sink:
-                if node_st not in self.plt_sink_int:
-                    self.plt_sink_int.append(node_st)
-
-            if node in self.src:
-                self.plt_src.append(node_st)
+        acc_test = set(self.automaton.Acc.get("test", []))
+        acc_sys = set(self.automaton.Acc["sys"])
+        self.int = [s for s in self.S if s[1] in acc_test]
+        self.sink = [s for s in self.S if s[1] in acc_sys]
+        # sets for constant time membership checks
+        self.src_set = set(self.src)
+        self.int_set = set(self.int)
+        self.sink_set = set(self.sink)
 
     def to_graph(self):
         self.G = nx.DiGraph()
-        self.G.add_nodes_from(list(self.Sdict.values()))
-        self.plt_sink_only = [] # Finding relevant nodes connected to graph with edges
-        self.plt_int_only= []
-        self.plt_sink_int = []
-        self.plt_src = []
+        self.G.add_nodes_from(range(len(self.reverse_Sdict)))
         edges = []
         edge_attr = dict()
-        node_attr = dict()
         for state_act, in_node in self.E.items():
             out_node = state_act[0]
             act = state_act[1]
             edge = (self.Sdict[out_node], self.Sdict[in_node])
             edge_attr[edge] = {"act": act}
             edges.append(edge)
-            self.process_nodes([out_node, in_node])
         self.G.add_edges_from(edges)
         nx.set_edge_attributes(self.G, edge_attr)
 
     def base_dot_graph(self, graph=None):
-        if graph == None:
-            st()
-            G_agr = nx.nx_agraph.to_agraph(self.G)
-        else:
-            G_agr = nx.nx_agraph.to_agraph(graph)
-
-        G_agr.node_attr['style'] = 'filled'
-        G_agr.node_attr['gradientangle'] = 90
-
-        for i in G_agr.nodes():
-            n = G_agr.get_node(i)
-            node = self.reverse_Sdict[n]
-            n.attr['shape'] = 'circle'
-            if n in self.plt_sink_only:
-                n.attr['fillcolor'] = '#ffb000'
-            elif n in self.plt_int_only:
-                n.attr['fillcolor'] = '#648fff'
-            elif n in self.plt_sink_int:
-                n.attr['fillcolor'] = '#ffb000'
-            elif n in self.plt_src:
-                n.attr['fillcolor'] = '#dc267f'
-            else:
-                n.attr['fillcolor'] = '#ffffff'
-            n.attr['label']= ''
-        return G_agr
+        """
+        Graphviz graph of this virtual graph (see floras.components.plotting).
+        """
+        from floras.components.plotting import product_dot_graph
+        return product_dot_graph(self, graph)
 
     def save_plot(self, fn):
-        G_agr = self.base_dot_graph(graph=self.G_initial)
-        if not os.path.exists("imgs"):
-            os.makedirs("imgs")
-        G_agr.draw("imgs/"+fn+".pdf",prog='dot')
+        from floras.components.plotting import save_product_plot
+        save_product_plot(self, fn)
 
 def sync_prod(system, aut):
     prod = Product(system, aut)
     prod.pruned_sync_prod()
     return prod
+
+def sync_prods(system, sys_aut, prod_aut, test_aut=None):
+    """
+    Construct the virtual product graph and the virtual system graph with a single
+    traversal of the transition system when the system graph can be obtained by projection.
+
+    Args:
+        system: Transition system.
+        sys_aut: System automaton.
+        prod_aut: Specification product automaton.
+        test_aut: Tester automaton (default None, see Product.project).
+
+    Returns:
+        virtual: Virtual product graph.
+        virtual_sys: Virtual system graph.
+        map_G_to_S: Nodes of virtual_sys with the same system state as each node of virtual.
+    """
+    virtual = sync_prod(system, prod_aut)
+    virtual_sys = virtual.project(sys_aut, test_aut)
+    if virtual_sys is None:
+        virtual_sys = sync_prod(system, sys_aut)
+    map_G_to_S = virtual.map_to(virtual_sys)
+    return virtual, virtual_sys, map_G_to_S
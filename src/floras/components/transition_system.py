@@ -1,11 +1,5 @@
 import spot
-import pdb
-# from ast import literal_eval as make_tuple
-import matplotlib.pyplot as plt
 from collections import OrderedDict as od
-import networkx as nx
-import os
-from ipdb import set_trace as st
 
 class TransitionSystemInput():
     """Input format containing data to create a transition system.
@@ -50,6 +44,7 @@ class TranSys():
         self.AP = None
         self.L = None
         self.G = None
+        self.out = None # state -> {action: next state}, index of E for add_transition and remove_transition
         self.input = transition_system_input
         if self.input:
             self.setup()
@@ -78,6 +73,7 @@ class TranSys():
         Create the set of edges E from the input data.
         """
         self.E = dict()
+        self.out = None
         for s in self.input.states:
             i = 0
             for ns in self.input.transitions[s]:
@@ -105,6 +101,74 @@ class TranSys():
         """
         self.I = self.input.init
 
+    def add_state(self, s):
+        """
+        Add a state without labels.
+        """
+        self.S.append(s)
+        self.AP_dict[s] = []
+        self.L[s] = set()
+
+    def out_index(self):
+        """
+        Index of the transitions by outgoing state, built from E on first use.
+
+        Returns:
+            out: Dictionary mapping each state to a dictionary from actions to next states.
+        """
+        if self.out is None:
+            self.out = dict()
+            for (state, a), next_state in self.E.items():
+                self.out.setdefault(state, dict())[a] = next_state
+        return self.out
+
+    def add_transition(self, s, t):
+        """
+        Add the transition from s to t with the first action of A that is not used by s.
+
+        Args:
+            s: Outgoing state.
+            t: Incoming state.
+        """
+        for state in (s, t):
+            if state not in self.L:
+                self.add_state(state)
+        used = self.out_index().setdefault(s, dict())
+        free = [a for a in self.A if a not in used]
+        if not free:
+            raise ValueError('No free action for a transition from {0}.'.format(s))
+        self.E[(s, free[0])] = t
+        used[free[0]] = t
+
+    def remove_transition(self, s, t):
+        """
+        Remove the transitions from s to t.
+
+        Args:
+            s: Outgoing state.
+            t: Incoming state.
+        """
+        out = self.out_index().get(s, dict())
+        actions = [a for a, next_state in out.items() if next_state == t]
+        if not actions:
+            raise ValueError('No transition from {0} to {1}.'.format(s, t))
+        for a in actions:
+            del self.E[(s, a)]
+            del out[a]
+
+    def set_labels(self, s, labels):
+        """
+        Replace the labels of a state.
+
+        Args:
+            s: State.
+            labels: List of atomic propositions (strings).
+        """
+        if s not in self.L:
+            self.add_state(s)
+        self.AP_dict[s] = [spot.formula.ap(label) for label in labels]
+        self.L[s] = set(self.AP_dict[s])
+
     def construct_labels(self):
         """
         Add the labels to the states in the form of spot formulas.
@@ -123,30 +187,5 @@ class TranSys():
         Args:
             fn: Filename to store the figure under `filename.pdf'.
         """
-        self.G = nx.DiGraph()
-        self.G.add_nodes_from(list(self.S))
-
-        edges = []
-        edge_attr = dict()
-        node_attr = dict()
-        for state_act, in_node in self.E.items():
-            out_node = state_act[0]
-            act = state_act[1]
-            edge = (out_node, in_node)
-            edge_attr[edge] = {"act": act}
-            edges.append(edge)
-        self.G.add_edges_from(edges)
-        nx.set_edge_attributes(self.G, edge_attr)
-
-        G_agr = nx.nx_agraph.to_agraph(self.G)
-        G_agr.node_attr['style'] = 'filled'
-        G_agr.node_attr['gradientangle'] = 90
-
-        for i in G_agr.nodes():
-            n = G_agr.get_node(i)
-            n.attr['fillcolor'] = 'white'
-            n.attr['shape'] = 'circle'
-
-        if not os.path.exists("imgs"):
-            os.makedirs("imgs")
-        G_agr.draw("imgs/"+fn+".pdf",prog='dot')
+        from floras.components.plotting import save_transys_plot
+        save_transys_plot(self, fn)
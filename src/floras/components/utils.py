@@ -1,7 +1,8 @@
 """Utility functions for components."""
+import os
+import numpy as np
 from itertools import chain, combinations
 import spot
-from collections import OrderedDict as od
 
 
 def powerset(s):
@@ -20,38 +21,93 @@ def disjunction(formula_list):
     return spot.formula.Or(formula_list)
 
 
-def get_states_and_transitions_from_file(mazefile):
-    map = od()
-    f = open(mazefile, 'r')
-    lines = f.readlines()
-    len_z = len(lines)
-    for i,line in enumerate(lines):
-        for j,item in enumerate(line):
-            if item != '\n' and item != '|':
-                map[i,j] = item
-                len_x = j
-    len_x += 1
-
-    states = []
-    goal = [] # update this to use the labels?
-    for z in range(0,len_z):
-        for x in range(0,len_x):
-            if map[(z,x)] != '*':
-                states.append(((z,x)))
-                if map[(z,x)] == 'S':
-                    init = (z,x)
-                if map[(z,x)] == 'T':
-                    goal.append((z,x))
-
-    transitions_dict = dict()
-    for node in states:
-        next_states = [(node[0], node[1])]
-        if node not in goal:
-            for a in [-1,1]: # can always move horizontally!
-                if (node[0],node[1]+a) in states:
-                    next_states.append((node[0], node[1]+a))
-            for b in [-1,1]: # can always move vertically!
-                if (node[0]+b,node[1]) in states:
-                    next_states.append((node[0]+b, node[1]))
-        transitions_dict.update({node: next_states})
+# Maze files: one row of cells per line, optionally closed by '|'. '*' is an obstacle, 'T' a goal
+# (goals are absorbing) and 'S' the start.
+OBSTACLE = ord('*')
+GOAL = ord('T')
+# Moves to the neighbors, in the order of the transitions after the self-loop
+MOVES = [(0,-1), (0,1), (-1,0), (1,0)]
+# Maze files larger than this (in bytes) are memory-mapped by default
+MMAP_BYTES = 2**26
+
+def read_maze(mazefile, mmap=None):
+    """
+    Read a maze file into an array of characters, without the line ends and the '|' that
+    closes a row. The number of columns is the length of the last row, longer rows are cut.
+
+    Args:
+        mazefile: Path of the maze file.
+        mmap: Memory-map the file instead of reading it (default: for files larger than MMAP_BYTES).
+
+    Returns:
+        grid: uint8 array with one row per line of the file.
+    """
+    if mmap is None:
+        mmap = os.path.getsize(mazefile) > MMAP_BYTES
+    if mmap:
+        data = np.memmap(mazefile, dtype=np.uint8, mode='r')
+    else:
+        with open(mazefile, 'rb') as fp:
+            data = np.frombuffer(fp.read(), dtype=np.uint8)
+    ends = np.flatnonzero(data == ord('\n'))
+    if len(data) and (len(ends) == 0 or ends[-1] != len(data) - 1):
+        ends = np.append(ends, len(data)) # last line without a line end
+    starts = np.concatenate([[0], ends[:-1] + 1]).astype(ends.dtype)
+    rows = np.flatnonzero(ends > starts)
+    if len(rows) == 0:
+        raise ValueError('The maze file {0} is empty.'.format(mazefile))
+    starts, ends = starts[:rows[-1]+1], ends[:rows[-1]+1] # without the empty lines at the end
+
+    lengths = ends - starts
+    lengths -= data[ends - 1] == ord('\r') # windows line ends
+    lengths -= (lengths > 0) & (data[starts + lengths - 1] == ord('|'))
+    n_x = int(lengths[-1])
+    if np.any(lengths < n_x):
+        raise ValueError('The rows of the maze file {0} have different lengths.'.format(mazefile))
+    if np.all(ends - starts == ends[0] - starts[0]):
+        # rows of equal length are a strided view of the file
+        return np.lib.stride_tricks.as_strided(data, shape=(len(starts), n_x), strides=(int(ends[0]) + 1, 1), writeable=False)
+    return data[starts[:, None] + np.arange(n_x)]
+
+def load_maze(mazefile, mmap=None):
+    """
+    Free cells and transitions of a maze file: moves to the four neighbors and self-loops,
+    goals are absorbing.
+
+    Args:
+        mazefile: Path of the maze file.
+        mmap: Memory-map the file (see read_maze).
+
+    Returns:
+        cells: Array of shape (n, 2) with the row and column of the free cells (row by row).
+        successors: Array of shape (n, 5) with the index in cells of the cell itself and of its
+            left, right, upper and lower neighbors (-1 for obstacles, the border and goals).
+    """
+    grid = read_maze(mazefile, mmap)
+    free = grid != OBSTACLE
+    n_z, n_x = grid.shape
+    n = int(free.sum())
+    dtype = np.int32 if n < 2**31 else np.int64
+    index = np.full((n_z + 2, n_x + 2), -1, dtype=dtype) # cell indices with a border of obstacles
+    index[1:-1, 1:-1][free] = np.arange(n, dtype=dtype)
+
+    successors = np.empty((n, 5), dtype=dtype)
+    successors[:, 0] = np.arange(n, dtype=dtype)
+    for k, (dz, dx) in enumerate(MOVES):
+        successors[:, k+1] = index[1+dz:1+dz+n_z, 1+dx:1+dx+n_x][free]
+    successors[(grid == GOAL)[free], 1:] = -1
+    cells = np.argwhere(free)
+    return cells, successors
+
+def get_states_and_transitions_from_file(mazefile, mmap=None):
+    """
+    States and transitions of a maze file (see load_maze).
+
+    Returns:
+        states: List of (row, column) states.
+        transitions_dict: Dictionary mapping each state to the list of next states, starting with the state itself.
+    """
+    cells, successors = load_maze(mazefile, mmap)
+    states = list(map(tuple, cells.tolist()))
+    transitions_dict = {state: [states[k] for k in row if k >= 0] for state, row in zip(states, successors.tolist())}
     return states, transitions_dict
@@ -1,20 +1,27 @@
+import os
+import sys
 import json
 import ast
 import argparse
+from functools import partial
 
-from floras.optimization.optimize import solve
-from floras.components.automata import get_system_automaton, get_tester_automaton, get_product_automaton
+from floras.optimization.optimize import solve, solve_cached
+from floras.optimization.cache import ModelCache, problem_hash
+from floras.components.automata import get_system_automaton, get_tester_automaton, get_product_automaton, TRANSLATION_PRESETS, DEFAULT_PRESET
+from floras.components.automata_cache import AutomatonCache
 from floras.components.transition_system import TranSys, TransitionSystemInput
-from floras.components.product import sync_prod
+from floras.components.product import sync_prods
 from floras.components.utils import get_states_and_transitions_from_file
+from floras.profiling import Profiler
 
-from ipdb import set_trace as st
+# Options of solve that change the built model, with the defaults of solve
+MODEL_OPTIONS = {"builder": "loop", "aggregate_cuts": False, "presolve": False, "warm_start": False}
 
-def get_automata(sys_formula, test_formula):
-    # get automata
-    sys_aut, spot_aut_sys = get_system_automaton(sys_formula)
-    test_aut, spot_aut_test = get_tester_automaton(test_formula)
-    prod_aut = get_product_automaton(spot_aut_sys, spot_aut_test)
+def get_automata(sys_formula, test_formula, cache=None, preset=DEFAULT_PRESET):
+    # get automata (cache: AutomatonCache of the translations and products, preset: translation preset)
+    sys_aut, spot_aut_sys = get_system_automaton(sys_formula, cache=cache, preset=preset)
+    test_aut, spot_aut_test = get_tester_automaton(test_formula, cache=cache, preset=preset)
+    prod_aut = get_product_automaton(spot_aut_sys, spot_aut_test, cache=cache)
     return sys_aut, test_aut, prod_aut
 
 def get_transition_system(transition_system_input):
@@ -22,16 +29,24 @@ def get_transition_system(transition_system_input):
     transys = TranSys(transition_system_input)
     return transys
 
-def get_virtuals(transys, sys_aut, prod_aut):
-    # get virtual graphs
-    virtual_sys = sync_prod(transys, sys_aut)
-    virtual = sync_prod(transys, prod_aut)
-    return virtual, virtual_sys
+def get_virtuals(transys, sys_aut, prod_aut, test_aut=None):
+    # get virtual graphs and the map between their nodes
+    virtual, virtual_sys, map_G_to_S = sync_prods(transys, sys_aut, prod_aut, test_aut)
+    return virtual, virtual_sys, map_G_to_S
 
 def extract_test_data(filename):
     with open(filename, 'r') as file:
         data = json.load(file)
+    return parse_test_data(data, os.path.dirname(filename))
 
+def parse_test_data(data, root=''):
+    """
+    Problem data from the contents of a json problem file.
+
+    Args:
+        data: Dictionary loaded from the json file.
+        root: Directory of the json file, a relative mazefile is looked up there first.
+    """
     init = [ast.literal_eval(s) for s in data['init']]
     goals = [ast.literal_eval(s) for s in data['goals']]
     labels = {ast.literal_eval(s): data['labels'][s] for s in data['labels'].keys()}
@@ -45,24 +60,67 @@ def extract_test_data(filename):
         transitions = data['transitions']
     else:
         mazefile = data['mazefile']
+        if root and not os.path.isabs(mazefile) and os.path.exists(os.path.join(root, mazefile)):
+            mazefile = os.path.join(root, mazefile) # relative to the json file, then to the working directory
         states, transitions = get_states_and_transitions_from_file(mazefile)
 
     return init, goals, labels, sysformula, testformula, states, transitions, type
 
 
-def find_test_environment(filename):
-    init, goals, labels, sysformula, testformula, states, transitions, type = extract_test_data(filename)
+def find_test_environment(filename, backend='gurobi', seed=None, portfolio=None, cache=None, profiler=None, automata_cache=None, preset=DEFAULT_PRESET, model_options=None):
+    test_data = extract_test_data(filename)
+    automata = partial(get_automata, cache=automata_cache, preset=preset)
+    return solve_test_data(test_data, backend=backend, seed=seed, portfolio=portfolio, cache=cache, profiler=profiler, automata=automata, preset=preset, model_options=model_options)
+
+def solve_test_data(test_data, backend='gurobi', seed=None, portfolio=None, cache=None, profiler=None, automata=None, preset=DEFAULT_PRESET, model_options=None):
+    """
+    Find the test environment for the problem data of extract_test_data or parse_test_data.
+
+    Args:
+        automata: Function returning the system, tester and product automata of the
+            formulas (default get_automata with the preset).
+        preset: Translation preset of the automata (default 'auto').
+        model_options: Dictionary of the options of solve that change the built model
+            (builder, aggregate_cuts, presolve, warm_start; default the defaults of solve).
+            They are part of the model cache key.
+    """
+    if profiler is None:
+        profiler = Profiler(enabled=False)
+    if automata is None:
+        automata = partial(get_automata, preset=preset)
+    model_options = dict(MODEL_OPTIONS, **(model_options or {}))
+    init, goals, labels, sysformula, testformula, states, transitions, type = test_data
+
+    # built models are cached for the gurobi backend
+    cache_key = None
+    if cache is not None and backend == 'gurobi' and portfolio is None:
+        cache_key = problem_hash(sysformula, testformula, states, transitions, labels, init, type, preset=preset, **model_options)
+        if cache_key in cache:
+            d, flow = solve_cached(cache, cache_key, seed = seed, profiler = profiler)
+            print_cuts(d)
+            return d, flow
+
     # get transition_system_input from states and transitions
     transition_system_input = TransitionSystemInput(states,transitions,labels, init)
 
     # setup problem
-    sys_aut, test_aut, prod_aut = get_automata(sysformula, testformula)
-    transys = get_transition_system(transition_system_input)
-    virtual, virtual_sys = get_virtuals(transys, sys_aut, prod_aut)
+    with profiler.stage('automata'):
+        sys_aut, test_aut, prod_aut = automata(sysformula, testformula)
+    with profiler.stage('transition_system'):
+        transys = get_transition_system(transition_system_input)
+    with profiler.stage('product'):
+        virtual, virtual_sys, map_G_to_S = get_virtuals(transys, sys_aut, prod_aut, test_aut)
+    profiler.record('transition_system', states=len(transys.S), transitions=len(transys.E))
+    profiler.record('virtual_product', nodes=virtual.G_initial.number_of_nodes(), edges=virtual.G_initial.number_of_edges())
+    profiler.record('virtual_sys', nodes=virtual_sys.G_initial.number_of_nodes(), edges=virtual_sys.G_initial.number_of_edges())
 
     # optimize
-    d, flow = solve(virtual, transys, prod_aut, virtual_sys, case = type)
+    d, flow = solve(virtual, transys, prod_aut, virtual_sys, case = type, map_G_to_S = map_G_to_S, backend = backend, seed = seed, portfolio = portfolio, cache = cache, cache_key = cache_key, profiler = profiler, **model_options)
+    print_cuts(d)
+
+    return d, flow
 
+def print_cuts(d):
     # print output
     ncuts = 0
     for cut in d:
@@ -70,18 +128,62 @@ def find_test_environment(filename):
             ncuts+=1
             print('{0} to {1} at {2}'.format(cut[0], cut[1],d[cut]))
 
-    return d, flow
 
+def cut_list(d):
+    """
+    Cut edges as [out_state, in_state] strings (json serializable).
+    """
+    return [[str(cut[0]), str(cut[1])] for cut in d if d[cut] > 0.9]
 
 def save_output(filename):
     pass
 
+def add_model_arguments(parser):
+    """
+    Add the command line flags of the model options (see MODEL_OPTIONS).
+    """
+    parser.add_argument("--builder", default=MODEL_OPTIONS["builder"], choices=["loop", "matrix"],
+                        help="MILP builder of the gurobi backend (matrix: sparse incidence matrices, always used by highs)")
+    parser.add_argument("--aggregate-cuts", action="store_true", help="one cut variable per physical transition and its reverse")
+    parser.add_argument("--presolve", action="store_true", help="reduce the virtual product graph before building the MILP")
+    parser.add_argument("--warm-start", action="store_true", help="start the static MILP from a max-flow/min-cut solution")
+
+def model_options(args):
+    """
+    Model options of the parsed command line flags.
+    """
+    return {"builder": args.builder, "aggregate_cuts": args.aggregate_cuts, "presolve": args.presolve, "warm_start": args.warm_start}
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        from floras.batch import main as batch_main
+        return batch_main(sys.argv[2:])
     parser = argparse.ArgumentParser(
         description="filename of json file to solve"
     )
     parser.add_argument("--filename", required=True, type=str)
+    parser.add_argument("--backend", default="gurobi", choices=["gurobi", "highs"], help="MILP solver backend")
+    parser.add_argument("--seed", default=None, type=int, help="solver seed (random if not given)")
+    parser.add_argument("--portfolio", default=None, type=int, help="number of seeds and parameter profiles to solve with in parallel")
+    parser.add_argument("--cache", default=None, type=str, help="directory of the cache of built models")
+    parser.add_argument("--cache-size", default=1024, type=float, help="size limit of the model cache in MB")
+    parser.add_argument("--automata-cache", default=None, type=str, help="directory of the cache of translated automata")
+    parser.add_argument("--translation", default=DEFAULT_PRESET, choices=["auto"] + list(TRANSLATION_PRESETS),
+                        help="translation preset of the automata (auto: smallest sound automaton)")
+    add_model_arguments(parser)
+    parser.add_argument("--profile", action="store_true", help="record the time and memory of each stage in log/profile.json")
+    parser.add_argument("--cprofile", action="store_true", help="with --profile, also dump cProfile statistics to log/profile.prof")
+    parser.add_argument("--profile-memory", action="store_true", help="with --profile, also trace the Python allocations of each stage (slows the stages down)")
     args = parser.parse_args()
 
     filename = args.filename
-    d, flow = find_test_environment(filename)
+    cache = ModelCache(args.cache, max_bytes=int(args.cache_size*2**20)) if args.cache is not None else None
+    automata_cache = AutomatonCache(args.automata_cache) if args.automata_cache is not None else None
+    profiler = Profiler(enabled=args.profile, cprofile=args.cprofile, memory=args.profile_memory)
+    profiler.start()
+    try:
+        d, flow = find_test_environment(filename, backend=args.backend, seed=args.seed, portfolio=args.portfolio, cache=cache, profiler=profiler, automata_cache=automata_cache, preset=args.translation, model_options=model_options(args))
+    finally:
+        profiler.stop()
+    profiler.write()
+    profiler.print_report()
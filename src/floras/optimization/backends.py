@@ -0,0 +1,367 @@
+"""
+Solver backends for the MILP and the solver-independent sparse model description they are built from.
+"""
+import time
+from abc import ABC, abstractmethod
+import numpy as np
+import scipy.sparse as sp
+
+
+class SparseModel:
+    """
+    Solver-independent description of a MILP in matrix form:
+
+        optimize c @ x  subject to  A_k @ x (sense_k) rhs_k for every constraint block k,
+                                    lb <= x <= ub, and x integer on the binary variable blocks.
+
+    Variables are added in named blocks, and constraint blocks are given as sparse matrices
+    over one or more variable blocks.
+    """
+    def __init__(self):
+        self.n_vars = 0
+        self.blocks = dict() # block name -> slice of x
+        self.lb = []
+        self.ub = []
+        self.binary = []
+        self.objective = dict() # block name -> objective coefficients
+        self.sense = 'max'
+        self.constraints = [] # (name, [(block name, matrix)], sense, rhs)
+
+    def add_variables(self, name, size, lb=0.0, ub=1.0, binary=False):
+        """
+        Add a block of variables.
+
+        Args:
+            name: Name of the block.
+            size: Number of variables in the block.
+            lb: Lower bound (scalar or array).
+            ub: Upper bound (scalar or array).
+            binary: If the variables are binary.
+
+        Returns:
+            block: Slice of the block in the variable vector x.
+        """
+        block = slice(self.n_vars, self.n_vars + size)
+        self.blocks[name] = block
+        self.lb.append(np.broadcast_to(np.asarray(lb, dtype=float), (size,)))
+        self.ub.append(np.broadcast_to(np.asarray(ub, dtype=float), (size,)))
+        self.binary.append(np.full(size, binary))
+        self.n_vars += size
+        return block
+
+    def set_objective(self, terms, sense='max'):
+        """
+        Set the objective.
+
+        Args:
+            terms: Dictionary mapping block names to their objective coefficients.
+            sense: 'max' or 'min'.
+        """
+        self.objective = terms
+        self.sense = sense
+
+    def add_constraints(self, name, terms, sense, rhs):
+        """
+        Add a block of constraints sum_b A_b @ x_b (sense) rhs.
+
+        Args:
+            name: Name of the constraint block.
+            terms: List of (block name, sparse matrix over the block).
+            sense: One of '=', '<', '>'.
+            rhs: Right hand side (scalar or array).
+        """
+        n_rows = terms[0][1].shape[0]
+        rhs = np.broadcast_to(np.asarray(rhs, dtype=float), (n_rows,))
+        self.constraints.append((name, terms, sense, rhs))
+
+    def bounds(self):
+        """
+        Returns:
+            lb: Lower bounds of all variables.
+            ub: Upper bounds of all variables.
+            binary: Boolean array, True for the binary variables.
+        """
+        if not self.blocks:
+            return np.zeros(0), np.zeros(0), np.zeros(0, dtype=bool)
+        return np.concatenate(self.lb), np.concatenate(self.ub), np.concatenate(self.binary)
+
+    def objective_vector(self):
+        """
+        Returns:
+            c: Objective coefficients of all variables.
+        """
+        c = np.zeros(self.n_vars)
+        for name, coeffs in self.objective.items():
+            c[self.blocks[name]] = coeffs
+        return c
+
+    def constraint_matrix(self, terms):
+        """
+        Stack the matrices of a constraint block over the full variable vector.
+
+        Returns:
+            A: Sparse CSR matrix with n_vars columns.
+        """
+        rows, cols, vals = [], [], []
+        for name, matrix in terms:
+            coo = sp.coo_matrix(matrix)
+            rows.append(coo.row)
+            cols.append(coo.col + self.blocks[name].start)
+            vals.append(coo.data)
+        n_rows = terms[0][1].shape[0]
+        return sp.csr_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))), shape=(n_rows, self.n_vars))
+
+    def constraint_blocks(self):
+        """
+        Iterate over the constraint blocks with their matrices over the full variable vector.
+
+        Returns:
+            blocks: Generator of (name, A, sense, rhs).
+        """
+        for name, terms, sense, rhs in self.constraints:
+            yield name, self.constraint_matrix(terms), sense, rhs
+
+
+class Backend(ABC):
+    """
+    Interface of a MILP solver backend.
+
+    The status is one of 'optimal', 'feasible' (a solution was found, but not proven optimal),
+    'not_solved', 'inf' (infeasible), 'inf/unbounded' and 'unknown'.
+    """
+    name = None
+
+    @abstractmethod
+    def build(self, sparse_model):
+        """
+        Build the solver model from the sparse model description.
+        """
+        pass
+
+    @abstractmethod
+    def optimize(self, data, callback=None, policy=None, telemetry=None):
+        """
+        Solve the model. Termination information is stored in the data dictionary.
+
+        Args:
+            data: Dictionary of logged data.
+            callback: Solver callback (default None).
+            policy: TerminationPolicy (default None).
+            telemetry: Telemetry to record the solver events to (default None).
+        """
+        pass
+
+    @abstractmethod
+    def status(self):
+        """
+        Returns:
+            status: Status of the last solve.
+        """
+        pass
+
+    @abstractmethod
+    def values(self, positions):
+        """
+        Solution values of the variables at the given positions (slice or array) of the variable vector.
+        """
+        pass
+
+    def set_start(self, positions, values):
+        """
+        Start values of the variables at the given positions for the MIP (ignored if the solver does not support them).
+        """
+        pass
+
+    @abstractmethod
+    def stats(self):
+        """
+        Returns:
+            stats: Dictionary with the runtime, number of binary and continuous variables, and number of constraints.
+        """
+        pass
+
+
+class GurobiBackend(Backend):
+    """
+    Gurobi backend. Wraps a gurobipy model, either built from a sparse model description or
+    built directly (loop builder).
+
+    Args:
+        model: Existing gurobipy model (default None).
+        seed: Random seed of the solver (default None, drawn at random and logged).
+        params: Dictionary of Gurobi parameters (default None).
+    """
+    name = 'gurobi'
+
+    def __init__(self, model=None, seed=None, params=None):
+        self.model = model
+        self.x = None
+        self.seed = seed
+        self.params = params if params is not None else dict()
+
+    def build(self, sparse_model):
+        from gurobipy import Model, GRB
+        self.model = Model()
+        lb, ub, binary = sparse_model.bounds()
+        vtype = np.where(binary, GRB.BINARY, GRB.CONTINUOUS)
+        self.x = self.model.addMVar(sparse_model.n_vars, lb=lb, ub=ub, vtype=vtype, name="x")
+        for name, A, sense, rhs in sparse_model.constraint_blocks():
+            self.model.addMConstr(A, self.x, sense, rhs, name=name)
+        model_sense = GRB.MAXIMIZE if sparse_model.sense == 'max' else GRB.MINIMIZE
+        self.model.setObjective(sparse_model.objective_vector() @ self.x, model_sense)
+        return self.model
+
+    def wrap(self, model):
+        """
+        Use a gurobipy model that was built directly (loop builder) or read from a file.
+        """
+        from gurobipy import MVar
+        self.model = model
+        self.model.update()
+        self.x = MVar.fromlist(self.model.getVars())
+
+    def optimize(self, data, callback=None, policy=None, telemetry=None):
+        from gurobipy import GRB
+        # Last updated objective, start time and time of the last improvement (for callback function)
+        self.model._cur_obj = float('inf')
+        self.model._time = time.time()
+        self.model._time_improved = self.model._time
+        seed = self.seed if self.seed is not None else np.random.randint(0,100)
+        self.model.Params.Seed = seed
+        data["seed"] = int(seed)
+        for param, value in self.params.items():
+            self.model.setParam(param, value)
+        self.model._data = data
+        self.model._policy = policy
+        self.model._telemetry = telemetry
+        self.model.update()
+        self.model._maximize = self.model.ModelSense == GRB.MAXIMIZE
+        if policy is not None and policy.time_limit is not None:
+            self.model.Params.TimeLimit = policy.time_limit
+        if policy is not None and policy.gap is not None:
+            self.model.Params.MIPGap = policy.gap
+        if callback is not None:
+            self.model.optimize(callback=callback)
+        else:
+            self.model.optimize()
+        if self.model.status == GRB.TIME_LIMIT:
+            data["term_condition"] = "Time limit"
+
+    def status(self):
+        from gurobipy import GRB
+        code = self.model.status
+        if code == GRB.OPTIMAL:
+            return 'optimal'
+        if code in (GRB.INTERRUPTED, GRB.TIME_LIMIT):
+            return 'feasible' if self.model.SolCount >= 1 else 'not_solved'
+        if code == GRB.INFEASIBLE:
+            return 'inf'
+        if code == GRB.INF_OR_UNBD:
+            self.model.Params.DualReductions = 0
+            return 'inf/unbounded'
+        return 'unknown'
+
+    def values(self, positions):
+        return np.asarray(self.x[positions].X)
+
+    def set_start(self, positions, values):
+        self.x[positions].Start = values
+
+    def stats(self):
+        return {"runtime": self.model.Runtime,
+                "n_bin_vars": self.model.NumBinVars,
+                "n_cont_vars": self.model.NumVars - self.model.NumBinVars,
+                "n_constrs": self.model.NumConstrs}
+
+
+class HighsBackend(Backend):
+    """
+    HiGHS backend through scipy.optimize.milp. Does not need a solver license.
+    scipy.optimize.milp does not take MIP starts, so set_start is ignored.
+
+    Args:
+        time_limit: Time limit in seconds (default 600, the limit of the Gurobi callback).
+        seed: Not used, scipy.optimize.milp does not take a seed.
+        params: Additional options of scipy.optimize.milp (default None).
+    """
+    name = 'highs'
+
+    def __init__(self, time_limit=600, seed=None, params=None):
+        self.time_limit = time_limit
+        self.params = params if params is not None else dict()
+        self.sparse_model = None
+        self.result = None
+        self.runtime = None
+
+    def build(self, sparse_model):
+        self.sparse_model = sparse_model
+        blocks = list(sparse_model.constraint_blocks())
+        self.A = sp.vstack([A for name, A, sense, rhs in blocks], format='csr')
+        rhs = np.concatenate([rhs for name, A, sense, rhs in blocks])
+        senses = np.concatenate([np.full(len(rhs_k), sense) for name, A, sense, rhs_k in blocks])
+        self.row_lb = np.where(senses == '<', -np.inf, rhs)
+        self.row_ub = np.where(senses == '>', np.inf, rhs)
+        return None
+
+    def optimize(self, data, callback=None, policy=None, telemetry=None):
+        """
+        Solve with scipy.optimize.milp. There are no callbacks, so the stall windows of the policy
+        do not apply; its time limit (or the backend time limit) and gap do. The telemetry only
+        records the final incumbent and bound.
+        """
+        from scipy.optimize import milp, LinearConstraint, Bounds
+        lb, ub, binary = self.sparse_model.bounds()
+        c = self.sparse_model.objective_vector()
+        sign = -1.0 if self.sparse_model.sense == 'max' else 1.0
+        options = dict({"disp": False}, **self.params)
+        time_limit = policy.time_limit if policy is not None and policy.time_limit is not None else self.time_limit
+        if time_limit is not None:
+            options["time_limit"] = time_limit
+        if policy is not None and policy.gap is not None:
+            options["mip_rel_gap"] = policy.gap
+        t0 = time.time()
+        self.result = milp(sign*c, constraints=LinearConstraint(self.A, self.row_lb, self.row_ub),
+                           integrality=binary.astype(int), bounds=Bounds(lb, ub), options=options)
+        self.runtime = time.time() - t0
+        if self.result.status == 1:
+            data["term_condition"] = "Timeout"
+        if telemetry is not None:
+            found = self.result.x is not None
+            incumbent = sign*self.result.fun if found else float('inf')
+            bound = getattr(self.result, 'mip_dual_bound', None)
+            bound = sign*bound if bound is not None else float('inf')
+            nodes = getattr(self.result, 'mip_node_count', 0) or 0
+            telemetry.record('final', incumbent, bound, int(nodes), int(found))
+
+    def status(self):
+        code = self.result.status
+        if code == 0:
+            return 'optimal'
+        if code == 1:
+            return 'feasible' if self.result.x is not None else 'not_solved'
+        if code == 2:
+            return 'inf'
+        if code == 3:
+            return 'inf/unbounded'
+        return 'unknown'
+
+    def values(self, positions):
+        return np.asarray(self.result.x[positions])
+
+    def stats(self):
+        n_bin_vars = int(self.sparse_model.bounds()[2].sum())
+        return {"runtime": self.runtime,
+                "n_bin_vars": n_bin_vars,
+                "n_cont_vars": self.sparse_model.n_vars - n_bin_vars,
+                "n_constrs": self.A.shape[0]}
+
+
+BACKENDS = {"gurobi": GurobiBackend, "highs": HighsBackend}
+
+def get_backend(name, **options):
+    """
+    Backend by name ('gurobi' or 'highs'), constructed with the given options.
+    """
+    if name not in BACKENDS:
+        raise ValueError('Solver backend {0} not available, options are {1}.'.format(name, ', '.join(BACKENDS)))
+    return BACKENDS[name](**options)
@@ -0,0 +1,160 @@
+"""On-disk cache of built models, keyed by a canonical hash of the problem."""
+import os
+import json
+import shutil
+import pickle
+import hashlib
+
+# Bump when the cached model or maps change, to invalidate old entries
+CACHE_VERSION = 1
+
+def canonical(value):
+    """
+    JSON-serializable canonical form: states by repr, sets and dictionary keys sorted.
+    """
+    if isinstance(value, dict):
+        return sorted(([canonical(key), canonical(item)] for key, item in value.items()), key=repr)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [canonical(item) for item in value]
+        return sorted(items, key=repr) if isinstance(value, (set, frozenset)) else items
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return repr(value)
+
+def problem_hash(sysformula, testformula, states, transitions, labels, init, case, **options):
+    """
+    Canonical hash of a problem: the specifications, the transition system and the options that
+    change the built model, passed as keyword arguments (main.solve_test_data passes the
+    translation preset, builder, aggregate_cuts, presolve and warm_start). The order of the
+    states, of the successors of a state, of the labels of a state and of the initial states does
+    not change the hash.
+
+    Returns:
+        key: Hexadecimal SHA-256 digest.
+    """
+    problem = {
+        "version": CACHE_VERSION,
+        "sysformula": sysformula,
+        "testformula": testformula,
+        "states": canonical(set(states)),
+        "transitions": canonical({state: set(successors) for state, successors in transitions.items()}),
+        "labels": canonical({state: set(state_labels) for state, state_labels in labels.items()}),
+        "init": canonical(set(init)),
+        "case": case,
+        "options": canonical(options),
+    }
+    return hashlib.sha256(json.dumps(problem, sort_keys=True).encode()).hexdigest()
+
+
+class ModelCache:
+    """
+    On-disk cache of built Gurobi models. Each entry is a directory named by the problem hash with
+    the model in MPS format and the node and edge maps needed to parse the solution. The least
+    recently used entries are evicted when the cache grows beyond its size limit.
+    Several processes can share a cache: entries are written to a temporary directory and renamed,
+    and an entry that another process evicts in the meantime is a cache miss.
+
+    Args:
+        root: Cache directory (default 'cache/models').
+        max_bytes: Size limit of the cache in bytes (default 1 GB).
+    """
+    def __init__(self, root=os.path.join('cache', 'models'), max_bytes=2**30):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True) # also created by other processes
+
+    def entry(self, key):
+        return os.path.join(self.root, key)
+
+    def __contains__(self, key):
+        return os.path.exists(os.path.join(self.entry(key), 'maps.pkl'))
+
+    def get(self, key):
+        """
+        Read a cached model.
+
+        Returns:
+            model: gurobipy model read from the MPS file (None if the key is not cached).
+            maps: Dictionary of node and edge maps (None if the key is not cached).
+        """
+        if key not in self:
+            return None, None
+        import gurobipy
+        path = self.entry(key)
+        try:
+            with open(os.path.join(path, 'maps.pkl'), 'rb') as fp:
+                maps = pickle.load(fp)
+            model = gurobipy.read(os.path.join(path, 'model.mps'))
+            os.utime(path) # mark as recently used
+        except (OSError, EOFError, gurobipy.GurobiError): # evicted by another process
+            return None, None
+        return model, maps
+
+    def put(self, key, model, maps):
+        """
+        Store a built model and its maps, then evict entries beyond the size limit.
+        """
+        path = self.entry(key)
+        tmp = '{0}.tmp{1}'.format(path, os.getpid())
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(tmp)
+        model.update()
+        model.write(os.path.join(tmp, 'model.mps'))
+        with open(os.path.join(tmp, 'maps.pkl'), 'wb') as fp:
+            pickle.dump(maps, fp)
+        try:
+            os.rename(tmp, path)
+        except OSError: # stored by another process in the meantime
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict(keep=key)
+
+    def size(self, key):
+        """
+        Size of an entry in bytes (0 if it was evicted by another process).
+        """
+        path = self.entry(key)
+        try:
+            return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        except OSError:
+            return 0
+
+    def last_used(self, key):
+        """
+        Time of the last use of an entry (None if it was evicted by another process).
+        """
+        try:
+            return os.path.getmtime(self.entry(key))
+        except OSError:
+            return None
+
+    def evict(self, keep=None):
+        """
+        Remove the least recently used entries until the cache fits in max_bytes.
+        The entry keep (the one just stored) and the entries that other processes are still
+        writing (temporary directories) are not removed.
+        """
+        entries = []
+        for name in os.listdir(self.root):
+            if '.tmp' in name:
+                continue
+            last_used = self.last_used(name)
+            if last_used is not None and name in self:
+                entries.append((last_used, name))
+        entries.sort()
+        sizes = {key: self.size(key) for last_used, key in entries}
+        total = sum(sizes.values())
+        for last_used, key in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= sizes[key]
+            shutil.rmtree(self.entry(key), ignore_errors=True)
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        for name in os.listdir(self.root):
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
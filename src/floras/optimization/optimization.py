@@ -1,17 +1,23 @@
 '''
 Class to set up optimization problem, solve it, and parse the output.
 '''
-from gurobipy import GRB
 import time
 import numpy as np
 import networkx as nx
-from floras.optimization.utils import find_map_G_S
-from gurobipy import *
-from copy import deepcopy
+from floras.optimization.utils import find_map_G_S, incidence_matrix, selection_matrix, coreachable
+from floras.optimization.backends import SparseModel, GurobiBackend, get_backend
+from floras.optimization.portfolio import PortfolioBackend
+from floras.optimization.presolve import Reduction
+from floras.optimization.warm_start import static_warm_start
+from floras.optimization.termination import TerminationPolicy, Telemetry
+from gurobipy import GRB, Model, tupledict
+import scipy.sparse as sp
 import os
 import json
+import builtins
 
-from ipdb import set_trace as st
+# File with the data of the last solve written by parse_solution (None to not write it)
+OPT_DATA_PATH = os.path.join('log', 'opt_data.json')
 
 class MILP():
     """
@@ -22,10 +28,35 @@ class MILP():
         SD: GraphData object representing the system virtual graph S.
         type: Type of the optimization to call (default is static).
         callback: If callback function should be used (default 'cb').
+        map_G_to_S: Nodes of S with the same system state as each node of G (computed if not given).
+        builder: Build the model constraint by constraint ('loop', default) or with sparse matrices ('matrix').
+        aggregate_cuts: In the static case, use one cut variable per physical transition instead of
+            coupling the cut variables of its copies in G with equality constraints (default False).
+        reduction: Reduction record if GD is the output of the graph presolve (default None).
+        backend: Solver backend ('gurobi', default, or 'highs'). Backends other than Gurobi
+            always use the matrix builder.
+        warm_start: In the static case, start the solver from a max-flow/min-cut solution (default False).
+        seed: Random seed of the solver (default None, drawn at random and logged). With a
+            portfolio, the seed of its first profile.
+        portfolio: Solve with a portfolio of Gurobi seeds and parameter profiles in parallel
+            processes: number of profiles or list of parameter dictionaries (default None).
     """
-    def __init__(self, GD, SD, type = 'static', callback = 'cb'):
+    def __init__(self, GD, SD, type = 'static', callback = 'cb', map_G_to_S=None, builder = 'loop', aggregate_cuts = False, reduction = None, backend = 'gurobi', warm_start = False, seed = None, portfolio = None):
         self.type = type
+        self.warm_start = warm_start and type == 'static'
+        self.start_objective = None
+        self.start = []
+        self.positions = None
+        if portfolio is not None:
+            if backend != 'gurobi':
+                raise ValueError('The solver portfolio is only available with the gurobi backend.')
+            self.backend = PortfolioBackend(portfolio, seed=seed)
+        else:
+            self.backend = get_backend(backend, seed=seed)
+        self.builder = builder if isinstance(self.backend, GurobiBackend) else 'matrix'
+        self.aggregate_cuts = aggregate_cuts and type == 'static'
         self.GD = GD
+        self.node_dict = GD.node_dict
         self.SD = SD
         self.callback = callback
         self.cleaned_intermed = []
@@ -36,9 +67,67 @@ class MILP():
         self.model_s_edges = []
         self.model_s_nodes = []
         self.model = None
-        self.map_G_to_S = None
+        self.sparse = None
+        self.data = dict()
+        self.f = None
+        self.d = None
+        self.m = None
+        self.constrs = dict() # constraint handles of the loop builder by name
+        self.map_G_to_S = map_G_to_S
+        self.reduction = reduction
         self.G, self.S, self.G_minus_I = self.prepare()
 
+    @classmethod
+    def from_cache(cls, model, maps, callback='cb', seed=None):
+        """
+        MILP for a model read from the model cache, ready to be solved and parsed.
+
+        Args:
+            model: gurobipy model read from the cache.
+            maps: Node and edge maps stored with the model (see cache_maps).
+            callback: If callback function should be used (default 'cb').
+            seed: Random seed of the solver (default None).
+        """
+        milp = cls.__new__(cls)
+        milp.type = maps["type"]
+        milp.callback = callback
+        milp.builder = 'cached'
+        milp.backend = GurobiBackend(seed=seed)
+        milp.backend.wrap(model)
+        milp.model = model
+        milp.data = dict()
+        milp.model_edges = maps["model_edges"]
+        milp.model_edges_without_I = maps["model_edges_without_I"]
+        milp.src = maps["src"]
+        milp.node_dict = maps["node_dict"]
+        milp.reduction = maps["reduction"]
+        milp.positions = maps["positions"]
+        milp.start = maps["start"]
+        milp.start_objective = maps["start_objective"]
+        for positions, values in milp.start:
+            milp.backend.set_start(positions, values)
+        return milp
+
+    def cache_maps(self):
+        """
+        Node and edge maps needed to parse the solution of the built model, stored in the model cache.
+        """
+        nodes = set(i for edge in self.model_edges for i in edge)
+        reduction = None
+        if self.reduction is not None:
+            reduction = Reduction(None, self.reduction.edge_map, self.reduction.edge_keys,
+                                  self.reduction.n_original_edges, self.reduction.stages)
+            nodes.update(i for edges in reduction.edge_map.values() for edge in edges for i in edge)
+        return {"type": self.type,
+                "model_edges": self.model_edges,
+                "model_edges_without_I": self.model_edges_without_I,
+                "src": self.src,
+                "node_dict": {node: self.node_dict[node] for node in nodes},
+                "reduction": reduction,
+                "positions": self.positions,
+                "start": self.start,
+                "start_objective": self.start_objective}
+
     def prepare(self):
         """
         Prepares the edges and nodes needed for the optimization variables.
@@ -59,7 +148,7 @@ class MILP():
         G.remove_edges_from(to_remove)
 
         # remove intermediate nodes
-        G_minus_I = deepcopy(G)
+        G_minus_I = G.copy()
         G_minus_I.remove_nodes_from(self.cleaned_intermed)
 
         # create S and remove self-loops
@@ -85,20 +174,103 @@ class MILP():
 
         return G, S, G_minus_I
 
-    def static_model(self):
+    def d_domain(self):
         '''
-        Set up the model for the static case.
+        Edges that can be cut (all edges in the static case, edges without I nodes in the reactive case).
+        '''
+        if self.type == 'static':
+            return self.model_edges
+        return self.model_edges_without_I
+
+    def edge_key(self, i, j):
+        '''
+        Physical transition (out_state, in_state) of the edge (i, j) of G.
+        '''
+        if self.reduction is not None:
+            return self.reduction.edge_keys[i,j]
+        return (self.GD.node_dict[i][0], self.GD.node_dict[j][0])
+
+    def cut_weight(self, i, j):
+        '''
+        Number of edges of the original graph that are cut when the edge (i, j) of G is cut.
+        '''
+        if self.reduction is not None:
+            return len(self.reduction.edge_map[i,j])
+        return 1
+
+    def n_cost_edges(self):
+        '''
+        Number of edges of the original graph, used to scale the cut regularization.
+        '''
+        if self.reduction is not None:
+            return self.reduction.n_original_edges
+        return len(self.model_edges)
+
+    def cut_groups(self):
+        '''
+        Group the edges of G by the physical transition (out_state, in_state) they are a copy of.
+
+        Returns:
+            groups: Dictionary mapping (out_state, in_state) to the list of edges of G.
+        '''
+        groups = dict()
+        for (i,j) in self.model_edges:
+            key = self.edge_key(i,j)
+            groups.setdefault(key, []).append((i,j))
+        return groups
+
+    def cut_variable_index(self):
         '''
+        Index of the cut variable of every edge in d_domain. If cuts are aggregated, all copies of
+        a physical transition and of its reverse share one variable.
+
+        Returns:
+            d_pos: Dictionary mapping each edge in d_domain to the index of its cut variable.
+            n_d: Number of cut variables.
+        '''
+        if not self.aggregate_cuts:
+            d_pos = {edge: k for k, edge in enumerate(self.d_domain())}
+            return d_pos, len(d_pos)
+        group_ids = dict()
+        d_pos = dict()
+        n_d = 0
+        for (out_state, in_state), edges in self.cut_groups().items():
+            reverse = group_ids.get((in_state, out_state))
+            if reverse is None: # new variable, shared with the reverse transition
+                group_ids[out_state, in_state] = n_d
+                n_d += 1
+            else:
+                group_ids[out_state, in_state] = reverse
+            for edge in edges:
+                d_pos[edge] = group_ids[out_state, in_state]
+        return d_pos, n_d
+
+    def flow_model(self):
+        '''
+        Create the model with the flow, cut and partition variables, the objective, and the
+        constraints shared by the static and reactive cases.
+
+        Returns:
+            f: Flow variables on the edges of G.
+            d: Cut variables.
+            m: Partition variables on the nodes of G without I.
+        '''
+        d_domain = self.d_domain()
         self.model = Model()
         # Define variables
         f = self.model.addVars(self.model_edges, name="flow")
         m = self.model.addVars(self.model_nodes_without_I, name="m")
-        d = self.model.addVars(self.model_edges, vtype=GRB.BINARY, name="d")
+        if self.aggregate_cuts:
+            d_pos, n_d = self.cut_variable_index()
+            d_shared = self.model.addVars(n_d, vtype=GRB.BINARY, name="d")
+            d = tupledict({edge: d_shared[d_pos[edge]] for edge in d_domain})
+        else:
+            d = self.model.addVars(d_domain, vtype=GRB.BINARY, name="d")
 
         # Define Objective
         term = sum(f[i,j] for (i, j) in self.model_edges if i in self.src)
-        ncuts = sum(d[i,j] for (i, j) in self.model_edges)
-        reg = 1/len(self.model_edges)
+        ncuts = sum(self.cut_weight(i,j)*d[i,j] for (i, j) in d_domain)
+        reg = 1/self.n_cost_edges()
         self.model.setObjective(term - reg*ncuts, GRB.MAXIMIZE)
 
         # Add the constraints
@@ -108,32 +280,123 @@ class MILP():
         self.no_flow_in_source_out_sink_constraints(f)
         self.cut_constraints(f,d)
         self.partition_constraints(d,m)
-        self.static_constraints(d)
-        self.bidirectional_constraints(d)
-
-    def reactive_model(self):
-        # for the flow on S
-        self.map_G_to_S = find_map_G_S(self.GD,self.SD)
+        return f, d, m
 
-        self.model = Model()
-        # Define variables
-        f = self.model.addVars(self.model_edges, name="flow")
-        m = self.model.addVars(self.model_nodes_without_I, name="m")
-        d = self.model.addVars(self.model_edges_without_I, vtype=GRB.BINARY, name="d")
+    def matrix_flow_model(self):
+        '''
+        Same model as flow_model, described with the sparse node-edge incidence matrix of G
+        in a solver-independent SparseModel. Capacities, the partition variable bounds, and
+        the zero flow into the source and out of the sink are set as variable bounds.
+        '''
+        d_domain = self.d_domain()
+        src = set(self.src)
+        sink = set(self.sink)
+        node_pos = {node: k for k, node in enumerate(self.model_nodes)}
+        edge_pos = {edge: k for k, edge in enumerate(self.model_edges)}
+        d_pos, n_d = self.cut_variable_index()
+        m_pos = {node: k for k, node in enumerate(self.model_nodes_without_I)}
+        n_edges = len(self.model_edges)
+        self.d_index = np.array([d_pos[edge] for edge in d_domain], dtype=int)
+
+        self.sparse = SparseModel()
+        # Define variables (with bounds)
+        f_ub = np.array([0.0 if j in src or i in sink else 1.0 for (i,j) in self.model_edges])
+        self.sparse.add_variables("flow", n_edges, lb=0.0, ub=f_ub)
+        self.sparse.add_variables("m", len(m_pos), lb=0.0, ub=1.0)
+        self.sparse.add_variables("d", n_d, lb=0.0, ub=1.0, binary=True)
 
         # Define Objective
-        term = sum(f[i,j] for (i, j) in self.model_edges if i in self.src)
-        ncuts = sum(d[i,j] for (i, j) in self.model_edges_without_I)
-        reg = 1/len(self.model_edges)
-        self.model.setObjective(term - reg*ncuts, GRB.MAXIMIZE)
+        src_out = np.array([1.0 if i in src else 0.0 for (i,j) in self.model_edges])
+        D_cut = selection_matrix(self.d_index, n_d)
+        weights = np.array([self.cut_weight(i,j) for (i,j) in d_domain], dtype=float)
+        ncuts = D_cut.T @ weights # number of edges cut by each variable
+        reg = 1/self.n_cost_edges()
+        self.sparse.set_objective({"flow": src_out, "d": -reg*ncuts}, sense='max')
+
+        # conservation on all nodes except sources and sinks
+        B = incidence_matrix(node_pos, self.model_edges)
+        inner = [node_pos[l] for l in self.model_nodes if l not in src and l not in sink]
+        if inner:
+            self.sparse.add_constraints('conservation', [("flow", B[inner])], '=', 0.0)
 
-        # add constraints
-        self.bounds_constraints(f,d,m)
-        self.conservation_constraints(f)
-        self.preserve_flow_constraints(f)
-        self.no_flow_in_source_out_sink_constraints(f)
-        self.cut_constraints(f,d)
-        self.partition_constraints(d,m)
+        # preserve flow of at least 1
+        self.sparse.add_constraints('conserve_F', [("flow", sp.csr_matrix(src_out))], '>', 1.0)
+
+        # cut constraint (cut edges have zero flow)
+        if d_domain:
+            F_cut = selection_matrix([edge_pos[edge] for edge in d_domain], n_edges)
+            self.sparse.add_constraints('cut_cons', [("flow", F_cut), ("d", D_cut)], '<', 1.0)
+
+        # source sink partitions
+        pairs = [(i, j) for i in self.model_nodes_without_I if i in src for j in self.model_nodes_without_I if j in sink]
+        if pairs:
+            P = incidence_matrix(m_pos, pairs, sign=-1).T.tocsr()
+            self.sparse.add_constraints('partition', [("m", P)], '>', 1.0)
+
+        # max flow cut constraint (cut variable d partitions the groups)
+        if self.model_edges_without_I:
+            D_part = selection_matrix([d_pos[edge] for edge in self.model_edges_without_I], n_d)
+            M_part = incidence_matrix(m_pos, self.model_edges_without_I).T.tocsr()
+            self.sparse.add_constraints('partition_cut', [("d", D_part), ("m", M_part)], '>', 0.0)
+
+    def matrix_coupling_constraints(self):
+        '''
+        Same constraints as static_constraints and bidirectional_constraints for the SparseModel:
+        the copies of a physical transition and of its reverse are cut together with the first copy.
+        '''
+        d_pos, n_d = self.cut_variable_index()
+        groups = self.cut_groups()
+        pairs = set()
+        for (out_state, in_state), edges in groups.items():
+            for edge in edges[1:] + groups.get((in_state, out_state), []):
+                if edge != edges[0]:
+                    pairs.add((d_pos[edges[0]], d_pos[edge]))
+        if pairs:
+            pairs = sorted(pairs)
+            rows = np.repeat(np.arange(len(pairs)), 2)
+            cols = np.array(pairs).ravel()
+            vals = np.tile([1.0, -1.0], len(pairs))
+            C = sp.csr_matrix((vals, (rows, cols)), shape=(len(pairs), n_d))
+            self.sparse.add_constraints('static', [("d", C)], '=', 0.0)
+
+    def static_model(self):
+        '''
+        Set up the model for the static case.
+        '''
+        if self.builder == 'matrix':
+            self.matrix_flow_model()
+            if not self.aggregate_cuts:
+                self.matrix_coupling_constraints()
+            return
+        f, d, m = self.flow_model()
+        self.f, self.d, self.m = f, d, m
+        if not self.aggregate_cuts: # shared cut variables already couple the copies
+            self.static_constraints(d)
+            self.bidirectional_constraints(d)
+
+    def reactive_model(self):
+        '''
+        Set up the model for the reactive case.
+        '''
+        if self.builder == 'matrix':
+            self.matrix_flow_model()
+            self.matrix_s_flow_constraints(self.s_flow_sources())
+            return
+        f, d, m = self.flow_model()
+        self.f, self.d, self.m = f, d, m
+        self.s_flow_constraints(self.s_flow_sources(), d)
+
+    def s_flow_sources(self):
+        '''
+        Sources of the flows on S: for every history variable q, the nodes of S entered from a
+        different history variable that can reach a sink of S.
+
+        Returns:
+            s_data: List of (variable name, history variable q, source node in S).
+        '''
+        # for the flow on S
+        if self.map_G_to_S is None:
+            self.map_G_to_S = find_map_G_S(self.GD,self.SD)
 
         # --------- add feasibility constraints to preserve flow F_s >=1 on S for every q
         node_list = []
@@ -143,21 +406,20 @@ class MILP():
         qs = list(set([node[-1] for node in node_list]))
 
         # get the source/sink pairs (sink always T) for the history variables q
+        reaches_sink = coreachable(self.S, self.s_sink) # nodes of S with a path to a sink
+        entry_nodes = {} # nodes of G entered from a different history variable, by q
+        entry_graph = self.reduction.original.graph if self.reduction is not None else self.G
+        for (i,j) in entry_graph.edges:
+            q = self.GD.node_dict[j][-1]
+            if self.GD.node_dict[i][-1] != q:
+                entry_nodes.setdefault(q, set()).add(j)
         s_srcs = {}
         for q in qs:
-            transition_nodes = []
-            for edge in self.G.edges:
-                out_edge = self.GD.node_dict[edge[0]]
-                in_edge = self.GD.node_dict[edge[1]]
-                if in_edge[-1] == q and out_edge[-1] != q:
-                    node = edge[1]
-                    s_nodes = self.map_G_to_S[node]
-                    for target in self.s_sink:
-                        for s_node in s_nodes:
-                            if nx.has_path(self.S,s_node,target):
-                                transition_nodes.append(s_node)
-            clean_transition_nodes = list(set(transition_nodes))
-            s_srcs.update({q: clean_transition_nodes})
+            transition_nodes = set()
+            for node in entry_nodes.get(q, []):
+                s_nodes = np.asarray(self.map_G_to_S[node])
+                transition_nodes.update(s_nodes[reaches_sink[s_nodes]].tolist())
+            s_srcs.update({q: sorted(transition_nodes)})
         s_srcs.update({'q0': self.SD.init})
 
 
@@ -167,7 +429,17 @@ class MILP():
                 name = 'fS_'+ str(q) +'_'+ str(k)
                 source = s
                 s_data.append((name, q, source))
+        return s_data
+
+    def s_flow_constraints(self, s_data, d):
+        '''
+        Flow of at least 1 on S from each source in s_data, on the edges that are not cut in G.
 
+        Args:
+            s_data: List of (variable name, history variable q, source node in S).
+            d: Cut variables.
+        '''
+        s_edge_set = set(self.model_s_edges)
         f_s = [None for entry in s_data]
         for k,entry in enumerate(s_data):
             name = entry[0]
@@ -200,9 +472,63 @@ class MILP():
 
                         for imap in imaps:
                             for jmap in jmaps:
-                                if (imap,jmap) in self.SD.edges:
+                                if (imap,jmap) in s_edge_set:
                                     self.model.addConstr(f_s[k][imap, jmap] + d[i, j] <= 1)
 
+    def matrix_s_flow_constraints(self, s_data):
+        '''
+        Same constraints as s_flow_constraints for the SparseModel, built from the sparse incidence matrix of S.
+
+        Args:
+            s_data: List of (variable name, history variable q, source node in S).
+        '''
+        s_sink = set(self.s_sink)
+        s_node_pos = {node: k for k, node in enumerate(self.model_s_nodes)}
+        s_edge_pos = {edge: k for k, edge in enumerate(self.model_s_edges)}
+        d_pos, n_d = self.cut_variable_index()
+        n_s_edges = len(self.model_s_edges)
+        B_S = incidence_matrix(s_node_pos, self.model_s_edges)
+        into_sink = np.array([1.0 if j in s_sink else 0.0 for (i,j) in self.model_s_edges])
+        out_of_sink = np.array([i in s_sink for (i,j) in self.model_s_edges])
+        in_edges = dict() # S node -> positions of its incoming edges
+        for (i,j), pos in s_edge_pos.items():
+            in_edges.setdefault(j, []).append(pos)
+
+        # (S edge, cut variable) pairs for the edge cuts of G matched to S, per history variable q
+        cut_pairs = dict()
+        for (i,j) in self.model_edges_without_I:
+            pairs = cut_pairs.setdefault(self.GD.node_dict[i][-1], [])
+            for imap in self.map_G_to_S[i]:
+                for jmap in self.map_G_to_S[j]:
+                    if (imap,jmap) in s_edge_pos:
+                        pairs.append((s_edge_pos[imap,jmap], d_pos[i,j]))
+
+        for entry in s_data:
+            name = entry[0]
+            curr_q = entry[1]
+            s_src = entry[2]
+            if s_src in s_sink:
+                continue
+            # capacity on S and no flow into the source and out of the sinks as bounds
+            ub = np.where(out_of_sink, 0.0, 1.0)
+            ub[in_edges.get(s_src, [])] = 0.0
+            self.sparse.add_variables(name, n_s_edges, lb=0.0, ub=ub)
+
+            # Preserve flow of 1 in S
+            self.sparse.add_constraints(name + '_conserve_flow_1', [(name, sp.csr_matrix(into_sink))], '>', 1.0)
+
+            # conservation on S
+            inner = [s_node_pos[l] for l in self.model_s_nodes if l != s_src and l not in s_sink]
+            if inner:
+                self.sparse.add_constraints(name + '_conservation', [(name, B_S[inner])], '=', 0.0)
+
+            # Match the edge cuts from G to S
+            pairs = cut_pairs.get(curr_q, [])
+            if pairs:
+                F_match = selection_matrix([pair[0] for pair in pairs], n_s_edges)
+                D_match = selection_matrix([pair[1] for pair in pairs], n_d)
+                self.sparse.add_constraints(name + '_cut_match', [(name, F_match), ("d", D_match)], '<', 1.0)
+
     def bounds_constraints(self,f,d,m):
         # Define constraints
         if self.type == 'static':
@@ -210,27 +536,27 @@ class MILP():
         else:
             d_domain = self.model_edges_without_I
         # Nonnegativity - lower bounds
-        self.model.addConstrs((d[i, j] >= 0 for (i,j) in d_domain), name='d_nonneg')
-        self.model.addConstrs((m[i] >= 0 for i in self.model_nodes_without_I), name='mu_nonneg')
-        self.model.addConstrs((f[i, j] >= 0 for (i,j) in self.model_edges), name='f_nonneg')
+        self.constrs['d_nonneg'] = self.model.addConstrs((d[i, j] >= 0 for (i,j) in d_domain), name='d_nonneg')
+        self.constrs['mu_nonneg'] = self.model.addConstrs((m[i] >= 0 for i in self.model_nodes_without_I), name='mu_nonneg')
+        self.constrs['f_nonneg'] = self.model.addConstrs((f[i, j] >= 0 for (i,j) in self.model_edges), name='f_nonneg')
 
         # upper bounds
-        self.model.addConstrs((d[i, j] <= 1 for (i,j) in d_domain), name='d_upper_b')
-        self.model.addConstrs((m[i] <= 1 for i in self.model_nodes_without_I), name='mu_upper_b')
+        self.constrs['d_upper_b'] = self.model.addConstrs((d[i, j] <= 1 for (i,j) in d_domain), name='d_upper_b')
+        self.constrs['mu_upper_b'] = self.model.addConstrs((m[i] <= 1 for i in self.model_nodes_without_I), name='mu_upper_b')
         # capacity (upper bound for f)
-        self.model.addConstrs((f[i, j] <= 1 for (i,j) in self.model_edges), name='capacity')
+        self.constrs['capacity'] = self.model.addConstrs((f[i, j] <= 1 for (i,j) in self.model_edges), name='capacity')
 
     def conservation_constraints(self,f):
         # conservation
-        self.model.addConstrs((sum(f[i,j] for (i,j) in self.model_edges if j == l) == sum(f[i,j] for (i,j) in self.model_edges if i == l) for l in self.model_nodes if l not in self.src and l not in self.sink), name='conservation')
+        self.constrs['conservation'] = self.model.addConstrs((sum(f[i,j] for (i,j) in self.model_edges if j == l) == sum(f[i,j] for (i,j) in self.model_edges if i == l) for l in self.model_nodes if l not in self.src and l not in self.sink), name='conservation')
 
     def preserve_flow_constraints(self,f):
         # preserve flow of at least 1
-        self.model.addConstr((1 <= sum(f[i,j] for (i, j) in self.model_edges if i in self.src)), name='conserve_F')
+        self.constrs['conserve_F'] = self.model.addConstr((1 <= sum(f[i,j] for (i, j) in self.model_edges if i in self.src)), name='conserve_F')
 
     def no_flow_in_source_out_sink_constraints(self,f):
         # no flow into source or out of sink
-        self.model.addConstrs((f[i,j] == 0 for (i,j) in self.model_edges if j in self.src or i in self.sink), name="no_out_sink_in_src")
+        self.constrs['no_out_sink_in_src'] = self.model.addConstrs((f[i,j] == 0 for (i,j) in self.model_edges if j in self.src or i in self.sink), name="no_out_sink_in_src")
 
     def cut_constraints(self,f,d):
         if self.type == 'static':
@@ -238,35 +564,40 @@ class MILP():
         else:
             d_domain = self.model_edges_without_I
         # cut constraint (cut edges have zero flow)
-        self.model.addConstrs((f[i,j] + d[i,j] <= 1 for (i,j) in d_domain), name='cut_cons')
+        self.constrs['cut_cons'] = self.model.addConstrs((f[i,j] + d[i,j] <= 1 for (i,j) in d_domain), name='cut_cons')
 
     def partition_constraints(self,d,m):
         # source sink partitions
-        for i in self.model_nodes_without_I:
-            for j in self.model_nodes_without_I:
-                if i in self.src and j in self.sink:
-                    self.model.addConstr(m[i] - m[j] >= 1)
+        self.constrs['partition'] = self.model.addConstrs((m[i] - m[j] >= 1 for i in self.model_nodes_without_I if i in self.src
+                                                           for j in self.model_nodes_without_I if j in self.sink), name='partition')
 
         # max flow cut constraint (cut variable d partitions the groups)
-        self.model.addConstrs((d[i,j] - m[i] + m[j] >= 0 for (i,j) in self.model_edges_without_I))
+        self.constrs['partition_cut'] = self.model.addConstrs((d[i,j] - m[i] + m[j] >= 0 for (i,j) in self.model_edges_without_I), name='partition_cut')
 
     def static_constraints(self,d):
         # --------- map static obstacles to other edges in G
-        for count, (i,j) in enumerate(self.model_edges):
-            out_state = self.GD.node_dict[i][0]
-            in_state = self.GD.node_dict[j][0]
-            for (imap,jmap) in self.model_edges[count+1:]:
-                if out_state == self.GD.node_dict[imap][0] and in_state == self.GD.node_dict[jmap][0]:
-                    self.model.addConstr(d[i, j] == d[imap, jmap])
+        # all copies of a physical transition are cut together with the first copy
+        self.constrs['static'] = dict()
+        groups = self.cut_groups()
+        for key in groups:
+            self.static_group_constraints(d, groups, key)
+
+    def static_group_constraints(self, d, groups, key):
+        edges = groups[key]
+        self.constrs['static'][key] = [self.model.addConstr(d[edges[0]] == d[imap, jmap]) for (imap,jmap) in edges[1:]]
 
     def bidirectional_constraints(self,d):
         # ---------  add bidirectional cuts on G (for static examples)
-        for count, (i,j) in enumerate(self.model_edges):
-            out_state = self.GD.node_dict[i][0]
-            in_state = self.GD.node_dict[j][0]
-            for (imap,jmap) in self.model_edges[count+1:]:
-                if in_state == self.GD.node_dict[imap][0] and out_state == self.GD.node_dict[jmap][0]:
-                    self.model.addConstr(d[i, j] == d[imap, jmap])
+        # the copies of the reverse transition are cut together with the first copy
+        self.constrs['bidirectional'] = dict()
+        groups = self.cut_groups()
+        for key in groups:
+            self.bidirectional_group_constraints(d, groups, key)
+
+    def bidirectional_group_constraints(self, d, groups, key):
+        edges = groups[key]
+        self.constrs['bidirectional'][key] = [self.model.addConstr(d[edges[0]] == d[imap, jmap])
+                                              for (imap,jmap) in groups.get((key[1], key[0]), []) if (imap,jmap) != edges[0]]
 
     def setup_model(self):
         """
@@ -279,32 +610,269 @@ class MILP():
             self.reactive_model()
         else:
             print('Requested optimization type not available, options are \'static\' or \'reactive\'.')
+        if self.builder == 'matrix':
+            self.model = self.backend.build(self.sparse)
+        else:
+            self.backend.wrap(self.model)
+        self.positions = self.variable_positions()
+        if self.warm_start:
+            self.set_warm_start()
 
-    def solve_problem(self):
+    def rebuild(self, GD, SD, map_G_to_S=None):
         """
-        Solve the model.
+        Rebuild the model for a changed virtual product graph with the same node ids (see
+        Product.pruned_sync_prod), reusing the variables and constraints of the unchanged nodes and
+        edges. This is not an incremental update: the graphs and the node and edge lists are
+        recomputed from GD and SD, and the cut objective coefficients are rescaled to the new number
+        of edges. Only the variables and constraints of the removed and added nodes and edges are
+        removed from and added to the existing model, and the solution of the previous solve is kept
+        as the MIP start. Variables are reused in the static case with the loop builder, without
+        aggregated cuts and with the Gurobi backend; otherwise the model is built from scratch.
+
+        Args:
+            GD: GraphData object of the changed virtual product graph.
+            SD: GraphData object of the changed virtual system graph.
+            map_G_to_S: Nodes of S with the same system state as each node of G (computed if not given).
+
+        Returns:
+            changes: Dictionary with the number of added and removed nodes and edges of G, and
+                'reused': True if the variables were reused, False if the model was built from scratch.
         """
-        # --------- set parameters
-        # Last updated objective and time (for callback function)
-        self.model._cur_obj = float('inf')
-        self.model._time = time.time()
-        self.model.Params.Seed = np.random.randint(0,100)
+        if self.reduction is not None:
+            raise ValueError('Models of presolved graphs cannot be rebuilt, set up a new MILP.')
+        old_edges = set(self.model_edges)
+        old_nodes = set(self.model_nodes)
+        old_roles = {node: self.node_role(node) for node in old_nodes}
+        old_keys = {edge: self.edge_key(*edge) for edge in old_edges}
+        reuse = (self.type == 'static' and self.builder == 'loop' and not self.aggregate_cuts
+                 and isinstance(self.backend, GurobiBackend) and self.model is not None)
+        if reuse and self.model.SolCount >= 1:
+            f_prev = {edge: var.X for edge, var in self.f.items()}
+            d_prev = {edge: var.X for edge, var in self.d.items()}
+            m_prev = {node: var.X for node, var in self.m.items()}
+        else:
+            f_prev, d_prev, m_prev = dict(), dict(), dict()
 
+        self.GD = GD
+        self.node_dict = GD.node_dict
+        self.SD = SD
+        self.map_G_to_S = map_G_to_S
+        self.G, self.S, self.G_minus_I = self.prepare()
+
+        # nodes that changed between source, sink and intermediate are removed and added again
+        new_nodes = set(self.model_nodes)
+        changed = set(node for node in old_nodes & new_nodes if old_roles[node] != self.node_role(node))
+        removed_nodes = (old_nodes - new_nodes) | changed
+        added_nodes = (new_nodes - old_nodes) | changed
+        new_edges = set(self.model_edges)
+        touched = set(edge for edge in old_edges & new_edges if edge[0] in changed or edge[1] in changed)
+        removed_edges = (old_edges - new_edges) | touched
+        added_edges = (new_edges - old_edges) | touched
+        changes = {"added_nodes": len(new_nodes - old_nodes), "removed_nodes": len(old_nodes - new_nodes),
+                   "added_edges": len(new_edges - old_edges), "removed_edges": len(old_edges - new_edges),
+                   "reused": reuse}
+
+        if not reuse:
+            self.constrs = dict()
+            self.start = []
+            self.start_objective = None
+            self.setup_model()
+            return changes
+
+        keys = set(old_keys[edge] for edge in removed_edges) | set(self.edge_key(*edge) for edge in added_edges)
+        keys |= set((in_state, out_state) for (out_state, in_state) in keys)
+        self.remove_from_model(removed_nodes, removed_edges, keys)
+        self.add_to_model(added_nodes, added_edges, keys)
+
+        # previous solution as MIP start
+        for variables, values in ((self.f, f_prev), (self.d, d_prev), (self.m, m_prev)):
+            for key, value in values.items():
+                if key in variables:
+                    variables[key].Start = value
+        self.backend.wrap(self.model)
+        self.positions = self.variable_positions()
+        self.start = []
+        self.start_objective = None
+        if self.warm_start:
+            self.set_warm_start()
+        return changes
+
+    def node_role(self, node):
+        '''
+        Membership of a node of G in the sources, sinks and intermediate nodes.
+        '''
+        return (node in self.src, node in self.sink, node in self.inter)
+
+    def remove_from_model(self, nodes, edges, keys):
+        '''
+        Remove the variables and constraints of the given nodes and edges, and the coupling
+        constraints of the physical transitions in keys.
+        '''
+        edge_groups = ['d_nonneg', 'd_upper_b', 'f_nonneg', 'capacity', 'cut_cons', 'no_out_sink_in_src', 'partition_cut']
+        node_groups = ['mu_nonneg', 'mu_upper_b', 'conservation']
+        for name in edge_groups:
+            for edge in edges:
+                if edge in self.constrs[name]:
+                    self.model.remove(self.constrs[name].pop(edge))
+        for name in node_groups:
+            for node in nodes:
+                if node in self.constrs[name]:
+                    self.model.remove(self.constrs[name].pop(node))
+        for pair in [pair for pair in self.constrs['partition'] if pair[0] in nodes or pair[1] in nodes]:
+            self.model.remove(self.constrs['partition'].pop(pair))
+        for name in ('static', 'bidirectional'):
+            for key in keys:
+                for constr in self.constrs[name].pop(key, []):
+                    self.model.remove(constr)
+        for edge in edges:
+            self.model.remove(self.f.pop(edge))
+            self.model.remove(self.d.pop(edge))
+        for node in nodes:
+            if node in self.m:
+                self.model.remove(self.m.pop(node))
+
+    def add_to_model(self, nodes, edges, keys):
+        '''
+        Add the variables and constraints of the given nodes and edges, update the conservation
+        constraints and the objective, and add the coupling constraints of the physical transitions in keys.
+        '''
+        src = set(self.src)
+        sink = set(self.sink)
+        inter = set(self.inter)
+        f, d, m = self.f, self.d, self.m
+        for node in nodes:
+            if node not in inter:
+                m[node] = self.model.addVar(name='m[{0}]'.format(node))
+                self.constrs['mu_nonneg'][node] = self.model.addConstr(m[node] >= 0, name='mu_nonneg[{0}]'.format(node))
+                self.constrs['mu_upper_b'][node] = self.model.addConstr(m[node] <= 1, name='mu_upper_b[{0}]'.format(node))
+        for (i,j) in edges:
+            name = '[{0},{1}]'.format(i,j)
+            f[i,j] = self.model.addVar(obj=1.0 if i in src else 0.0, name='flow'+name)
+            d[i,j] = self.model.addVar(vtype=GRB.BINARY, name='d'+name)
+            self.constrs['d_nonneg'][i,j] = self.model.addConstr(d[i,j] >= 0, name='d_nonneg'+name)
+            self.constrs['d_upper_b'][i,j] = self.model.addConstr(d[i,j] <= 1, name='d_upper_b'+name)
+            self.constrs['f_nonneg'][i,j] = self.model.addConstr(f[i,j] >= 0, name='f_nonneg'+name)
+            self.constrs['capacity'][i,j] = self.model.addConstr(f[i,j] <= 1, name='capacity'+name)
+            self.constrs['cut_cons'][i,j] = self.model.addConstr(f[i,j] + d[i,j] <= 1, name='cut_cons'+name)
+            if j in src or i in sink:
+                self.constrs['no_out_sink_in_src'][i,j] = self.model.addConstr(f[i,j] == 0, name='no_out_sink_in_src'+name)
+            if i not in inter and j not in inter:
+                self.constrs['partition_cut'][i,j] = self.model.addConstr(d[i,j] - m[i] + m[j] >= 0, name='partition_cut'+name)
+        # partitions of the new sources with all sinks and of all sources with the new sinks
+        srcs = [i for i in self.model_nodes_without_I if i in src]
+        sinks = [j for j in self.model_nodes_without_I if j in sink]
+        pairs = [(i,j) for i in srcs if i in nodes for j in sinks]
+        pairs += [(i,j) for j in sinks if j in nodes for i in srcs if i not in nodes]
+        for (i,j) in pairs:
+            self.constrs['partition'][i,j] = self.model.addConstr(m[i] - m[j] >= 1, name='partition[{0},{1}]'.format(i,j))
+        self.model.update()
+
+        # conservation: new constraints on the new nodes, new coefficients on the others
+        for node in nodes:
+            if node not in src and node not in sink:
+                in_flow = sum(f[i,node] for i in self.G.predecessors(node))
+                out_flow = sum(f[node,j] for j in self.G.successors(node))
+                self.constrs['conservation'][node] = self.model.addConstr(in_flow == out_flow, name='conservation[{0}]'.format(node))
+        for (i,j) in edges:
+            if j in self.constrs['conservation'] and j not in nodes:
+                self.model.chgCoeff(self.constrs['conservation'][j], f[i,j], 1.0)
+            if i in self.constrs['conservation'] and i not in nodes:
+                self.model.chgCoeff(self.constrs['conservation'][i], f[i,j], -1.0)
+            if i in src:
+                self.model.chgCoeff(self.constrs['conserve_F'], f[i,j], 1.0)
+
+        # the cut regularization depends on the number of edges
+        self.f = tupledict({edge: f[edge] for edge in self.model_edges})
+        self.d = tupledict({edge: d[edge] for edge in self.model_edges})
+        self.m = tupledict({node: m[node] for node in self.model_nodes_without_I})
+        reg = 1/self.n_cost_edges()
+        for (i,j), var in self.d.items():
+            var.Obj = -reg*self.cut_weight(i,j)
+
+        groups = self.cut_groups()
+        for key in keys:
+            if key in groups:
+                self.static_group_constraints(self.d, groups, key)
+                self.bidirectional_group_constraints(self.d, groups, key)
+        self.model.update()
+
+    def variable_positions(self):
+        """
+        Positions of the flow variables, the cut variables (one per edge in d_domain) and the
+        partition variables in the variable vector of the model.
+
+        Returns:
+            positions: Dictionary with the arrays of positions of 'flow', 'd' and 'm'.
+        """
+        if self.builder == 'matrix':
+            blocks = self.sparse.blocks
+            return {"flow": np.arange(blocks["flow"].start, blocks["flow"].stop),
+                    "d": blocks["d"].start + self.d_index,
+                    "m": np.arange(blocks["m"].start, blocks["m"].stop)}
+        return {"flow": np.array([self.f[edge].index for edge in self.model_edges], dtype=int),
+                "d": np.array([self.d[edge].index for edge in self.d_domain()], dtype=int),
+                "m": np.array([self.m[node].index for node in self.model_nodes_without_I], dtype=int)}
+
+    def set_warm_start(self):
+        """
+        Pass the max-flow/min-cut solution of the static case to the solver as a MIP start.
+        """
+        start = static_warm_start(self)
+        if start is None:
+            return
+        f_vals, d_vals, m_vals = start
+        src = set(self.src)
+        flow = sum(f_vals[k] for k, (i,j) in enumerate(self.model_edges) if i in src)
+        weights = np.array([self.cut_weight(i,j) for (i,j) in self.d_domain()], dtype=float)
+        self.start_objective = float(flow - (weights @ d_vals)/self.n_cost_edges())
+        self.start = [(self.positions["flow"], f_vals), (self.positions["d"], d_vals), (self.positions["m"], m_vals)]
+        for positions, values in self.start:
+            self.backend.set_start(positions, values)
+
+    def solve_problem(self, policy=None, telemetry=None):
+        """
+        Solve the model.
+
+        Args:
+            policy: TerminationPolicy (default: stop if the objective has not improved in 60 seconds
+                or no solution was found in 10 minutes).
+            telemetry: Path of a JSON-lines file to record the incumbent, bound, gap and node
+                count at every solver event (default None).
+        """
+        if policy is None:
+            policy = TerminationPolicy()
         # store model data for logging
-        self.model._data = dict()
-        self.model._data["term_condition"] = None
+        self.data = dict()
+        self.data["term_condition"] = None
+
+        recorder = None
+        if telemetry is not None:
+            recorder = Telemetry(telemetry)
+            recorder.start(type=self.type, backend=self.backend.name)
 
         # optimize
-        if self.callback=="cb":
-            t0 = time.time()
-            self.model.optimize(callback=cb)
-            tf = time.time()
-            delt = tf - t0
-        else:
-            t0 = time.time()
-            self.model.optimize()
-            tf = time.time()
-            delt = tf - t0
+        try:
+            if self.callback=="cb":
+                self.backend.optimize(self.data, callback=cb, policy=policy, telemetry=recorder)
+            else:
+                self.backend.optimize(self.data, policy=policy, telemetry=recorder)
+        finally:
+            if recorder is not None:
+                recorder.close()
+
+    def flow_values(self):
+        """
+        Returns:
+            f_vals: Solution values of the flow on the edges of G.
+        """
+        return self.backend.values(self.positions["flow"])
+
+    def cut_values(self):
+        """
+        Returns:
+            d_vals: Solution values of the cut variables of the edges in d_domain.
+        """
+        return self.backend.values(self.positions["d"])
 
     def parse_solution(self, print=False):
         """
@@ -315,109 +883,122 @@ class MILP():
             flow: Vector of flow values for each edge.
             exit_status: Exit status of the optimization.
         """
-        self.model._data["runtime"] = self.model.Runtime
-        self.model._data["flow"] = None
-        self.model._data["ncuts"] = None
-
-        # Storing problem variables:
-        self.model._data["n_bin_vars"] = self.model.NumBinVars
-        self.model._data["n_cont_vars"] = self.model.NumVars - self.model.NumBinVars
-        self.model._data["n_constrs"] = self.model.NumConstrs
-
-        f_vals = []
-        d_vals = []
+        self.data.update(self.backend.stats())
+        self.data["backend"] = self.backend.name
+        self.data["start_objective"] = self.start_objective
+        self.data["flow"] = None
+        self.data["ncuts"] = None
+        if self.reduction is not None:
+            self.data["presolve"] = self.reduction.stages
+
+        d_parsed = None
         flow = None
         exit_status = None
-        f = self.model.getVarByName("flow")
-        d = self.model.getVarByName("d")
 
-        if self.model.status == 4:
-            self.model.Params.DualReductions = 0
+        status = self.backend.status()
+        if status == 'inf/unbounded':
             exit_status = 'inf'
-            self.model._data["status"] = "inf/unbounded"
+            self.data["status"] = status
             return 0,0,exit_status
-        elif self.model.status == 11 and model.SolCount < 1:
+        elif status == 'not_solved':
             exit_status = 'not solved'
-            self.model._data["status"] = "not_solved"
-            self.model._data["exit_status"] = exit_status
-        elif self.model.status == 2 or (self.model.status == 11 and self.model.SolCount >= 1):
-            if self.model.status == 2:
-                self.model._data["status"] = "optimal"
-                self.model._data["term_condition"] = "optimal found"
-            else:
-                # feasible. maybe be optimal.
-                self.model._data["status"] = "feasible"
+            self.data["status"] = status
+            self.data["exit_status"] = exit_status
+        elif status in ('optimal', 'feasible'):
+            # feasible solutions may be optimal.
+            self.data["status"] = status
+            if status == 'optimal':
+                self.data["term_condition"] = "optimal found"
 
             # --------- parse output
-            d_vals = dict()
-            f_vals = dict()
-
-            for (i,j) in self.model_edges:
-                f_vals.update({(i,j): self.model.getVarByName('flow['+str(i)+','+str(j)+']').X})
-            if self.type == 'static':
-                for (i,j) in self.model_edges:
-                    d_vals.update({(i,j): self.model.getVarByName('d['+str(i)+','+str(j)+']').X})
-            elif self.type == 'reactive':
-                for (i,j) in self.model_edges_without_I:
-                    d_vals.update({(i,j): self.model.getVarByName('d['+str(i)+','+str(j)+']').X})
+            f_vals = self.flow_values()
+            d_vals = self.cut_values()
+
+            src = set(self.src)
+            from_src = np.fromiter((i in src for (i,j) in self.model_edges), dtype=bool, count=len(self.model_edges))
+            flow = float(f_vals[from_src].sum())
+            self.data["flow"] = flow
 
-            flow = sum(self.model.getVarByName('flow['+str(i)+','+str(j)+']').X for (i,j) in self.model_edges if i in self.src)
-            self.model._data["flow"] = flow
-            ncuts = 0
+            d_domain = self.d_domain()
+            cut_idx = np.flatnonzero(d_vals > 0.9)
 
             d_parsed = {}
-            for key in d_vals.keys():
-                if d_vals[key] > 0.9:
-                    ncuts+=1
-                    d_parsed.update({(self.GD.node_dict[key[0]], self.GD.node_dict[key[1]]) : d_vals[key]})
+            for k in cut_idx.tolist():
+                # report the cuts on the original graph if it was reduced by the presolve
+                cut_edges = self.reduction.edge_map[d_domain[k]] if self.reduction is not None else [d_domain[k]]
+                for (i,j) in cut_edges:
+                    d_parsed.update({(self.node_dict[i], self.node_dict[j]) : float(d_vals[k])})
                     if print:
-                        print('{0} to {1} at {2}'.format(self.GD.node_dict[key[0]], self.GD.node_dict[key[1]],d_vals[key]))
+                        builtins.print('{0} to {1} at {2}'.format(self.node_dict[i], self.node_dict[j], d_vals[k]))
+            ncuts = len(d_parsed)
 
-            self.model._data["ncuts"] = ncuts
+            self.data["ncuts"] = ncuts
             exit_status = 'opt'
-            self.model._data["exit_status"] = exit_status
-        elif self.model.status == 3:
+            self.data["exit_status"] = exit_status
+        elif status == 'inf':
             exit_status = 'inf'
-            self.model._data["status"] = "inf"
+            self.data["status"] = "inf"
         else:
-            st()
+            exit_status = status
+            self.data["status"] = status
 
-        if not os.path.exists("log"):
-            os.makedirs("log")
-        with open('log/opt_data.json', 'w') as fp:
-            json.dump(self.model._data, fp)
+        if OPT_DATA_PATH is not None:
+            if os.path.dirname(OPT_DATA_PATH):
+                os.makedirs(os.path.dirname(OPT_DATA_PATH), exist_ok=True)
+            with open(OPT_DATA_PATH, 'w') as fp:
+                json.dump(self.data, fp)
 
         return d_parsed, flow, exit_status
 
-    def optimize(self):
+    def optimize(self, policy=None, telemetry=None):
         """
         Setup the model, solve the problem, and parse the solution.
+
+        Args:
+            policy: TerminationPolicy passed to solve_problem (default None).
+            telemetry: Path of the JSON-lines telemetry file passed to solve_problem (default None).
         """
         self.setup_model()
-        self.solve_problem()
+        self.solve_problem(policy, telemetry)
         d_vals, flow, exit_status = self.parse_solution()
         return d_vals, flow, exit_status
 
 
 def cb(model, where):
     """
-    Callback function to terminate the program if the objective has not
-    improved in 60 seconds or no soution was found in 5 minutes.
+    Callback function to record the incumbent telemetry and to terminate the program following
+    the termination policy (by default, if the objective has not improved in 60 seconds or no
+    solution was found in 10 minutes).
     """
-    if where == GRB.Callback.MIPNODE:
+    if where == GRB.Callback.MIPSOL:
+        event = 'MIPSOL'
+        # best objective and solution count before the new solution
+        obj = model.cbGet(GRB.Callback.MIPSOL_OBJBST)
+        new_obj = model.cbGet(GRB.Callback.MIPSOL_OBJ)
+        obj = max(obj, new_obj) if model._maximize else min(obj, new_obj)
+        bound = model.cbGet(GRB.Callback.MIPSOL_OBJBND)
+        nodes = model.cbGet(GRB.Callback.MIPSOL_NODCNT)
+        sol_count = model.cbGet(GRB.Callback.MIPSOL_SOLCNT) + 1
+    elif where == GRB.Callback.MIPNODE:
+        event = 'MIPNODE'
         obj = model.cbGet(GRB.Callback.MIPNODE_OBJBST) # Current best objective
+        bound = model.cbGet(GRB.Callback.MIPNODE_OBJBND)
+        nodes = model.cbGet(GRB.Callback.MIPNODE_NODCNT)
         sol_count = model.cbGet(GRB.Callback.MIPNODE_SOLCNT) # No. of feasible solns found.
-
-        if abs(obj - model._cur_obj) > 1e-8:
-            # If so, update incumbent
-            model._cur_obj = obj
-
-        if sol_count >= 1:
-            if time.time() - model._time > 60:
-                model._data["term_condition"] = "Obj not changing"
-                model.terminate()
-        else:
-            # Total termination time if the optimizer has not found anything in 5 min:
-            if time.time() - model._time > 600:
-                model._data["term_condition"] = "Timeout"
-                model.terminate()
+    else:
+        return
+
+    now = time.time()
+    if abs(obj - model._cur_obj) > 1e-8:
+        # If so, update incumbent
+        model._cur_obj = obj
+        model._time_improved = now
+
+    if model._telemetry is not None:
+        model._telemetry.record(event, obj, bound, int(nodes), int(sol_count))
+
+    if model._policy is not None:
+        term_condition = model._policy.check(sol_count, now - model._time, now - model._time_improved)
+        if term_condition is not None:
+            model._data["term_condition"] = term_condition
+            model.terminate()
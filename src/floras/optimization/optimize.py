@@ -1,12 +1,65 @@
 from floras.optimization.setup_graphs import setup_nodes_and_edges
 from floras.optimization.optimization import MILP
+from floras.optimization.presolve import presolve as presolve_graph
+from floras.profiling import Profiler
 
-from ipdb import set_trace as st
+def solve(virtual, system, b_pi, virtual_sys, case = 'static', print_solution=True, plot_results=False, map_G_to_S=None, builder='loop', aggregate_cuts=False, presolve=False, backend='gurobi', warm_start=False, policy=None, telemetry=None, seed=None, portfolio=None, cache=None, cache_key=None, profiler=None):
+    if profiler is None:
+        profiler = Profiler(enabled=False)
+    with profiler.stage('graph_setup'):
+        GD, SD = setup_nodes_and_edges(virtual, virtual_sys, b_pi)
 
-def solve(virtual, system, b_pi, virtual_sys, case = 'static', print_solution=True, plot_results=False):
-    GD, SD = setup_nodes_and_edges(virtual, virtual_sys, b_pi)
+    reduction = None
+    if presolve:
+        with profiler.stage('presolve'):
+            GD, reduction = presolve_graph(GD, case)
+        reduction.print_stages()
 
-    milp = MILP(GD, SD, case)
-    d, flow, exit_status = milp.optimize()
+    with profiler.stage('model_build'):
+        milp = MILP(GD, SD, case, map_G_to_S=map_G_to_S, builder=builder, aggregate_cuts=aggregate_cuts, reduction=reduction, backend=backend, warm_start=warm_start, seed=seed, portfolio=portfolio)
+        milp.setup_model()
+    profiler.record('G', nodes=len(milp.model_nodes), edges=len(milp.model_edges))
+    profiler.record('S', nodes=len(milp.model_s_nodes), edges=len(milp.model_s_edges))
+    if cache is not None and cache_key is not None and milp.model is not None:
+        # store the built model to skip the construction in later runs
+        with profiler.stage('cache_write'):
+            cache.put(cache_key, milp.model, milp.cache_maps())
+    with profiler.stage('solve'):
+        milp.solve_problem(policy, telemetry)
+    with profiler.stage('parse'):
+        d, flow, exit_status = milp.parse_solution()
+    record_model_sizes(profiler, milp)
     if exit_status == 'opt':
         return d, flow
+
+def solve_cached(cache, cache_key, policy=None, telemetry=None, seed=None, profiler=None):
+    """
+    Solve a model from the model cache, skipping the construction of the automata, the product and the model.
+
+    Args:
+        cache: ModelCache.
+        cache_key: Problem hash of the model.
+        profiler: Profiler to record the stages to (default None).
+
+    Returns:
+        d: Cut edges.
+        flow: Flow value.
+    """
+    if profiler is None:
+        profiler = Profiler(enabled=False)
+    with profiler.stage('cache_read'):
+        model, maps = cache.get(cache_key)
+        milp = MILP.from_cache(model, maps, seed=seed)
+    with profiler.stage('solve'):
+        milp.solve_problem(policy, telemetry)
+    with profiler.stage('parse'):
+        d, flow, exit_status = milp.parse_solution()
+    record_model_sizes(profiler, milp)
+    if exit_status == 'opt':
+        return d, flow
+
+def record_model_sizes(profiler, milp):
+    """
+    Record the model size and solver runtime logged by parse_solution.
+    """
+    profiler.record('model', **{key: milp.data.get(key) for key in ("n_bin_vars", "n_cont_vars", "n_constrs", "runtime")})
@@ -0,0 +1,153 @@
+"""Portfolio of Gurobi solves with different seeds and parameter profiles, run in a process pool."""
+import os
+import time
+import multiprocessing
+import numpy as np
+from floras.optimization.backends import Backend, GurobiBackend
+
+# Parameter profiles the portfolio cycles through (combined with distinct seeds)
+PARAMETER_PROFILES = [
+    {},
+    {"MIPFocus": 1}, # find feasible solutions quickly
+    {"MIPFocus": 2}, # prove optimality
+    {"Heuristics": 0.5},
+    {"Cuts": 2},
+    {"Presolve": 2},
+]
+
+def portfolio_profiles(n_profiles, seed=0):
+    """
+    Reproducible portfolio: profile k uses seed + k and the parameters PARAMETER_PROFILES[k] (cycled).
+
+    Args:
+        n_profiles: Number of profiles.
+        seed: Seed of the first profile (default 0).
+
+    Returns:
+        profiles: List of dictionaries of Gurobi parameters, including the Seed.
+    """
+    return [dict(PARAMETER_PROFILES[k % len(PARAMETER_PROFILES)], Seed=seed + k) for k in range(n_profiles)]
+
+def solve_profile(sparse_model, profile, start, callback, policy):
+    """
+    Solve the sparse model with Gurobi and one parameter profile (run in a worker process).
+
+    Returns:
+        result: Dictionary with the profile, status, solution x, objective, bound, node count,
+            model statistics and termination condition.
+    """
+    params = {param: value for param, value in profile.items() if param != "Seed"}
+    backend = GurobiBackend(seed=profile.get("Seed"), params=params)
+    backend.build(sparse_model)
+    for positions, values in start:
+        backend.set_start(positions, values)
+    data = {"term_condition": None}
+    backend.optimize(data, callback=callback, policy=policy)
+    status = backend.status()
+    found = status in ('optimal', 'feasible')
+    return {"profile": profile,
+            "status": status,
+            "x": np.asarray(backend.x.X) if found else None,
+            "objective": backend.model.ObjVal if found else None,
+            "bound": backend.model.ObjBound if backend.model.SolCount >= 1 else None,
+            "nodes": int(backend.model.NodeCount),
+            "stats": backend.stats(),
+            "term_condition": data["term_condition"]}
+
+
+def select_result(results, maximize=True):
+    """
+    Result of the portfolio: the first proven-optimal result, otherwise the best feasible result,
+    otherwise the first result.
+
+    Args:
+        results: Results of solve_profile in order of completion.
+        maximize: If the objective is maximized (default True).
+    """
+    optimal = [result for result in results if result["status"] == 'optimal']
+    feasible = [result for result in results if result["objective"] is not None]
+    if optimal:
+        return optimal[0]
+    if feasible:
+        return (max if maximize else min)(feasible, key=lambda result: result["objective"])
+    return results[0]
+
+
+class PortfolioBackend(Backend):
+    """
+    Runs the same sparse model with several Gurobi seeds and parameter profiles in a process pool.
+    The first proven-optimal solution is returned and the other solves are terminated. If no solve
+    proves optimality (within the time limit of the termination policy), the best solution is returned.
+
+    Args:
+        profiles: Number of profiles (from portfolio_profiles) or list of Gurobi parameter dictionaries.
+        seed: Seed of the first profile if profiles is a number (default 0).
+        processes: Number of worker processes (default: one per profile, at most the number of CPUs).
+        solver: Function solving the model with one profile in a worker process, with the
+            arguments and result of solve_profile (default solve_profile).
+    """
+    name = 'portfolio'
+
+    def __init__(self, profiles, seed=0, processes=None, solver=solve_profile):
+        if isinstance(profiles, int):
+            profiles = portfolio_profiles(profiles, seed if seed is not None else 0)
+        self.profiles = profiles
+        self.processes = processes if processes is not None else min(len(profiles), os.cpu_count() or 1)
+        self.solver = solver
+        self.sparse_model = None
+        self.start = []
+        self.result = None
+        self.results = []
+        self.runtime = None
+
+    def build(self, sparse_model):
+        self.sparse_model = sparse_model
+        return None
+
+    def set_start(self, positions, values):
+        self.start.append((positions, np.asarray(values)))
+
+    def optimize(self, data, callback=None, policy=None, telemetry=None):
+        maximize = self.sparse_model.sense == 'max'
+        threads = max(1, (os.cpu_count() or 1) // self.processes)
+        profiles = [dict({"Threads": threads, "OutputFlag": 0}, **profile) for profile in self.profiles]
+        t0 = time.time()
+        # spawn: the Gurobi environment of the parent process must not be forked
+        pool = multiprocessing.get_context('spawn').Pool(self.processes)
+        try:
+            pending = [pool.apply_async(self.solver, (self.sparse_model, profile, self.start, callback, policy)) for profile in profiles]
+            self.results = []
+            while pending:
+                done = [res for res in pending if res.ready()]
+                pending = [res for res in pending if not res.ready()]
+                for res in done:
+                    result = res.get()
+                    self.results.append(result)
+                    if telemetry is not None:
+                        telemetry.record('profile', result["objective"] if result["objective"] is not None else float('inf'),
+                                         result["bound"] if result["bound"] is not None else float('inf'),
+                                         result["nodes"], int(result["objective"] is not None))
+                if any(result["status"] == 'optimal' for result in self.results):
+                    break
+                if pending:
+                    time.sleep(0.01)
+        finally:
+            pool.terminate()
+            pool.join()
+        self.runtime = time.time() - t0
+
+        self.result = select_result(self.results, maximize)
+        data["term_condition"] = self.result["term_condition"]
+        data["seed"] = self.result["profile"].get("Seed")
+        data["profile"] = self.result["profile"]
+        data["portfolio"] = [{"profile": result["profile"], "status": result["status"], "objective": result["objective"],
+                              "runtime": result["stats"]["runtime"]} for result in self.results]
+
+    def status(self):
+        return self.result["status"]
+
+    def values(self, positions):
+        return self.result["x"][positions]
+
+    def stats(self):
+        return dict(self.result["stats"], runtime=self.runtime)
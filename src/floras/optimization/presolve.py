@@ -0,0 +1,149 @@
+"""Graph-level presolve of the virtual product graph before the MILP is set up."""
+import networkx as nx
+from floras.optimization.setup_graphs import GraphData
+from floras.optimization.utils import coreachable
+
+
+class Reduction:
+    """
+    Record of the presolve reductions, used to report the solution on the original graph.
+
+    Args:
+        original: GraphData of the virtual product graph before presolve.
+        edge_map: Each edge of the reduced graph mapped to the original edges that take its cut value.
+        edge_keys: Physical transition (out_state, in_state) of each edge of the reduced graph.
+        n_original_edges: Number of edges of the original graph without self-loops.
+        stages: Size of the graph and of the model after each presolve stage.
+    """
+    def __init__(self, original, edge_map, edge_keys, n_original_edges, stages):
+        self.original = original
+        self.edge_map = edge_map
+        self.edge_keys = edge_keys
+        self.n_original_edges = n_original_edges
+        self.stages = stages
+
+    def print_stages(self):
+        """
+        Print the reduction achieved by each presolve stage.
+        """
+        for stage in self.stages:
+            print('{0}: {1} nodes, {2} edges, {3} variables, {4} constraints'.format(
+                stage["stage"], stage["nodes"], stage["edges"], stage["n_vars"], stage["n_constrs"]))
+
+
+def model_size(G, init, sink, intermed, case):
+    """
+    Count the variables and constraints (without bounds) of the flow model on G.
+
+    Returns:
+        stage: Dictionary with the number of nodes, edges, variables and constraints.
+    """
+    G_minus_I = G.subgraph([node for node in G.nodes if node not in intermed])
+    n_d = G.number_of_edges() if case == 'static' else G_minus_I.number_of_edges()
+    n_inner = len([node for node in G.nodes if node not in init and node not in sink])
+    n_vars = G.number_of_edges() + n_d + G_minus_I.number_of_nodes()
+    n_constrs = n_inner + 1 + n_d + G_minus_I.number_of_edges()
+    return {"nodes": G.number_of_nodes(), "edges": G.number_of_edges(), "n_vars": n_vars, "n_constrs": n_constrs}
+
+def physical_groups(edge_keys):
+    """
+    Group the edges by physical transition, joining each transition with its reverse.
+
+    Returns:
+        groups: Dictionary mapping the frozenset of both directions to the list of edges.
+    """
+    groups = dict()
+    for edge, (out_state, in_state) in edge_keys.items():
+        groups.setdefault(frozenset([out_state, in_state]), []).append(edge)
+    return groups
+
+def remove_useless_nodes(G, init, sink, edge_map, edge_keys, case):
+    """
+    Remove the nodes that are not reachable from the initial nodes or cannot reach a sink.
+    No flow can pass through them, so their edges are never cut in an optimal solution unless
+    they are copies of a physical transition that is cut (static case). In the static case such
+    copies are recorded in the edge map of a remaining copy.
+    """
+    node_pos = {node: k for k, node in enumerate(G.nodes)}
+    H = nx.relabel_nodes(G, node_pos)
+    from_init = coreachable(H.reverse(copy=False), [node_pos[node] for node in init if node in node_pos])
+    to_sink = coreachable(H, [node_pos[node] for node in sink if node in node_pos])
+    useless = [node for node, k in node_pos.items() if not (from_init[k] and to_sink[k]) and node not in init and node not in sink]
+
+    removed_edges = list(G.in_edges(useless)) + list(G.out_edges(useless))
+    G.remove_nodes_from(useless)
+    if case == 'static':
+        remaining = physical_groups({edge: edge_keys[edge] for edge in G.edges})
+        for edge in set(removed_edges):
+            edges = remaining.get(frozenset(edge_keys[edge]))
+            if edges:
+                edge_map[edges[0]].extend(edge_map[edge])
+    for edge in set(removed_edges):
+        del edge_map[edge]
+        del edge_keys[edge]
+
+def contract_chains(G, init, sink, intermed, edge_map, edge_keys):
+    """
+    Contract nodes with a single incoming and a single outgoing edge (static case).
+    Both edges carry the same flow, so the chain u -> v -> w is replaced by an edge u -> w that
+    takes the cut value of u -> v. Only edges that are the sole copy of their physical transition
+    (and its reverse) and stand for a single original edge are contracted, since cutting them
+    does not affect any other edge.
+    """
+    keep = set(init) | set(sink) | set(intermed)
+    groups = physical_groups(edge_keys)
+    candidates = [node for node in G.nodes if node not in keep]
+    for v in candidates:
+        if G.in_degree(v) != 1 or G.out_degree(v) != 1:
+            continue
+        (u, _), = G.in_edges(v)
+        (_, w), = G.out_edges(v)
+        if u == w or G.has_edge(u, w):
+            continue
+        if len(groups[frozenset(edge_keys[u,v])]) > 1 or len(groups[frozenset(edge_keys[v,w])]) > 1:
+            continue
+        if len(edge_map[u,v]) > 1 or len(edge_map[v,w]) > 1:
+            continue
+        G.remove_node(v)
+        G.add_edge(u, w)
+        edge_map[u,w] = edge_map.pop((u,v))
+        edge_map.pop((v,w))
+        key = edge_keys.pop((u,v))
+        groups[frozenset(key)] = [(u,w)]
+        del groups[frozenset(edge_keys.pop((v,w)))]
+        edge_keys[u,w] = key
+
+def presolve(GD, case='static'):
+    """
+    Reduce the virtual product graph before the MILP is set up.
+
+    Args:
+        GD: GraphData object representing the virtual product graph G.
+        case: Type of the optimization ('static' or 'reactive').
+
+    Returns:
+        GD_reduced: GraphData object of the reduced graph.
+        reduction: Reduction record to map the solution back to GD.
+    """
+    intermed = set(GD.acc_test) - set(GD.acc_sys)
+    G = nx.DiGraph()
+    G.add_nodes_from(GD.nodes)
+    G.add_edges_from((i,j) for (i,j) in GD.edges if i != j)
+    n_original_edges = G.number_of_edges()
+    edge_map = {edge: [edge] for edge in G.edges}
+    edge_keys = {(i,j): (GD.node_dict[i][0], GD.node_dict[j][0]) for (i,j) in G.edges}
+
+    stages = [dict(stage="original", **model_size(G, GD.init, GD.sink, intermed, case))]
+    remove_useless_nodes(G, GD.init, GD.sink, edge_map, edge_keys, case)
+    stages.append(dict(stage="useless nodes", **model_size(G, GD.init, GD.sink, intermed, case)))
+    if case == 'static':
+        contract_chains(G, GD.init, GD.sink, intermed, edge_map, edge_keys)
+        stages.append(dict(stage="chains", **model_size(G, GD.init, GD.sink, intermed, case)))
+
+    nodes = list(G.nodes)
+    kept = set(nodes)
+    acc_sys = [node for node in GD.acc_sys if node in kept]
+    acc_test = [node for node in GD.acc_test if node in kept]
+    GD_reduced = GraphData(nodes, list(G.edges), GD.node_dict, GD.inv_node_dict, acc_sys, acc_test, GD.init)
+    reduction = Reduction(GD, edge_map, edge_keys, n_original_edges, stages)
+    return GD_reduced, reduction
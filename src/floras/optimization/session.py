@@ -0,0 +1,72 @@
+"""Session that keeps the product graphs and the model of a problem to rebuild them when the transition system changes."""
+from floras.components.product import sync_prod, sync_prods
+from floras.optimization.setup_graphs import setup_nodes_and_edges
+from floras.optimization.optimization import MILP
+
+
+class Session:
+    """
+    Test environment synthesis for a transition system that changes between solves. The virtual
+    product graph keeps its node ids across changes, so in the static case the model is rebuilt
+    with the variables of the unchanged nodes and edges reused (see MILP.rebuild), and the previous
+    solution is the start of the next solve.
+
+    Args:
+        transys: Transition system (changed through rebuild).
+        sys_aut: System automaton.
+        prod_aut: Specification product automaton.
+        case: 'static' or 'reactive' (default 'static').
+        warm_start: Start the solver from a max-flow/min-cut solution (default False).
+        seed: Random seed of the solver (default None).
+        test_aut: Tester automaton, to project the virtual system graph (default None).
+    """
+    def __init__(self, transys, sys_aut, prod_aut, case='static', warm_start=False, seed=None, test_aut=None):
+        self.transys = transys
+        self.sys_aut = sys_aut
+        self.prod_aut = prod_aut
+        self.test_aut = test_aut
+        self.virtual, self.virtual_sys, map_G_to_S = sync_prods(transys, sys_aut, prod_aut, test_aut)
+        GD, SD = setup_nodes_and_edges(self.virtual, self.virtual_sys, prod_aut)
+        self.milp = MILP(GD, SD, case, map_G_to_S=map_G_to_S, warm_start=warm_start, seed=seed)
+        self.milp.setup_model()
+
+    def solve(self, policy=None, telemetry=None):
+        """
+        Solve the current model.
+
+        Returns:
+            d: Cut edges.
+            flow: Flow value.
+            exit_status: Exit status of the optimization.
+        """
+        self.milp.solve_problem(policy, telemetry)
+        return self.milp.parse_solution()
+
+    def rebuild(self, add=(), remove=(), labels=None):
+        """
+        Change the transition system, then reconstruct the product graphs and rebuild the model
+        with variable reuse. The product graphs are traversed again in full.
+
+        Args:
+            add: Transitions (s, t) to add.
+            remove: Transitions (s, t) to remove.
+            labels: Dictionary mapping states to their new list of labels (default None).
+
+        Returns:
+            changes: Dictionary with the number of added and removed nodes and edges of the product graph
+                and if the variables were reused (see MILP.rebuild).
+        """
+        for (s, t) in remove:
+            self.transys.remove_transition(s, t)
+        for (s, t) in add:
+            self.transys.add_transition(s, t)
+        for s, state_labels in (labels or {}).items():
+            self.transys.set_labels(s, state_labels)
+
+        self.virtual.pruned_sync_prod() # node ids of the existing product states are kept
+        self.virtual_sys = self.virtual.project(self.sys_aut, self.test_aut)
+        if self.virtual_sys is None:
+            self.virtual_sys = sync_prod(self.transys, self.sys_aut)
+        map_G_to_S = self.virtual.map_to(self.virtual_sys)
+        GD, SD = setup_nodes_and_edges(self.virtual, self.virtual_sys, self.prod_aut)
+        return self.milp.rebuild(GD, SD, map_G_to_S)
@@ -26,10 +26,10 @@ def setup_nodes_and_edges(virtual_game_graph, virtual_sys, b_pi):
     nodes = []
     node_dict = {}
     inv_node_dict = {}
-    for i, node in enumerate(virtual_game_graph.G_initial.nodes):
-        nodes.append(i)
-        node_dict.update({i: virtual_game_graph.reverse_Sdict[node]})
-        inv_node_dict.update({virtual_game_graph.reverse_Sdict[node]: i})
+    for node in virtual_game_graph.G_initial.nodes: # node ids of the product are used directly
+        nodes.append(node)
+        node_dict.update({node: virtual_game_graph.reverse_Sdict[node]})
+        inv_node_dict.update({virtual_game_graph.reverse_Sdict[node]: node})
     # find initial state
     init = []
     for initial in virtual_game_graph.I:
@@ -53,10 +53,10 @@ def setup_nodes_and_edges(virtual_game_graph, virtual_sys, b_pi):
     S_nodes = []
     S_node_dict = {}
     S_inv_node_dict = {}
-    for i, node in enumerate(virtual_sys.G_initial.nodes):
-        S_nodes.append(i)
-        S_node_dict.update({i: virtual_sys.reverse_Sdict[node]})
-        S_inv_node_dict.update({virtual_sys.reverse_Sdict[node]: i})
+    for node in virtual_sys.G_initial.nodes:
+        S_nodes.append(node)
+        S_node_dict.update({node: virtual_sys.reverse_Sdict[node]})
+        S_inv_node_dict.update({virtual_sys.reverse_Sdict[node]: node})
     # find initial state
     S_init = []
     for initial in virtual_sys.I:
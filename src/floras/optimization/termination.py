@@ -0,0 +1,91 @@
+"""Termination policy and incumbent telemetry for solving the MILP."""
+import json
+import os
+import time
+
+
+class TerminationPolicy:
+    """
+    When to stop solving the MILP.
+
+    Args:
+        stall_time: Stop if the incumbent has not improved for stall_time seconds (default 60).
+        no_solution_time: Stop if no feasible solution was found after no_solution_time seconds (default 600).
+        time_limit: Total time limit in seconds (default None).
+        gap: Relative MIP gap at which to stop (default None, the solver default).
+    """
+    def __init__(self, stall_time=60, no_solution_time=600, time_limit=None, gap=None):
+        self.stall_time = stall_time
+        self.no_solution_time = no_solution_time
+        self.time_limit = time_limit
+        self.gap = gap
+
+    def check(self, sol_count, since_start, since_improvement):
+        """
+        Check the stall windows during the solve.
+
+        Args:
+            sol_count: Number of feasible solutions found.
+            since_start: Seconds since the start of the solve.
+            since_improvement: Seconds since the incumbent last improved.
+
+        Returns:
+            term_condition: Reason to terminate, or None to continue.
+        """
+        if sol_count >= 1:
+            if self.stall_time is not None and since_improvement > self.stall_time:
+                return "Obj not changing"
+        elif self.no_solution_time is not None and since_start > self.no_solution_time:
+            return "Timeout"
+        return None
+
+
+def relative_gap(incumbent, bound):
+    """
+    Relative gap |bound - incumbent| / |incumbent| (None without incumbent).
+    """
+    if incumbent is None or bound is None or incumbent == 0:
+        return None
+    return abs(bound - incumbent)/abs(incumbent)
+
+
+class Telemetry:
+    """
+    JSON-lines record of the incumbent, best bound, gap, node count and wall time during the solve.
+    Every solve appends a 'start' record followed by one record per solver event.
+
+    Args:
+        path: Path of the JSON-lines file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.t0 = None
+
+    def start(self, **info):
+        """
+        Open the file and record the start of a solve with the given info.
+        """
+        dirname = os.path.dirname(self.path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self.file = open(self.path, 'a')
+        self.t0 = time.time()
+        self.write(dict(event="start", time=self.t0, **info))
+
+    def record(self, event, incumbent, bound, nodes, sol_count):
+        """
+        Record a solver event. Objective values beyond 1e100 (no incumbent or bound yet) are stored as None.
+        """
+        incumbent = incumbent if sol_count >= 1 and abs(incumbent) < 1e100 else None
+        bound = bound if abs(bound) < 1e100 else None
+        self.write({"event": event, "wall_time": time.time() - self.t0, "incumbent": incumbent,
+                    "bound": bound, "gap": relative_gap(incumbent, bound), "nodes": nodes, "sol_count": sol_count})
+
+    def write(self, entry):
+        self.file.write(json.dumps(entry) + '\n')
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -1,16 +1,67 @@
+import numpy as np
+import scipy.sparse as sp
+from floras.components.node_map import build_node_map
+
 def find_map_G_S(GD,SD):
-    G_truncated = {}
-    S_annot = {}
-    map_G_to_S = {}
-    for node in GD.node_dict:
-        G_truncated.update({node: GD.node_dict[node][0]})
-    for node in SD.node_dict:
-        S_annot.update({node: SD.node_dict[node][0]})
-    for node in G_truncated:
-        sys_node_list = []
-        for sys_node in S_annot:
-            if G_truncated[node]  == S_annot[sys_node]:
-                sys_node_list.append(sys_node)
-        map_G_to_S.update({node: sys_node_list})
-
-    return map_G_to_S
+    G_states = ((node, GD.node_dict[node][0]) for node in GD.node_dict)
+    S_states = ((node, SD.node_dict[node][0]) for node in SD.node_dict)
+    return build_node_map(G_states, S_states)
+
+def incidence_matrix(node_pos, edges, sign=1):
+    """
+    Sparse node-edge incidence matrix with -sign for the outgoing node and +sign for
+    the incoming node of each edge (one column per edge).
+
+    Args:
+        node_pos: Dictionary mapping each node to its row.
+        edges: List of edges (i, j).
+        sign: 1 or -1.
+
+    Returns:
+        B: scipy.sparse CSR matrix of shape (len(node_pos), len(edges)).
+    """
+    n_edges = len(edges)
+    rows = np.fromiter((node_pos[i] for (i,j) in edges), dtype=np.int64, count=n_edges)
+    rows = np.concatenate([rows, np.fromiter((node_pos[j] for (i,j) in edges), dtype=np.int64, count=n_edges)])
+    cols = np.tile(np.arange(n_edges), 2)
+    vals = np.concatenate([np.full(n_edges, -float(sign)), np.full(n_edges, float(sign))])
+    return sp.csr_matrix((vals, (rows, cols)), shape=(len(node_pos), n_edges))
+
+def selection_matrix(positions, n_cols):
+    """
+    Sparse matrix selecting the entries at positions from a vector of length n_cols.
+
+    Args:
+        positions: Column of the entry selected by each row.
+        n_cols: Length of the vector.
+
+    Returns:
+        A: scipy.sparse CSR matrix of shape (len(positions), n_cols).
+    """
+    n_rows = len(positions)
+    return sp.csr_matrix((np.ones(n_rows), (np.arange(n_rows), np.asarray(positions, dtype=np.int64))), shape=(n_rows, n_cols))
+
+def coreachable(graph, targets):
+    """
+    Find the nodes of the graph that have a path to one of the targets with a
+    single reverse breadth first search.
+
+    Args:
+        graph: Networkx DiGraph with integer nodes.
+        targets: Target nodes.
+
+    Returns:
+        reaches: Boolean array, reaches[node] is True if node can reach a target.
+    """
+    reaches = np.zeros(max(graph.nodes, default=-1) + 1, dtype=bool)
+    frontier = [target for target in targets if target in graph]
+    reaches[frontier] = True
+    while frontier:
+        next_nodes = []
+        for node in frontier:
+            for pred in graph.predecessors(node):
+                if not reaches[pred]:
+                    reaches[pred] = True
+                    next_nodes.append(pred)
+        frontier = next_nodes
+    return reaches
@@ -0,0 +1,136 @@
+"""Combinatorial max-flow/min-cut start for the static MILP."""
+import numpy as np
+import networkx as nx
+import scipy.sparse as sp
+
+
+def max_flow(n_nodes, tails, heads, capacity, sources, sinks):
+    """
+    Integer maximum flow from the sources to the sinks with scipy.sparse.csgraph.
+
+    Args:
+        n_nodes: Number of nodes (nodes are 0, ..., n_nodes-1).
+        tails: Array with the outgoing node of each edge.
+        heads: Array with the incoming node of each edge.
+        capacity: Integer array with the capacity of each edge.
+        sources: Source nodes.
+        sinks: Sink nodes.
+
+    Returns:
+        flow: Flow on each edge.
+        source_side: Boolean array, True for the nodes on the source side of a minimum cut.
+    """
+    from scipy.sparse.csgraph import maximum_flow, breadth_first_order # slow to import
+    s, t = n_nodes, n_nodes + 1
+    sources = np.unique(np.asarray(sources, dtype=np.int64))
+    sinks = np.unique(np.asarray(sinks, dtype=np.int64))
+    big = int(capacity.sum()) + 1 # super source and super sink edges are never cut
+    rows = np.concatenate([tails, np.full(len(sources), s), sinks])
+    cols = np.concatenate([heads, sources, np.full(len(sinks), t)])
+    caps = np.concatenate([capacity, np.full(len(sources) + len(sinks), big)]).astype(np.int32)
+    C = sp.csr_matrix((caps, (rows, cols)), shape=(n_nodes + 2, n_nodes + 2))
+
+    F = maximum_flow(C, s, t).flow.tocsr()
+    flow = np.asarray(F[tails, heads]).ravel().clip(min=0) if len(tails) else np.zeros(0)
+
+    residual = (C - F).tocsr()
+    residual.data = (residual.data > 0).astype(np.int8)
+    residual.eliminate_zeros()
+    source_side = np.zeros(n_nodes + 2, dtype=bool)
+    source_side[breadth_first_order(residual, s, directed=True, return_predecessors=False)] = True
+    return flow, source_side[:n_nodes]
+
+def intermediate_path_keys(milp):
+    """
+    Physical transitions on a shortest path of G from a source through an intermediate node to a sink.
+
+    Returns:
+        keys: Set of frozensets {out_state, in_state} of the transitions on the path (empty if there is no path).
+    """
+    G = milp.G
+    sources = [node for node in milp.src if node in G]
+    sinks = [node for node in milp.sink if node in G]
+    if not sources or not sinks:
+        return set()
+    to_inter = nx.multi_source_dijkstra_path(G, sources)
+    from_inter = nx.multi_source_dijkstra_path(G.reverse(copy=False), sinks)
+    inter = [node for node in milp.inter if node in to_inter and node in from_inter]
+    if not inter:
+        return set()
+    node = min(inter, key=lambda node: len(to_inter[node]) + len(from_inter[node]))
+    path = to_inter[node] + from_inter[node][::-1][1:]
+    return set(frozenset(milp.edge_key(i,j)) for (i,j) in zip(path[:-1], path[1:]))
+
+def static_warm_start(milp):
+    """
+    Feasible solution of the static MILP from a minimum cut and a maximum flow.
+
+    The cut separates the sources from the sinks on G without I, with the capacity of each edge
+    set to the number of edges that are cut with it (all copies of its physical transition and
+    of the reverse transition). The cut is then repaired to cut all these copies, and the flow
+    is the maximum flow on G without the cut edges. If the repaired cut leaves no flow, the cut
+    is computed again without cutting the transitions on a shortest path through I.
+
+    Args:
+        milp: MILP object of the static case.
+
+    Returns:
+        start: Tuple (f_vals, d_vals, m_vals) of start values for the edges of G, the edges in
+            d_domain and the nodes of G without I, or None if no feasible start was found.
+    """
+    src = set(milp.src)
+    sink = set(milp.sink)
+    if src & sink:
+        return None
+    node_pos = {node: k for k, node in enumerate(milp.model_nodes)}
+    n_nodes = len(node_pos)
+    sources = [node_pos[node] for node in src if node in node_pos]
+    sinks = [node_pos[node] for node in sink if node in node_pos]
+    if not sources or not sinks:
+        return None
+
+    # cost of cutting a physical transition together with its reverse
+    group_cost = dict()
+    for key, edges in milp.cut_groups().items():
+        group_cost[key] = sum(milp.cut_weight(i,j) for (i,j) in edges)
+    def cut_cost(key):
+        reverse = (key[1], key[0])
+        return group_cost[key] + (group_cost.get(reverse, 0) if reverse != key else 0)
+
+    edges_without_I = milp.model_edges_without_I
+    cut_tails = np.array([node_pos[i] for (i,j) in edges_without_I], dtype=np.int64)
+    cut_heads = np.array([node_pos[j] for (i,j) in edges_without_I], dtype=np.int64)
+    cut_keys = [milp.edge_key(i,j) for (i,j) in edges_without_I]
+    cost = np.array([cut_cost(key) for key in cut_keys], dtype=np.int64)
+    tails = np.array([node_pos[i] for (i,j) in milp.model_edges], dtype=np.int64)
+    heads = np.array([node_pos[j] for (i,j) in milp.model_edges], dtype=np.int64)
+    no_src_sink = np.array([j not in src and i not in sink for (i,j) in milp.model_edges], dtype=bool)
+
+    protected = set()
+    for attempt in range(2):
+        # minimum cut on G without I, the protected transitions are not cut
+        is_protected = np.array([frozenset(key) in protected for key in cut_keys], dtype=bool)
+        capacity = np.where(is_protected, cost[~is_protected].sum() + 1, cost)
+        _, source_side = max_flow(n_nodes, cut_tails, cut_heads, capacity, sources, sinks)
+        cut = np.flatnonzero(source_side[cut_tails] & ~source_side[cut_heads])
+        if is_protected[cut].any():
+            return None
+
+        # repair: cut all copies of the cut transitions and of their reverse
+        repaired = set(frozenset(cut_keys[k]) for k in cut.tolist())
+        is_cut = np.array([frozenset(milp.edge_key(i,j)) in repaired for (i,j) in milp.model_edges], dtype=bool)
+
+        # maximum flow on G without the cut edges (capacity 1, no flow into sources or out of sinks)
+        allowed = no_src_sink & ~is_cut
+        flow, _ = max_flow(n_nodes, tails[allowed], heads[allowed], np.ones(allowed.sum(), dtype=np.int64), sources, sinks)
+        f_vals = np.zeros(len(milp.model_edges))
+        f_vals[allowed] = flow
+        if f_vals[np.isin(tails, sources)].sum() >= 1:
+            d_vals = is_cut.astype(float)
+            m_vals = np.array([source_side[node_pos[node]] for node in milp.model_nodes_without_I], dtype=float)
+            return f_vals, d_vals, m_vals
+
+        protected = intermediate_path_keys(milp)
+        if not protected:
+            return None
+    return None
@@ -0,0 +1,135 @@
+"""Per-stage timing and memory instrumentation of the pipeline."""
+import os
+import sys
+import json
+import time
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+
+def peak_rss_mb():
+    """
+    Peak resident set size of the process in MB (None if not available on this platform).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return peak/2**20 if sys.platform == 'darwin' else peak/2**10
+
+
+class Profiler:
+    """
+    Records the wall time, CPU time and memory of each stage of the pipeline, and the sizes of
+    the graphs and models. The memory of a stage is the peak resident set size of the process at
+    the end of the stage, which includes the memory of the solver, and with memory tracing the peak
+    of the Python allocations during the stage (tracemalloc).
+
+    Args:
+        enabled: If the stages are recorded (default True). A disabled profiler does nothing.
+        cprofile: If the whole run is also profiled with cProfile (default False).
+        memory: If the Python allocations are traced (default False). Tracing slows down
+            allocation-heavy stages, so stage times with and without it are not comparable.
+    """
+    def __init__(self, enabled=True, cprofile=False, memory=False):
+        self.enabled = enabled
+        self.memory = enabled and memory
+        self.tracing = False # tracemalloc was started by this profiler
+        self.stages = []
+        self.sizes = dict()
+        self.profile = cProfile.Profile() if enabled and cprofile else None
+        self.t0 = time.perf_counter()
+
+    def start(self):
+        """
+        Start tracing the memory allocations (with memory tracing) and the cProfile profile.
+        """
+        if not self.enabled:
+            return
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.tracing = True
+        if self.profile is not None:
+            self.profile.enable()
+
+    def stop(self):
+        if not self.enabled:
+            return
+        if self.profile is not None:
+            self.profile.disable()
+        if self.tracing:
+            tracemalloc.stop()
+            self.tracing = False
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Record a stage of the pipeline:
+
+            with profiler.stage('product'):
+                ...
+        """
+        if not self.enabled:
+            yield
+            return
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            record = {"stage": name,
+                      "wall_time": time.perf_counter() - wall,
+                      "cpu_time": time.process_time() - cpu,
+                      "peak_alloc_mb": (tracemalloc.get_traced_memory()[1] - current)/2**20 if tracing else None,
+                      "peak_rss_mb": peak_rss_mb()}
+            self.stages.append(record)
+
+    def record(self, name, **sizes):
+        """
+        Record the sizes of a graph or model, e.g. record('product', nodes=..., edges=...).
+        """
+        if self.enabled:
+            self.sizes.setdefault(name, dict()).update(sizes)
+
+    def report(self):
+        """
+        Returns:
+            report: Dictionary with the stages, the sizes and the totals.
+        """
+        return {"stages": self.stages,
+                "sizes": self.sizes,
+                "wall_time": time.perf_counter() - self.t0,
+                "cpu_time": sum(stage["cpu_time"] for stage in self.stages),
+                "peak_rss_mb": peak_rss_mb()}
+
+    def write(self, path=os.path.join('log', 'profile.json')):
+        """
+        Write the report as JSON and, with cProfile, the profile statistics next to it (.prof).
+        """
+        if not self.enabled:
+            return
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        with open(path, 'w') as fp:
+            json.dump(self.report(), fp, indent=2)
+        if self.profile is not None:
+            self.profile.dump_stats(os.path.splitext(path)[0] + '.prof')
+
+    def print_report(self):
+        if not self.enabled:
+            return
+        print('{0:<20}{1:>12}{2:>12}{3:>16}{4:>14}'.format('stage', 'wall (s)', 'cpu (s)', 'alloc peak (MB)', 'rss peak (MB)'))
+        for stage in self.stages:
+            alloc = stage["peak_alloc_mb"]
+            rss = stage["peak_rss_mb"]
+            print('{0:<20}{1:>12.3f}{2:>12.3f}{3:>16}{4:>14}'.format(stage["stage"], stage["wall_time"], stage["cpu_time"],
+                  '-' if alloc is None else '{0:.1f}'.format(alloc), '-' if rss is None else '{0:.1f}'.format(rss)))
+        for name, sizes in self.sizes.items():
+            print('{0}: {1}'.format(name, ', '.join('{0}={1}'.format(key, value) for key, value in sizes.items())))
@@ -0,0 +1,256 @@
+"""
+Resident solver service: an asyncio server on a Unix socket that keeps spot, gurobipy and the
+pipeline imported in a pool of worker processes, with warm caches of the translated automata,
+and a thin client that sends problems to it.
+
+Protocol: one json object per line. A request is either a problem, {"problem": <contents of a
+json problem file>, "root": <directory for a relative mazefile>, "options": {"backend": ...,
+"seed": ..., "model_options": {...}}}, or a command, {"command": "ping"} or {"command": "shutdown"}.
+The response to a problem has the status ('opt' or 'error'), the flow, the cut edges, the error
+and the wall time.
+
+This module only imports the standard library, the pipeline is imported by the workers.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import traceback
+from functools import lru_cache
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), 'floras-{0}.sock'.format(os.getuid() if hasattr(os, 'getuid') else 0))
+
+@lru_cache(maxsize=64)
+def cached_automata(sysformula, testformula):
+    """
+    Automata of the formulas, kept in the worker process across requests.
+    """
+    from floras.main import get_automata
+    return get_automata(sysformula, testformula)
+
+def warm_up(quiet):
+    """
+    Worker initializer: import the pipeline and create the Gurobi environment.
+    """
+    if quiet:
+        from floras.batch import quiet as quiet_output
+        quiet_output()
+    import floras.main
+    from floras.optimization import optimization
+    optimization.OPT_DATA_PATH = None # concurrent requests share the working directory, the responses have the results
+    try:
+        import gurobipy
+        gurobipy.Model().dispose() # creates the default environment
+    except Exception: # no license, the highs backend still works
+        pass
+
+def solve_request(problem, root, options):
+    """
+    Solve a problem in a worker process.
+
+    Returns:
+        response: Dictionary with the status, flow, cuts, error, wall time and automata cache statistics.
+    """
+    from floras.main import parse_test_data, solve_test_data, cut_list
+    response = {"status": None, "flow": None, "cuts": None, "error": None}
+    t0 = time.time()
+    try:
+        test_data = parse_test_data(problem, root)
+        d, flow = solve_test_data(test_data, backend=options.get("backend", "gurobi"), seed=options.get("seed"),
+                                  automata=cached_automata, model_options=options.get("model_options"))
+        response.update(status="opt", flow=flow, cuts=cut_list(d))
+    except Exception:
+        response.update(status="error", error=traceback.format_exc())
+    response["wall_time"] = time.time() - t0
+    response["automata_cache"] = cached_automata.cache_info()._asdict()
+    response["pid"] = os.getpid()
+    return response
+
+
+class Service:
+    """
+    Solver service on a Unix socket. Requests of all connections are scheduled onto a pool of
+    worker processes, at most one request per worker at a time.
+
+    Args:
+        path: Path of the Unix socket.
+        workers: Number of worker processes (default 1).
+        quiet: Discard the output of the workers (default True).
+    """
+    def __init__(self, path=DEFAULT_SOCKET, workers=1, quiet=True):
+        self.path = path
+        self.workers = workers
+        self.quiet = quiet
+        self.pool = None
+        self.server = None
+        self.stopped = None
+        self.n_requests = 0
+        self.n_running = 0
+
+    async def handle(self, reader, writer):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        stop = False
+        try:
+            while not stop:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError as error:
+                    response = {"status": "error", "error": "invalid request: {0}".format(error)}
+                else:
+                    command = request.get("command") if isinstance(request, dict) else None
+                    if not isinstance(request, dict):
+                        response = {"status": "error", "error": "invalid request: not a json object"}
+                    elif command == "ping":
+                        response = {"status": "ok", "workers": self.workers, "requests": self.n_requests, "running": self.n_running}
+                    elif command == "shutdown":
+                        response = {"status": "ok"}
+                        stop = True # after the response, so that this connection is closed first
+                    elif "problem" in request:
+                        self.n_requests += 1
+                        self.n_running += 1
+                        try:
+                            response = await loop.run_in_executor(self.pool, solve_request, request["problem"],
+                                                                  request.get("root", ""), request.get("options", {}))
+                        except Exception as error: # e.g. a worker died
+                            response = {"status": "error", "error": repr(error)}
+                        finally:
+                            self.n_running -= 1
+                    else:
+                        response = {"status": "error", "error": "unknown request"}
+                writer.write((json.dumps(response) + '\n').encode())
+                await writer.drain()
+        finally:
+            writer.close()
+            if stop:
+                self.stopped.set()
+
+    async def serve(self):
+        import asyncio
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        if os.path.exists(self.path):
+            if is_running(self.path):
+                raise RuntimeError('A floras service is already running on {0}.'.format(self.path))
+            os.remove(self.path) # left by a service that did not shut down
+        self.stopped = asyncio.Event()
+        # spawn: the Gurobi environment must not be forked
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=warm_up, initargs=(self.quiet,))
+        # start the workers now instead of at the first request
+        for future in [self.pool.submit(os.getpid) for k in range(self.workers)]:
+            await asyncio.wrap_future(future)
+        self.server = await asyncio.start_unix_server(self.handle, path=self.path, limit=2**30)
+        print('floras service listening on {0} with {1} workers'.format(self.path, self.workers))
+        try:
+            await self.stopped.wait()
+        finally:
+            self.server.close()
+            await self.server.wait_closed()
+            self.pool.shutdown(cancel_futures=True)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def run(self):
+        import asyncio # imported by the server only, the client stays light
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+
+
+def is_running(path=DEFAULT_SOCKET):
+    """
+    Check if a service accepts connections on the socket.
+    """
+    import socket
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(1)
+        try:
+            client.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError, socket.timeout):
+            return False
+    return True
+
+def request(message, path=DEFAULT_SOCKET):
+    """
+    Send a request to the service and wait for the response.
+
+    Args:
+        message: Request dictionary.
+        path: Path of the Unix socket.
+
+    Returns:
+        response: Response dictionary.
+    """
+    import socket
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path)
+        client.sendall((json.dumps(message) + '\n').encode())
+        with client.makefile('r') as fp:
+            return json.loads(fp.readline())
+
+def solve_file(filename, path=DEFAULT_SOCKET, **options):
+    """
+    Solve a json problem file with the service.
+
+    Returns:
+        response: Response dictionary with the status, flow and cuts.
+    """
+    with open(filename, 'r') as fp:
+        problem = json.load(fp)
+    root = os.path.dirname(os.path.abspath(filename)) # the service may run in another directory
+    return request({"problem": problem, "root": root, "options": options}, path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="floras_service",
+        description="resident solver service and its client"
+    )
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, type=str, help="path of the Unix socket")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="start the service")
+    serve.add_argument("--workers", default=1, type=int, help="number of worker processes")
+    serve.add_argument("--verbose", action="store_true", help="show the output of the workers")
+    client = commands.add_parser("client", help="solve a json file with the service")
+    client.add_argument("--filename", required=True, type=str)
+    client.add_argument("--backend", default="gurobi", choices=["gurobi", "highs"], help="MILP solver backend")
+    client.add_argument("--seed", default=None, type=int, help="solver seed (random if not given)")
+    client.add_argument("--builder", default="loop", choices=["loop", "matrix"], help="MILP builder (see from_json --help)")
+    client.add_argument("--aggregate-cuts", action="store_true", help="one cut variable per physical transition and its reverse")
+    client.add_argument("--presolve", action="store_true", help="reduce the virtual product graph before building the MILP")
+    client.add_argument("--warm-start", action="store_true", help="start the static MILP from a max-flow/min-cut solution")
+    commands.add_parser("ping", help="check that the service is running")
+    commands.add_parser("shutdown", help="stop the service")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            Service(args.socket, workers=args.workers, quiet=not args.verbose).run()
+        except RuntimeError as error:
+            print(error)
+            sys.exit(1)
+        return
+    try:
+        if args.command == "client":
+            model_options = {"builder": args.builder, "aggregate_cuts": args.aggregate_cuts, "presolve": args.presolve, "warm_start": args.warm_start}
+            response = solve_file(args.filename, args.socket, backend=args.backend, seed=args.seed, model_options=model_options)
+        else:
+            response = request({"command": args.command}, args.socket)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print('floras service is not running on {0}, start it with: floras_service serve'.format(args.socket))
+        sys.exit(1)
+    if args.command != "client":
+        print(json.dumps(response))
+        return
+    if response["status"] != "opt":
+        print(response["error"])
+        sys.exit(1)
+    for out_state, in_state in response["cuts"]:
+        print('{0} to {1}'.format(out_state, in_state))
+    print('flow {0} in {1:.3f}s'.format(response["flow"], response["wall_time"]))
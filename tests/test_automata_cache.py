@@ -0,0 +1,32 @@
+"""Testing the on-disk cache of the automata."""
+import pytest
+
+import sys
+sys.path.append('../')
+from floras.components.automata import get_system_automaton, get_tester_automaton, get_product_automaton
+from floras.components.automata_cache import AutomatonCache
+
+def automata(cache=None):
+    sys_aut, spot_aut_sys = get_system_automaton('F(beaver & F(goal))', cache=cache)
+    test_aut, spot_aut_test = get_tester_automaton('F(door_1) & F(door_2)', cache=cache)
+    prod_aut = get_product_automaton(spot_aut_sys, spot_aut_test, cache=cache)
+    return sys_aut, test_aut, prod_aut
+
+def test_automaton_cache(tmp_path):
+    expected = automata()
+    cache = AutomatonCache(str(tmp_path))
+    automata(cache)
+    assert cache.stats["misses"] == 3
+    # a new cache reads the entries from disk
+    cache = AutomatonCache(str(tmp_path))
+    cached = automata(cache)
+    assert cache.stats["misses"] == 0 and cache.stats["disk_hits"] == 3
+    for aut, cached_aut in zip(expected, cached):
+        assert aut.Q == cached_aut.Q
+        assert aut.qinit == cached_aut.qinit
+        assert aut.delta == cached_aut.delta
+        assert aut.Acc == cached_aut.Acc
+        assert aut.product_states == cached_aut.product_states
+    # the normalized formula is the key
+    get_tester_automaton('F(door_2) & F(door_1)', cache=cache)
+    assert cache.stats["memory_hits"] == 1
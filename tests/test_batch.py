@@ -0,0 +1,37 @@
+"""Testing the batch mode with failing and timed out jobs."""
+import pytest
+
+import os
+import sys
+import json
+sys.path.append('../')
+from floras.batch import Batch
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples', 'example.json')
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason="needs named pipes")
+def test_batch_errors_and_timeout(tmp_path):
+    failing = tmp_path / 'failing.json'
+    failing.write_text('{"sysformula": "F(goal)"}')
+    # reading the maze from a named pipe without a writer blocks until the worker is killed
+    os.mkfifo(str(tmp_path / 'blocked.txt'))
+    with open(EXAMPLE, 'r') as fp:
+        problem = json.load(fp)
+    problem["mazefile"] = 'blocked.txt'
+    blocked = tmp_path / 'blocked.json'
+    blocked.write_text(json.dumps(problem))
+
+    output = str(tmp_path / 'batch.jsonl')
+    files = [str(failing), str(blocked), EXAMPLE]
+    batch = Batch(files, output, processes=1, timeout=5, options={"backend": "highs", "seed": 0})
+    counts = batch.run()
+
+    with open(output, 'r') as fp:
+        records = {os.path.basename(record["filename"]): record for record in map(json.loads, fp)}
+    assert counts == {"error": 1, "timeout": 1, "opt": 1}
+    assert records["failing.json"]["status"] == "error"
+    assert "KeyError" in records["failing.json"]["error"]
+    assert records["blocked.json"]["status"] == "timeout"
+    # the job after the timeout is solved by the replacement worker
+    assert records["example.json"]["status"] == "opt"
+    assert records["example.json"]["flow"] >= 1.0
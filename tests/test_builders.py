@@ -0,0 +1,46 @@
+"""Testing the model options of solve against the loop builder."""
+import pytest
+
+import sys
+sys.path.append('../')
+from floras.components.automata import get_system_automaton, get_tester_automaton, get_product_automaton
+from floras.components.transition_system import TransitionSystemInput, TranSys
+from floras.components.product import sync_prods
+from floras.optimization.optimize import solve
+
+PROBLEMS = {
+    "static": ([0,1,2,3,4,5],
+               {0: [1,2,3], 1: [2,3,4], 2: [3,4,5], 3: [4], 4: [5,0], 5: [5]},
+               {0 : ['a'], 5: ['goal'], 3: ['int']},
+               'F(goal)', 'F(int)'),
+    "reactive": (['init', 'd1', 'd2', 'int_goal', 'p1', 'p2', 'goal'],
+                 {'init': ['d1','d2'], 'd1': ['d2','int_goal'], 'd2': ['d1', 'int_goal'],'int_goal': ['p1', 'p2'], 'p1': ['p2','goal'], 'p2': ['p1','goal'], 'goal': []},
+                 {'d1': ['door_1'], 'd2': ['door_2'], 'p1': ['door_1'], 'p2': ['door_2'], 'int_goal': ['beaver'], 'goal': ['goal']},
+                 'F(beaver & F(goal))', 'F(door_1) & F(door_2)'),
+}
+
+def solve_problem(case, **options):
+    states, transitions, labels, sys_formula, test_formula = PROBLEMS[case]
+    sys_aut, spot_aut_sys = get_system_automaton(sys_formula)
+    test_aut, spot_aut_test = get_tester_automaton(test_formula)
+    prod_aut = get_product_automaton(spot_aut_sys, spot_aut_test)
+    transys = TranSys(TransitionSystemInput(states, transitions, labels, [states[0]]))
+    virtual, virtual_sys, map_G_to_S = sync_prods(transys, sys_aut, prod_aut, test_aut)
+    d, flow = solve(virtual, transys, prod_aut, virtual_sys, case=case, map_G_to_S=map_G_to_S, seed=0, **options)
+    cuts = [cut for cut in d if d[cut] > 0.9]
+    edges = set((out_node, in_node) for (out_node, act), in_node in virtual.E.items())
+    return flow, cuts, edges
+
+@pytest.mark.parametrize("case", ["static", "reactive"])
+@pytest.mark.parametrize("options", [{"builder": "matrix"}, {"aggregate_cuts": True},
+                                     {"builder": "matrix", "aggregate_cuts": True}, {"presolve": True},
+                                     {"builder": "matrix", "presolve": True}, {"warm_start": True}])
+def test_model_options(case, options):
+    flow, cuts, edges = solve_problem(case)
+    option_flow, option_cuts, edges = solve_problem(case, **options)
+
+    # several cut sets can be optimal, they have the same flow and number of cuts
+    assert option_flow == pytest.approx(flow)
+    assert len(option_cuts) == len(cuts)
+    # the cuts of a presolved graph are mapped back to edges of the virtual product graph
+    assert set(option_cuts) <= edges
@@ -0,0 +1,28 @@
+"""Testing that importing the pipeline stays fast and does not load plotting or debugging modules."""
+import os
+import sys
+import json
+import subprocess
+
+# seconds, override with FLORAS_IMPORT_BUDGET on slow machines
+IMPORT_BUDGET = float(os.environ.get('FLORAS_IMPORT_BUDGET', 3.0))
+
+def import_in_subprocess(module):
+    code = ("import sys, time\n"
+            "t0 = time.perf_counter()\n"
+            "import {0}\n"
+            "import json\n"
+            "print(json.dumps({{'time': time.perf_counter() - t0, 'modules': sorted(sys.modules)}}))").format(module)
+    # the child does not get the pythonpath of pytest.ini
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, env=env)
+    return json.loads(result.stdout.splitlines()[-1])
+
+def test_import_time():
+    # fastest of three runs, the first one may read from a cold disk cache
+    runs = [import_in_subprocess('floras.main') for k in range(3)]
+    modules = set(runs[0]["modules"])
+    for heavy in ['matplotlib', 'ipdb', 'IPython', 'pdb', 'pygraphviz']:
+        assert heavy not in modules
+    assert 'floras.components.plotting' not in modules
+    assert min(run["time"] for run in runs) < IMPORT_BUDGET
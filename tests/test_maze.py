@@ -0,0 +1,22 @@
+"""Testing the maze file loader."""
+import pytest
+
+import sys
+sys.path.append('../')
+from floras.components.utils import get_states_and_transitions_from_file, load_maze
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_maze_loader(tmp_path, mmap):
+    mazefile = tmp_path / 'maze.txt'
+    mazefile.write_text('T *  |\n    S|\n')
+    states, transitions = get_states_and_transitions_from_file(str(mazefile), mmap=mmap)
+
+    assert states == [(0,0), (0,1), (0,3), (0,4), (1,0), (1,1), (1,2), (1,3), (1,4)]
+    assert transitions[(0,0)] == [(0,0)] # goals are absorbing
+    assert transitions[(0,1)] == [(0,1), (0,0), (1,1)]
+    assert transitions[(1,2)] == [(1,2), (1,1), (1,3)]
+    assert transitions[(1,4)] == [(1,4), (1,3), (0,4)]
+
+    cells, successors = load_maze(str(mazefile), mmap=mmap)
+    assert successors.shape == (len(states), 5)
+    assert [tuple(cell) for cell in cells.tolist()] == states
@@ -0,0 +1,40 @@
+"""Testing the model cache shared by several processes."""
+import pytest
+
+import os
+import sys
+import multiprocessing
+sys.path.append('../')
+from floras.optimization.cache import ModelCache, problem_hash
+
+gurobipy = pytest.importorskip("gurobipy")
+
+def store_and_read(root, worker, rounds):
+    # every put evicts all other entries (max_bytes=1) while the other process reads them
+    cache = ModelCache(root, max_bytes=1)
+    hits = 0
+    for k in range(rounds):
+        model = gurobipy.Model()
+        model.addVar(name='x')
+        cache.put('{0}-{1}'.format(worker, k), model, {"round": k})
+        model, maps = cache.get('{0}-{1}'.format(1 - worker, k))
+        if model is not None:
+            assert maps == {"round": k}
+            hits += 1
+    return hits
+
+def test_shared_cache(tmp_path):
+    root = str(tmp_path / 'models')
+    with multiprocessing.get_context('spawn').Pool(2) as pool:
+        pool.starmap(store_and_read, [(root, 0, 30), (root, 1, 30)])
+    # only the entries kept by the last puts are left, no temporary directories
+    cache = ModelCache(root)
+    entries = os.listdir(root)
+    assert all('.tmp' not in name for name in entries)
+    assert all(name in cache for name in entries)
+
+def test_model_options_in_key():
+    problem = ('F(goal)', 'F(int)', [0, 1], {0: [1], 1: [1]}, {1: ['goal']}, [0], 'static')
+    assert problem_hash(*problem, builder='loop') == problem_hash(*problem, builder='loop')
+    assert problem_hash(*problem, builder='loop') != problem_hash(*problem, builder='matrix')
+    assert problem_hash(*problem, presolve=False) != problem_hash(*problem, presolve=True)
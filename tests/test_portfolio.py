@@ -0,0 +1,93 @@
+"""Testing the selection of the winner of the solver portfolio and the cancellation of the other solves."""
+import pytest
+
+import os
+import sys
+import time
+import numpy as np
+sys.path.append('../')
+from floras.optimization.backends import SparseModel
+from floras.optimization.portfolio import PortfolioBackend, select_result, portfolio_profiles
+from floras.components.automata import get_system_automaton, get_tester_automaton, get_product_automaton
+from floras.components.transition_system import TransitionSystemInput, TranSys
+from floras.components.product import sync_prods
+from floras.optimization.optimize import solve
+
+def result(seed, status, objective):
+    return {"profile": {"Seed": seed}, "status": status, "x": np.full(3, float(seed)), "objective": objective,
+            "bound": objective, "nodes": 0, "stats": {"runtime": 0.0}, "term_condition": None}
+
+def scripted_solve(sparse_model, profile, start, callback, policy):
+    # worker of the tests: writes its pid, then waits or returns the scripted result of its profile
+    with open(os.path.join(profile["Dir"], str(profile["Seed"])), 'w') as fp:
+        fp.write(str(os.getpid()))
+    for other in profile.get("WaitFor", []): # so that the other workers have started
+        while not os.path.exists(os.path.join(profile["Dir"], str(other))):
+            time.sleep(0.01)
+    time.sleep(profile.get("Sleep", 0))
+    return result(profile["Seed"], profile["Status"], profile["Objective"])
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+def sparse_model(sense):
+    model = SparseModel()
+    model.add_variables('x', 3)
+    model.set_objective({'x': np.ones(3)}, sense)
+    return model
+
+def test_select_result():
+    results = [result(0, 'feasible', 1.0), result(1, 'optimal', 2.0), result(2, 'feasible', 3.0), result(3, 'optimal', 2.0)]
+    assert select_result(results)["profile"]["Seed"] == 1 # first proven optimal
+    feasible = [result(0, 'feasible', 1.0), result(1, 'feasible', 3.0), result(2, 'not_solved', None)]
+    assert select_result(feasible, maximize=True)["profile"]["Seed"] == 1
+    assert select_result(feasible, maximize=False)["profile"]["Seed"] == 0
+    assert select_result([result(0, 'not_solved', None), result(1, 'inf', None)])["profile"]["Seed"] == 0
+
+@pytest.mark.skipif(not hasattr(os, 'kill'), reason="needs os.kill to check the workers")
+def test_portfolio_cancels_losers(tmp_path):
+    profiles = [{"Seed": 0, "Dir": str(tmp_path), "Status": 'optimal', "Objective": 2.0, "Sleep": 60},
+                {"Seed": 1, "Dir": str(tmp_path), "Status": 'optimal', "Objective": 2.0, "WaitFor": [0]}]
+    backend = PortfolioBackend(profiles, processes=2, solver=scripted_solve)
+    backend.build(sparse_model('max'))
+    data = dict()
+    t0 = time.time()
+    backend.optimize(data)
+
+    # the first optimal solve wins and the slow solve is terminated instead of awaited
+    assert time.time() - t0 < 30
+    assert backend.status() == 'optimal'
+    assert data["seed"] == 1
+    assert list(backend.values(slice(None))) == [1.0, 1.0, 1.0]
+    assert [entry["profile"]["Seed"] for entry in data["portfolio"]] == [1]
+    with open(str(tmp_path / '0'), 'r') as fp:
+        assert not is_alive(int(fp.read()))
+
+def test_portfolio_best_feasible(tmp_path):
+    profiles = [{"Seed": k, "Dir": str(tmp_path), "Status": 'feasible', "Objective": objective}
+                for k, objective in enumerate([1.0, 3.0, 2.0])]
+    for sense, seed in [('max', 1), ('min', 0)]:
+        backend = PortfolioBackend(profiles, processes=3, solver=scripted_solve)
+        backend.build(sparse_model(sense))
+        data = dict()
+        backend.optimize(data)
+        # no solve proved optimality: all are awaited and the best objective wins
+        assert len(data["portfolio"]) == 3
+        assert data["seed"] == seed and backend.status() == 'feasible'
+
+def test_portfolio_solve():
+    pytest.importorskip("gurobipy")
+    assert [profile["Seed"] for profile in portfolio_profiles(3, seed=5)] == [5, 6, 7]
+    transys = TranSys(TransitionSystemInput([0,1,2,3,4,5], {0: [1,2,3], 1: [2,3,4], 2: [3,4,5], 3: [4], 4: [5,0], 5: [5]},
+                                            {0 : ['a'], 5: ['goal'], 3: ['int']}, [0]))
+    sys_aut, spot_aut_sys = get_system_automaton('F(goal)')
+    test_aut, spot_aut_test = get_tester_automaton('F(int)')
+    prod_aut = get_product_automaton(spot_aut_sys, spot_aut_test)
+    virtual, virtual_sys, map_G_to_S = sync_prods(transys, sys_aut, prod_aut, test_aut)
+    d, flow = solve(virtual, transys, prod_aut, virtual_sys, case='static', map_G_to_S=map_G_to_S, seed=0)
+    d_portfolio, flow_portfolio = solve(virtual, transys, prod_aut, virtual_sys, case='static', map_G_to_S=map_G_to_S, portfolio=2)
+    assert flow_portfolio == pytest.approx(flow)
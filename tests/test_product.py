@@ -0,0 +1,92 @@
+"""Testing the construction of the virtual graphs."""
+import pytest
+
+import sys
+sys.path.append('../')
+from floras.components.automata import get_system_automaton, get_tester_automaton, get_product_automaton, is_sound, select_translation
+from floras.components.transition_system import TransitionSystemInput, TranSys
+from floras.components import product
+from floras.components.product import sync_prod, sync_prods
+from floras.optimization.optimize import solve
+
+def test_sync_prods():
+    states_list = ['init', 'd1', 'd2', 'int_goal', 'p1', 'p2', 'goal']
+    transitions_dict = {'init': ['d1','d2'], 'd1': ['d2','int_goal'], 'd2': ['d1', 'int_goal'],'int_goal': ['p1', 'p2'], 'p1': ['p2','goal'], 'p2': ['p1','goal'], 'goal': []}
+    labels_dict = {'d1': ['door_1'], 'd2': ['door_2'], 'p1': ['door_1'], 'p2': ['door_2'], 'int_goal': ['beaver'], 'goal': ['goal']}
+    init_list = ['init']
+
+    transition_system_input = TransitionSystemInput(states_list, transitions_dict, labels_dict, init_list)
+
+    sys_aut, spot_aut_sys = get_system_automaton('F(beaver & F(goal))')
+    test_aut, spot_aut_test = get_tester_automaton('F(door_1) & F(door_2)')
+    prod_aut = get_product_automaton(spot_aut_sys, spot_aut_test)
+    transys = TranSys(transition_system_input)
+
+    virtual, virtual_sys, map_G_to_S = sync_prods(transys, sys_aut, prod_aut, test_aut)
+
+    # the virtual graphs match the separately constructed products
+    assert virtual.E == sync_prod(transys, prod_aut).E
+    expected_sys = sync_prod(transys, sys_aut)
+    assert virtual_sys.E == expected_sys.E
+    assert set(virtual_sys.S) == set(expected_sys.S)
+
+    # every node of G maps to the nodes of S with the same system state
+    for node, (state, q) in enumerate(virtual.reverse_Sdict):
+        sys_nodes = map_G_to_S[node]
+        expected = [k for k, sys_node in enumerate(virtual_sys.reverse_Sdict) if sys_node[0] == state]
+        assert sorted(sys_nodes) == expected
+
+def test_translation_presets():
+    states_list = [0,1,2,3,4,5]
+    transitions_dict = {0: [1,2,3], 1: [2,3,4], 2: [3,4,5], 3: [4], 4: [5,0], 5: [5]}
+    labels_dict = {0 : ['a'], 5: ['goal'], 3: ['int'], 2: ['lava']}
+    init_list = [0]
+    transys = TranSys(TransitionSystemInput(states_list, transitions_dict, labels_dict, init_list))
+
+    flows = dict()
+    sizes = dict()
+    for preset in ['complete', 'auto']:
+        sys_aut, spot_aut_sys = get_system_automaton('F(goal) & G(!lava)', preset=preset)
+        test_aut, spot_aut_test = get_tester_automaton('F(int) & G(!lava)', preset=preset)
+        assert is_sound(spot_aut_sys, 'sys') and is_sound(spot_aut_test, 'test')
+        prod_aut = get_product_automaton(spot_aut_sys, spot_aut_test)
+        virtual, virtual_sys, map_G_to_S = sync_prods(transys, sys_aut, prod_aut, test_aut)
+        sizes[preset] = (len(sys_aut.Q), len(virtual.S))
+        flows[preset] = solve(virtual, transys, prod_aut, virtual_sys, case='static', map_G_to_S=map_G_to_S, seed=0)[1]
+    # the rejecting sink of the system automaton is left out
+    assert sizes['auto'][0] < sizes['complete'][0]
+    assert sizes['auto'][1] <= sizes['complete'][1]
+    assert flows['auto'] == flows['complete']
+
+def test_sync_prods_projection(monkeypatch):
+    states_list = [0,1,2,3,4,5]
+    transitions_dict = {0: [1,2,3], 1: [2,3,4], 2: [3,4,5], 3: [4], 4: [5,0], 5: [5]}
+    labels_dict = {0 : ['a'], 5: ['goal'], 3: ['int'], 2: ['lava']}
+    init_list = [0]
+    transys = TranSys(TransitionSystemInput(states_list, transitions_dict, labels_dict, init_list))
+
+    # default preset: the system automaton has no rejecting sink, the tester is complete
+    sys_aut, spot_aut_sys = get_system_automaton('F(goal) & G(!lava)')
+    test_aut, spot_aut_test = get_tester_automaton('F(int) & G(!lava)')
+    prod_aut = get_product_automaton(spot_aut_sys, spot_aut_test)
+    assert not sys_aut.complete and test_aut.complete
+
+    built = []
+    def counting_sync_prod(system, aut):
+        built.append(aut)
+        return sync_prod(system, aut)
+    monkeypatch.setattr(product, 'sync_prod', counting_sync_prod)
+    virtual, virtual_sys, map_G_to_S = product.sync_prods(transys, sys_aut, prod_aut, test_aut)
+
+    # only the virtual product graph is constructed, the system graph is its projection
+    assert built == [prod_aut]
+    expected_sys = sync_prod(transys, sys_aut)
+    assert virtual_sys.E == expected_sys.E
+    assert set(virtual_sys.S) == set(expected_sys.S)
+
+def test_translation_fallback():
+    # F(G(a)) has no deterministic Buchi automaton, the baseline translation is kept
+    preset, spot_aut = select_translation('F(G(a))', 'sys')
+    assert preset == 'complete'
+    sys_aut, spot_aut_sys = get_system_automaton('F(G(a))')
+    assert not sys_aut.deterministic
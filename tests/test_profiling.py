@@ -0,0 +1,65 @@
+"""Testing the stages, sizes and report of the profiler."""
+import pytest
+
+import sys
+import json
+import time
+import tracemalloc
+sys.path.append('../')
+from floras.profiling import Profiler
+
+def test_stages(tmp_path):
+    profiler = Profiler()
+    profiler.start()
+    with profiler.stage('product'):
+        time.sleep(0.05)
+    with profiler.stage('solve'):
+        sum(range(10**5))
+    profiler.record('product', nodes=3, edges=5)
+    profiler.record('product', edges=4)
+    profiler.stop()
+
+    assert [stage["stage"] for stage in profiler.stages] == ['product', 'solve']
+    assert profiler.stages[0]["wall_time"] >= 0.05
+    assert all(stage["cpu_time"] >= 0 for stage in profiler.stages)
+    assert profiler.sizes == {'product': {'nodes': 3, 'edges': 4}}
+
+    path = tmp_path / 'log' / 'profile.json'
+    profiler.write(str(path))
+    profiler.write(str(path)) # the directory exists
+    with open(str(path), 'r') as fp:
+        report = json.load(fp)
+    assert [stage["stage"] for stage in report["stages"]] == ['product', 'solve']
+    assert report["sizes"] == {'product': {'nodes': 3, 'edges': 4}}
+    assert report["wall_time"] >= report["stages"][0]["wall_time"]
+
+def test_memory_opt_in():
+    # without memory tracing the stages are timed with tracemalloc off
+    profiler = Profiler()
+    profiler.start()
+    assert not tracemalloc.is_tracing()
+    with profiler.stage('build'):
+        [0]*10**5
+    profiler.stop()
+    assert profiler.stages[0]["peak_alloc_mb"] is None
+
+    profiler = Profiler(memory=True)
+    profiler.start()
+    assert tracemalloc.is_tracing()
+    with profiler.stage('build'):
+        data = [0]*10**6
+    profiler.stop()
+    assert not tracemalloc.is_tracing()
+    assert profiler.stages[0]["peak_alloc_mb"] > 1
+
+def test_disabled(tmp_path):
+    profiler = Profiler(enabled=False, memory=True)
+    profiler.start()
+    assert not tracemalloc.is_tracing()
+    with profiler.stage('product'):
+        pass
+    profiler.record('product', nodes=3)
+    profiler.stop()
+    profiler.write(str(tmp_path / 'profile.json'))
+    assert profiler.stages == [] and profiler.sizes == {}
+    assert not (tmp_path / 'profile.json').exists()
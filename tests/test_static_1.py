@@ -7,8 +7,11 @@ from floras.components.automata import get_system_automaton, get_tester_automato
 from floras.components.transition_system import TransitionSystemInput, TranSys
 from floras.components.product import sync_prod
 from floras.optimization.optimize import solve
+from floras.optimization.session import Session
 
-def test_static():
+@pytest.mark.parametrize("backend", ["gurobi", "highs"])
+@pytest.mark.parametrize("warm_start", [False, True])
+def test_static(backend, warm_start):
     states_list = [0,1,2,3,4,5]
     transitions_dict = {0: [1,2,3], 1: [2,3,4], 2: [3,4,5], 3: [4], 4: [5,0], 5: [5]}
     labels_dict = {0 : ['a'], 5: ['goal'], 3: ['int']}
@@ -31,6 +34,38 @@ def test_static():
     virtual_sys = sync_prod(transys, sys_aut)
     virtual = sync_prod(transys, prod_aut)
 
-    d, flow = solve(virtual, transys, prod_aut, virtual_sys, case = 'static')
+    d, flow = solve(virtual, transys, prod_aut, virtual_sys, case = 'static', backend = backend, warm_start = warm_start)
 
     assert flow >= 1.0
+
+@pytest.mark.parametrize("case", ["static", "reactive"])
+def test_session_rebuild(case):
+    states_list = [0,1,2,3,4,5]
+    transitions_dict = {0: [1,2,3], 1: [2,3,4], 2: [3,4,5], 3: [4], 4: [5,0], 5: [5]}
+    labels_dict = {0 : ['a'], 5: ['goal'], 3: ['int']}
+    init_list = [0]
+
+    sys_aut, spot_aut_sys = get_system_automaton('F(goal)')
+    test_aut, spot_aut_test = get_tester_automaton('F(int)')
+    prod_aut = get_product_automaton(spot_aut_sys, spot_aut_test)
+
+    transys = TranSys(TransitionSystemInput(states_list, transitions_dict, labels_dict, init_list))
+    session = Session(transys, sys_aut, prod_aut, case=case, seed=0, test_aut=test_aut)
+    session.solve()
+    model = session.milp.model
+    changes = session.rebuild(add=[(1,5)], remove=[(2,5)], labels={2: ['int']})
+    d, flow, exit_status = session.solve()
+
+    # the variables are only reused in the static case, the reactive model is built from scratch
+    assert changes["reused"] == (case == 'static')
+    assert (session.milp.model is model) == (case == 'static')
+
+    # same objective as a model built from scratch for the changed transition system
+    transitions_dict = {0: [1,2,3], 1: [2,3,4,5], 2: [3,4], 3: [4], 4: [5,0], 5: [5]}
+    labels_dict = {0 : ['a'], 5: ['goal'], 3: ['int'], 2: ['int']}
+    transys = TranSys(TransitionSystemInput(states_list, transitions_dict, labels_dict, init_list))
+    fresh = Session(transys, sys_aut, prod_aut, case=case, seed=0, test_aut=test_aut)
+    fresh.solve()
+
+    assert exit_status == 'opt'
+    assert session.milp.model.ObjVal == pytest.approx(fresh.milp.model.ObjVal)
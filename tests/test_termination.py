@@ -0,0 +1,109 @@
+"""Testing the termination policy and the incumbent telemetry of the solve callback."""
+import pytest
+
+import sys
+import json
+import time
+sys.path.append('../')
+from floras.optimization.termination import TerminationPolicy, Telemetry
+from floras.components.automata import get_system_automaton, get_tester_automaton, get_product_automaton
+from floras.components.transition_system import TransitionSystemInput, TranSys
+from floras.components.product import sync_prods
+from floras.optimization.optimize import solve
+
+gurobipy = pytest.importorskip("gurobipy")
+from gurobipy import GRB
+from floras.optimization.optimization import cb
+
+class CallbackModel:
+    """
+    Stand-in for the gurobipy model in the callback: cbGet returns the given values.
+    """
+    def __init__(self, values, policy=None, telemetry=None, since_start=0.0, since_improvement=0.0, incumbent=float('inf')):
+        now = time.time()
+        self.values = values
+        self._cur_obj = incumbent
+        self._time = now - since_start
+        self._time_improved = now - since_improvement
+        self._maximize = True
+        self._data = {"term_condition": None}
+        self._policy = policy
+        self._telemetry = telemetry
+        self.terminated = False
+
+    def cbGet(self, what):
+        return self.values[what]
+
+    def terminate(self):
+        self.terminated = True
+
+def mipsol(objective, best, sol_count):
+    return {GRB.Callback.MIPSOL_OBJ: objective, GRB.Callback.MIPSOL_OBJBST: best, GRB.Callback.MIPSOL_OBJBND: 4.0,
+            GRB.Callback.MIPSOL_NODCNT: 0.0, GRB.Callback.MIPSOL_SOLCNT: sol_count}
+
+def mipnode(best, sol_count):
+    return {GRB.Callback.MIPNODE_OBJBST: best, GRB.Callback.MIPNODE_OBJBND: 4.0,
+            GRB.Callback.MIPNODE_NODCNT: 10.0, GRB.Callback.MIPNODE_SOLCNT: sol_count}
+
+def test_policy():
+    policy = TerminationPolicy(stall_time=60, no_solution_time=600)
+    assert policy.check(0, 10, 10) is None
+    assert policy.check(0, 601, 601) == "Timeout"
+    assert policy.check(1, 601, 10) is None
+    assert policy.check(1, 100, 61) == "Obj not changing"
+    assert TerminationPolicy(stall_time=None, no_solution_time=None).check(1, 1e6, 1e6) is None
+
+def test_callback_stops():
+    policy = TerminationPolicy(stall_time=60, no_solution_time=600)
+
+    # a new incumbent resets the stall window
+    model = CallbackModel(mipsol(2.0, -GRB.INFINITY, 0), policy, since_start=100, since_improvement=100)
+    cb(model, GRB.Callback.MIPSOL)
+    assert not model.terminated and model._cur_obj == 2.0
+
+    # no improvement for longer than stall_time
+    model = CallbackModel(mipnode(2.0, 1), policy, since_start=100, since_improvement=61, incumbent=2.0)
+    cb(model, GRB.Callback.MIPNODE)
+    assert model.terminated and model._data["term_condition"] == "Obj not changing"
+
+    # no solution within no_solution_time
+    model = CallbackModel(mipnode(-GRB.INFINITY, 0), policy, since_start=601, since_improvement=601)
+    cb(model, GRB.Callback.MIPNODE)
+    assert model.terminated and model._data["term_condition"] == "Timeout"
+
+def test_callback_telemetry(tmp_path):
+    path = str(tmp_path / 'telemetry.jsonl')
+    telemetry = Telemetry(path)
+    telemetry.start(type='static', backend='gurobi')
+    cb(CallbackModel(mipnode(-GRB.INFINITY, 0), telemetry=telemetry), GRB.Callback.MIPNODE)
+    cb(CallbackModel(mipsol(2.0, -GRB.INFINITY, 0), telemetry=telemetry), GRB.Callback.MIPSOL)
+    cb(CallbackModel(mipnode(2.0, 1), telemetry=telemetry, incumbent=2.0), GRB.Callback.MIPNODE)
+    cb(CallbackModel({}, telemetry=telemetry), GRB.Callback.MESSAGE) # not recorded
+    telemetry.close()
+
+    with open(path, 'r') as fp:
+        records = [json.loads(line) for line in fp]
+    assert [record["event"] for record in records] == ["start", "MIPNODE", "MIPSOL", "MIPNODE"]
+    assert records[0]["type"] == 'static' and records[0]["backend"] == 'gurobi'
+    # no incumbent yet: incumbent and gap are None
+    assert records[1]["incumbent"] is None and records[1]["gap"] is None and records[1]["sol_count"] == 0
+    # the new solution is the incumbent and counts as a solution
+    assert records[2]["incumbent"] == 2.0 and records[2]["sol_count"] == 1
+    assert records[2]["gap"] == pytest.approx(1.0)
+    assert records[3]["nodes"] == 10
+
+def test_solve_telemetry(tmp_path):
+    transys = TranSys(TransitionSystemInput([0,1,2,3,4,5], {0: [1,2,3], 1: [2,3,4], 2: [3,4,5], 3: [4], 4: [5,0], 5: [5]},
+                                            {0 : ['a'], 5: ['goal'], 3: ['int']}, [0]))
+    sys_aut, spot_aut_sys = get_system_automaton('F(goal)')
+    test_aut, spot_aut_test = get_tester_automaton('F(int)')
+    prod_aut = get_product_automaton(spot_aut_sys, spot_aut_test)
+    virtual, virtual_sys, map_G_to_S = sync_prods(transys, sys_aut, prod_aut, test_aut)
+    path = str(tmp_path / 'telemetry.jsonl')
+    solve(virtual, transys, prod_aut, virtual_sys, case='static', map_G_to_S=map_G_to_S, seed=0, telemetry=path)
+
+    with open(path, 'r') as fp:
+        records = [json.loads(line) for line in fp]
+    assert records[0]["event"] == "start"
+    assert "MIPSOL" in [record["event"] for record in records[1:]]
+    assert all(a["wall_time"] <= b["wall_time"] for a, b in zip(records[1:], records[2:]))